@@ -0,0 +1,118 @@
+"""
+Building and submitting many `CatMAPCalculation`s that only differ in some of their inputs, e.g. the points of a sweep.
+
+The inputs that all calculations share are the same nodes, stored once, and the
+varied inputs get one node per distinct value, however many calculations use
+it. The new nodes are stored in batches, one database transaction per batch,
+instead of one transaction per node when every calculation is submitted.
+"""
+import collections.abc
+import json
+import numpy
+from aiida import orm
+from aiida_catmap.calculations.catmap import CatMAPCalculation
+
+## Number of nodes stored per database transaction
+BATCH_SIZE = 1000
+
+
+def get_node(name, value, nodes=None):
+    """
+    Return the input node of a `CatMAPCalculation` for a value, the same node for the same name and value.
+
+    :param name: name of the input, e.g. `voltage`
+    :param value: Python value of the input, or a node which is returned as is
+    :param nodes: optional dictionary of the nodes created so far, to which the node is added
+    :returns: the node, of the type of the input port
+    :raises ValueError: if the input does not take a `Bool`, `Int`, `Float`, `Str`, `List` or `Dict` node
+    """
+    if isinstance(value, orm.Node):
+        return value
+
+    value = value.tolist() if isinstance(value, (numpy.ndarray, numpy.generic)) else value
+    key = (name, json.dumps(value, sort_keys=True))
+    if nodes is not None and key in nodes:
+        return nodes[key]
+
+    valid_type = CatMAPCalculation.spec().inputs[name].valid_type
+    if valid_type is orm.List:
+        node = orm.List(list=value)
+    elif valid_type is orm.Dict:
+        node = orm.Dict(dict=value)
+    elif valid_type in (orm.Bool, orm.Int, orm.Float, orm.Str):
+        node = valid_type(value)
+    else:
+        raise ValueError(f'the input `{name}` cannot be created from a value')
+
+    if nodes is not None:
+        nodes[key] = node
+    return node
+
+
+def _to_dict(namespace):
+    """Return a namespace of inputs, e.g. the `metadata` of a builder, as nested dictionaries."""
+    return {
+        key: _to_dict(value) if isinstance(value, collections.abc.Mapping) else value for key, value in namespace.items()
+    }
+
+
+def get_inputs(inputs, parameters):
+    """
+    Return the inputs of the calculations that vary the given parameters of a base set of inputs.
+
+    :param inputs: mapping of the inputs shared by all calculations, nodes or Python values, e.g. a builder
+    :param parameters: dictionary of the sequences of values of the varied inputs keyed by input name, all of the same
+        length, e.g. `{'voltage': numpy.linspace(-1, 0, 100)}`
+    :returns: list of the dictionaries of inputs, one per calculation
+    :raises ValueError: if the sequences have different lengths
+    """
+    lengths = {len(values) for values in parameters.values()}
+    if len(lengths) > 1:
+        raise ValueError('the sequences of values of the varied inputs have different lengths')
+
+    nodes = {}
+    base = {
+        name: _to_dict(value) if name == 'metadata' else get_node(name, value, nodes)
+        for name, value in inputs.items() if name not in parameters
+    }
+    return [
+        {**base, **{name: get_node(name, values[index], nodes) for name, values in parameters.items()}}
+        for index in range(lengths.pop() if lengths else 1)
+    ]
+
+
+def store_nodes(nodes, batch_size=BATCH_SIZE):
+    """
+    Store the nodes that are not stored yet, in one database transaction per batch.
+
+    :param nodes: iterable of nodes, nodes that appear several times are stored once
+    :param batch_size: number of nodes stored per transaction
+    """
+    from aiida.manage.manager import get_manager
+
+    unstored = list({id(node): node for node in nodes if not node.is_stored}.values())
+    backend = get_manager().get_backend()
+    for start in range(0, len(unstored), batch_size):
+        with backend.transaction():
+            for node in unstored[start:start + batch_size]:
+                node.store(with_transaction=False)
+
+
+def submit_calculations(inputs, parameters, batch_size=BATCH_SIZE):
+    """
+    Submit the calculations that vary the given parameters of a base set of inputs, see `get_inputs`.
+
+    All the input nodes are stored in batches before the first calculation is submitted.
+
+    :param inputs: mapping of the inputs shared by all calculations
+    :param parameters: dictionary of the sequences of values of the varied inputs keyed by input name
+    :param batch_size: number of nodes stored per transaction
+    :returns: list of the calculation nodes, in the order of the values
+    """
+    from aiida.engine import submit
+
+    calculations = get_inputs(inputs, parameters)
+    store_nodes(
+        (node for calculation in calculations for node in calculation.values() if isinstance(node, orm.Node)), batch_size
+    )
+    return [submit(CatMAPCalculation, **calculation) for calculation in calculations]
@@ -0,0 +1,142 @@
+"""
+Cache keys of CatMAP models, independent of the formatting of the mkm setup file.
+
+Two mkm files that only differ in the order of the keys of a dictionary, in
+the formatting of numbers (`2` and `2.0`) or in the names of the files that
+CatMAP reads and writes define the same model. The cache key of a calculation
+is computed from the canonical form of its mkm files and the checksum of the
+content of its energies file, so that such calculations share the same key.
+"""
+import ast
+import hashlib
+import json
+
+## Names of files in the mkm setup file, they do not change the solution of the model
+FILENAME_VARIABLES = ('data_file', 'input_file')
+
+
+def _normalize(value):
+    """Return a JSON serializable form of a literal value that does not depend on its formatting."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, str) else json.dumps(_normalize(key)): _normalize(val) for key, val in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_normalize(val) for val in value]
+    raise ValueError(f'value `{value!r}` of type {type(value)} is not supported')
+
+
+def canonicalize_mkm(content):
+    """
+    Return the canonical form of the content of an mkm setup file.
+
+    Only the assignments to plain names of literal values are considered,
+    later assignments take precedence over earlier ones as when the file is
+    executed. The names of the data and energies files are left out.
+
+    :param content: content of the mkm setup file
+    :returns: the canonical form as a string
+    :raises ValueError: if the content is not valid Python or assigns a non-literal value
+    """
+    try:
+        tree = ast.parse(content)
+    except SyntaxError as exception:
+        raise ValueError(f'the mkm content is not valid Python: {exception}') from exception
+
+    values = {}
+    for statement in tree.body:
+        if not isinstance(statement, ast.Assign) or not all(isinstance(target, ast.Name) for target in statement.targets):
+            raise ValueError(f'line {statement.lineno} of the mkm content is not an assignment to a name')
+        try:
+            value = _normalize(ast.literal_eval(statement.value))
+        except ValueError as exception:
+            raise ValueError(f'line {statement.lineno} of the mkm content does not assign a literal value') from exception
+        for target in statement.targets:
+            values[target.id] = value
+
+    for name in FILENAME_VARIABLES:
+        values.pop(name, None)
+
+    return json.dumps(values, sort_keys=True, separators=(',', ':'))
+
+
+def get_checksum(handle, chunk_size=2**20):
+    """
+    Return the sha256 checksum of the content of a file.
+
+    :param handle: file handle opened in binary mode
+    :param chunk_size: number of bytes read at once
+    :returns: the hexadecimal checksum
+    """
+    checksum = hashlib.sha256()
+    for chunk in iter(lambda: handle.read(chunk_size), b''):
+        checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def get_cache_key(mkm_contents, energies_checksum, options=None):
+    """
+    Return the cache key of a calculation.
+
+    :param mkm_contents: contents of the mkm setup files of the models that the calculation runs, in order
+    :param energies_checksum: checksum of the content of the energies file
+    :param options: optional dictionary of the options that change the outputs, e.g. the `output_format`
+    :returns: the hexadecimal cache key
+    """
+    key = {
+        'models': [canonicalize_mkm(content) for content in mkm_contents],
+        'energies': energies_checksum,
+        'options': options or {},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf8')).hexdigest()
+
+
+def get_mechanism_key(rxn_expressions, scaler, descriptor_names):
+    """
+    Return the key of a reaction mechanism, independent of the energies and the reaction conditions.
+
+    Models with the same key share the same reaction network and descriptors, so that numerical settings that work
+    for one of them are a good starting point for the others.
+
+    :param rxn_expressions: list of the reaction expressions, their order does not matter
+    :param scaler: name of the scaler
+    :param descriptor_names: names of the descriptors, in order
+    :returns: the hexadecimal key
+    """
+    key = {
+        'rxn_expressions': sorted(' '.join(expression.split()) for expression in rxn_expressions),
+        'scaler': scaler,
+        'descriptor_names': list(descriptor_names),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf8')).hexdigest()
+
+
+def find_cached_calculation(inputs):
+    """
+    Return a finished `CatMAPCalculation` with the same cache key as the given inputs.
+
+    This looks the results up in the database directly, it does not need the
+    daemon nor caching to be enabled in the profile.
+
+    :param inputs: mapping of the inputs of a `CatMAPCalculation`, e.g. a process builder
+    :returns: the most recent `CalcJobNode` that finished successfully, or None
+    """
+    from aiida.orm import CalcJobNode, QueryBuilder
+    from aiida_catmap.calculations.catmap import CatMAPCalculation
+
+    filters = {
+        'attributes.catmap_cache_key': CatMAPCalculation.get_cache_key(inputs),
+        'attributes.exit_status': 0,
+    }
+    query = QueryBuilder().append(CalcJobNode, filters=filters, tag='calculation')
+    query.order_by({'calculation': {'ctime': 'desc'}})
+
+    code = inputs.get('code', None)
+    for node, in query.iterall():
+        if code is None or node.inputs.code.uuid == code.uuid:
+            return node
+    return None
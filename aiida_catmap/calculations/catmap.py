@@ -2,9 +2,165 @@
 Calculations provided by aiida_catmap.
 """
 # pylint: disable=line-too-long
+import io
+import json
+import os
 from aiida.common import datastructures
 from aiida.engine import CalcJob
-from aiida.orm import SinglefileData, List, Float, Dict, Str, Int, Bool
+from aiida.engine.processes.calcjobs.calcjob import validate_calc_job
+from aiida.orm import SinglefileData, List, Float, Dict, Str, Int, Bool, ArrayData, RemoteData
+from aiida_catmap.calculations.caching import get_cache_key, get_checksum
+from aiida_catmap.data.energies import EnergiesData, parse_energies, validate_energies
+from aiida_catmap.parsers.catmap import MAP_OUTPUTS, map_to_arrays
+
+OUTPUT_FORMATS = ('list', 'array')
+PROFILE_MODES = ('timers', 'cprofile')
+
+## Inputs that end up in the mkm file and can be overridden per model in a batched run
+MKM_INPUTS = (
+    'electrocatal', 'scaler', 'rxn_expressions', 'surface_names', 'descriptor_names', 'descriptor_ranges',
+    'resolution', 'temperature', 'species_definitions', 'gas_thermo_mode', 'adsorbate_thermo_mode',
+    'scaling_constraint_dict', 'numerical_solver', 'decimal_precision', 'tolerance', 'max_rootfinding_iterations',
+    'max_bisections', 'data_file', 'voltage', 'electrochemical_thermo_mode', 'pH', 'beta', 'potential_reference_scale',
+    'extrapolated_potential', 'voltage_diff_drop', 'sigma_input', 'Upzc',
+)
+
+
+## Templates of the sections of the mkm file, shared by all models instead of writing them value by value
+MKM_TEMPLATES = {
+    'reaction': (
+        "scaler = '{scaler}' \n"
+        'rxn_expressions = {rxn_expressions} \n'
+        'surface_names = {surface_names} \n'
+        'descriptor_names = {descriptor_names} \n'
+        'descriptor_ranges = {descriptor_ranges} \n'
+        'resolution = {resolution} \n'
+        'temperature = {temperature} \n'
+        'species_definitions = {species_definitions} \n'
+        "data_file = '{data_file}' \n"
+        "input_file = '{input_file}' \n"
+        "gas_thermo_mode = '{gas_thermo_mode}' \n"
+        "adsorbate_thermo_mode = '{adsorbate_thermo_mode}' \n"
+        'scaling_constraint_dict = {scaling_constraint_dict} \n'
+    ),
+    'generalized_linear_scaler': (
+        'voltage = {voltage} \n'
+        'pH = {pH} \n'
+    ),
+    'thermodynamic_scaler': (
+        "potential_reference_scale = '{potential_reference_scale}' \n"
+        'extrapolated_potential = {extrapolated_potential} \n'
+        'voltage_diff_drop = {voltage_diff_drop} \n'
+        'sigma_input = {sigma_input} \n'
+        'Upzc = {Upzc} \n'
+    ),
+    'beta': 'beta = {beta} \n',
+    'electrochemical_thermo_mode': "electrochemical_thermo_mode = '{}' \n",
+    'numerical': (
+        'decimal_precision = {decimal_precision} \n'
+        'tolerance = {tolerance} \n'
+        'max_rootfinding_iterations = {max_rootfinding_iterations} \n'
+        'max_bisections = {max_bisections} \n'
+        "numerical_solver = '{numerical_solver}' \n"
+    ),
+}
+
+
+def validate_output_format(value, _=None):
+    """Validate the `output_format` option."""
+    if value not in OUTPUT_FORMATS:
+        return f"output_format '{value}' not recognised, choose from {OUTPUT_FORMATS}"
+
+
+def validate_batch_parameters(value, _=None):
+    """Validate the `batch_parameters` input."""
+    if value is None:
+        return None
+    parameters = value.get_list()
+    if not parameters:
+        return 'batch_parameters is empty'
+    for index, overrides in enumerate(parameters):
+        if not isinstance(overrides, dict):
+            return f'entry {index} of batch_parameters is not a dictionary'
+        invalid = set(overrides).difference(MKM_INPUTS).union({'data_file'}.intersection(overrides))
+        if invalid:
+            return f'entry {index} of batch_parameters contains invalid keys {sorted(invalid)}'
+
+
+def validate_parallel_workers(value, _=None):
+    """Validate the `parallel_workers` input."""
+    if value is not None and value.value < 1:
+        return 'parallel_workers has to be a positive integer'
+
+
+def validate_parser_workers(value, _=None):
+    """Validate the `parser_workers` option."""
+    if value is not None and value < 1:
+        return 'parser_workers has to be a positive integer'
+
+
+def validate_checkpoints(value, _=None):
+    """Validate the `checkpoints` input."""
+    if value is not None and value.value < 1:
+        return 'checkpoints has to be a positive integer'
+
+
+def validate_output_variables(value, _=None):
+    """Validate the `output_variables` input."""
+    if value is None:
+        return None
+    variables = value.get_list()
+    if not variables:
+        return 'output_variables is empty'
+    invalid = set(variables).difference(MAP_OUTPUTS.values())
+    if invalid:
+        return f'output_variables contains invalid variables {sorted(invalid)}, choose from {list(MAP_OUTPUTS.values())}'
+
+
+def validate_profile(value, _=None):
+    """Validate the `profile` input."""
+    if value is not None and value.value not in PROFILE_MODES:
+        return f"profile '{value.value}' not recognised, choose from {PROFILE_MODES}"
+
+
+def validate_inputs(value, ctx=None):
+    """Validate the inputs of the entire input namespace, on top of the validation of `CalcJob`."""
+    if ctx is not None:
+        result = validate_calc_job(value, ctx)
+        if result is not None:
+            return result
+
+    if 'batch_parameters' in value and 'parallel_workers' in value:
+        return 'batch_parameters and parallel_workers cannot be combined, the models of a batch already run in parallel'
+
+    if 'batch_parameters' in value and 'checkpoints' in value:
+        return 'batch_parameters and checkpoints cannot be combined, every model of a batch already has its own data file'
+
+    if 'parent_folder' in value and 'parallel_workers' not in value and 'checkpoints' not in value:
+        return 'parent_folder requires parallel_workers or checkpoints, only the strips of a split grid can be restarted'
+
+    options = value.get('metadata', {}).get('options', {})
+    if options.get('stream_maps', False) and options.get('output_format', 'list') != 'array':
+        return 'stream_maps requires the `array` output format'
+
+    if all(key in value for key in ('energies', 'surface_names', 'rxn_expressions', 'descriptor_names')):
+        energies = value['energies']
+        try:
+            columns = energies.get_columns() if isinstance(energies, EnergiesData) else parse_energies(energies.get_content())
+        except ValueError as exception:
+            return f'invalid energies: {exception}'
+        scaler = value['scaler'].value if 'scaler' in value else 'GeneralizedLinearScaler'
+        result = validate_energies(
+            columns, value['surface_names'].get_list(), value['rxn_expressions'].get_list(), value['descriptor_names'].get_list(),
+            scaler
+        )
+        if result is not None:
+            return result
+
+    if 'initial_guess' in value and 'descriptor_names' in value:
+        descriptors, _ = map_to_arrays(value['initial_guess'])
+        if descriptors.ndim != 2 or descriptors.shape[1] != len(value['descriptor_names'].get_list()):
+            return 'the descriptor points of initial_guess do not match descriptor_names'
 
 
 class CatMAPCalculation(CalcJob):
@@ -14,6 +170,10 @@ class CatMAPCalculation(CalcJob):
     available here https://catmap.readthedocs.io/en/latest/
     """
     _INPUT_FILE_NAME = 'aiida.mkm'
+    _LABELS_FILE_NAME = 'aiida_labels.json'
+    _RUNNER_FILE_NAME = 'catmap_runner.py'
+    _INITIAL_GUESS_FILE_NAME = 'aiida_initial_guess.json'
+    _STREAM_FILE_NAME = 'aiida_maps.stream'
 
     @classmethod
     def define(cls, spec):
@@ -35,7 +195,7 @@ class CatMAPCalculation(CalcJob):
         spec.input('electrocatal', valid_type=Bool, help='If this is an electrocatalysis run, specify here', default=lambda: Bool(True))
 
         ### Reaction condition keys
-        spec.input('energies', valid_type=SinglefileData, help='energies.txt that stores all the energy inputs')
+        spec.input('energies', valid_type=(SinglefileData, EnergiesData), help='energies.txt that stores all the energy inputs, either as the file or as a parsed `EnergiesData` table')
         spec.input('scaler', valid_type=Str, help='Scaler to be used in the Kinetic model', default=lambda: Str('GeneralizedLinearScaler'))
         spec.input('rxn_expressions', valid_type=List, help='Reactions expressions')
         spec.input('surface_names', valid_type=List, help='Surfaces to calculate with energies in energies.txt')
@@ -55,6 +215,27 @@ class CatMAPCalculation(CalcJob):
         spec.input('mkm_filename', valid_type=Str, required=False, default=lambda: Str(cls._INPUT_FILE_NAME))
         spec.input('data_file', valid_type=Str, required=False, default=lambda: Str('aiida.pickle'))
         spec.input('ideal_gas_params', valid_type=Dict, required=False, help='Ideal gas parameters to inferface with ASE')
+        spec.input('batch_parameters', valid_type=List, required=False, validator=validate_batch_parameters,
+            help='List of dictionaries of input values, e.g. `{"voltage": -0.5}`; one model is run per entry in a single '
+                 'job, in parallel over `num_mpiprocs_per_machine` processes')
+        spec.input('parallel_workers', valid_type=Int, required=False, validator=validate_parallel_workers,
+            help='Split the descriptor grid into strips that are solved by this number of worker processes')
+        spec.input('checkpoints', valid_type=Int, required=False, validator=validate_checkpoints,
+            help='Split the descriptor grid into this number of strips that are solved one after the other, or over '
+                 '`parallel_workers`, and kept as checkpoints; if the job is interrupted the solved strips are parsed as '
+                 'partial results')
+        spec.input('parent_folder', valid_type=RemoteData, required=False,
+            help='Working directory of an interrupted calculation with the same inputs, whose solved strips are reused')
+        spec.input('initial_guess', valid_type=(List, ArrayData), required=False,
+            help='Coverage map used as the initial guess of the root finding, typically the `coverage_map` output of a '
+                 'previous calculation at nearby reaction conditions')
+        spec.input('output_variables', valid_type=List, required=False, validator=validate_output_variables,
+            help='Output variables whose maps are retrieved and attached, some of `coverage`, `rate` and '
+                 '`production_rate`; all of them by default')
+        spec.input('profile', valid_type=Str, required=False, validator=validate_profile,
+            help='Time the setup and the run of every model and count its root finding, `timers`, and also profile it '
+                 'with cProfile, `cprofile`; the timings are attached as the `timings` output')
+        spec.inputs.validator = validate_inputs
 
         ### Keys for electrochemistry
         spec.input('voltage', valid_type=Float, required=False, help='Potential on an SHE scale')
@@ -71,16 +252,262 @@ class CatMAPCalculation(CalcJob):
         spec.inputs['metadata']['options']['parser_name'].default = 'catmap'
         spec.inputs['metadata']['options']['input_filename'].default = 'mkm_job.py'
         spec.inputs['metadata']['options']['output_filename'].default = 'aiida.out'
+        spec.input('metadata.options.output_format', valid_type=str, default='list', validator=validate_output_format,
+            help='Storage of the maps: `list` for the nested `List` nodes, `array` for `ArrayData` nodes')
+        spec.input('metadata.options.keep_precision', valid_type=bool, default=False,
+            help='Store the values of `array` maps as strings with `decimal_precision` digits instead of float64')
+        spec.input('metadata.options.stream_maps', valid_type=bool, default=False,
+            help='Retrieve the maps as a stream of chunks that is parsed one chunk at a time instead of the data file, '
+                 'which bounds the memory of the parser for large grids; requires the `array` output format')
+        spec.input('metadata.options.worker_address', valid_type=str, required=False,
+            help='Address of a persistent CatMAP worker on the computer, the path of a Unix socket or `host:port`, to '
+                 'which the models are handed over instead of solving them in a new interpreter; see `serve` of the '
+                 'runner. The models are solved by the job itself if the worker is not available')
+        spec.input('metadata.options.compress_outputs', valid_type=bool, default=False,
+            help='Compress the maps of the `output_variables` with gzip on the computer and only retrieve those; the '
+                 'CatMAP log is then only retrieved temporarily for the parser, unless `debug` is set')
+        spec.input('metadata.options.debug', valid_type=bool, default=False,
+            help='Retrieve and store the CatMAP log as the `log` output even if `compress_outputs` is set')
+        spec.input('metadata.options.parser_workers', valid_type=int, default=1, validator=validate_parser_workers,
+            help='Number of processes that decode the data files in parallel, off the process of the parser, and of '
+                 'threads that prepare the arrays of the `array` maps')
+        spec.input('metadata.options.max_log_size', valid_type=int, default=104857600,
+            help='Size in bytes above which the CatMAP log is not stored as the `log` output')
 
         ## OUTPUTS
-        spec.output('log', valid_type=SinglefileData, help='Log file from CatMAP')
-        spec.output('coverage_map', valid_type=List, help='Coverage Map generated after a completed CatMAP run')
-        spec.output('rate_map', valid_type=List, help='Rate Map generated after a completed CatMAP run')
-        spec.output('production_rate_map', valid_type=List, help='Production Rate Map generated after a completed CatMAP run')
+        spec.output('log', valid_type=SinglefileData, required=False, help='Log file from CatMAP, unless larger than `max_log_size`')
+        spec.output('coverage_map', valid_type=(List, ArrayData), required=False, help='Coverage Map generated after a completed CatMAP run')
+        spec.output('rate_map', valid_type=(List, ArrayData), required=False, help='Rate Map generated after a completed CatMAP run')
+        spec.output('production_rate_map', valid_type=(List, ArrayData), required=False, help='Production Rate Map generated after a completed CatMAP run')
+        spec.output('summary', valid_type=Dict, required=False,
+            help='Extrema of every species of the maps and production rates at the surfaces, queryable as attributes')
+        spec.output('timings', valid_type=Dict, required=False,
+            help='Timings and root finding counts of every model and timings of the parser, if `profile` is set')
+        spec.output_namespace('batch', valid_type=(List, ArrayData, Dict), dynamic=True,
+            help='Maps and summaries of a batched run, with link labels `<output>_<index>` for the entries of `batch_parameters`')
 
         spec.exit_code(100, 'ERROR_MISSING_OUTPUT_FILES', message='Calculation did not produce all expected output files.')
         spec.exit_code(500, 'ERROR_NO_PICKLE_FILE', message='No information stored in the pickle file')
+        spec.exit_code(501, 'ERROR_MISSING_MAP', message='The pickle file does not contain all the expected maps')
+        spec.exit_code(502, 'ERROR_MALFORMED_MAP', message='A map in the pickle file does not match the descriptor grid')
+        spec.exit_code(503, 'ERROR_BATCH_MODEL_FAILED', message='Some of the models of the batched run did not produce their outputs')
+        spec.exit_code(504, 'ERROR_PARTIAL_RESULTS', message='The run was interrupted, the maps only contain the solved strips of the grid')
+
+
+    @classmethod
+    def get_batch_filename(cls, filename, index):
+        """
+        Return the name of a file of the model with the given index in a batched run.
+
+        :param filename: name of the file for a single model, e.g. `aiida.pickle`
+        :param index: index of the model in `batch_parameters`
+        :return: the file name, e.g. `aiida_0.pickle`
+        """
+        stem, extension = os.path.splitext(filename)
+        return f'{stem}_{index}{extension}'
+
+    @classmethod
+    def get_batch_outputs(cls, node):
+        """
+        Return the outputs of the models of a batched calculation, attached in the `batch` namespace by the parser.
+
+        :param node: the `CalcJobNode` of the calculation, the models that failed have no outputs
+        :return: dictionary keyed by the index of the model in `batch_parameters` of the dictionaries of its output
+            nodes keyed by output name, e.g. `coverage_map`
+        """
+        from aiida.common import LinkType
+
+        ## The namespace is stored as `batch__` in the link labels, e.g. `batch__coverage_map_0`
+        outputs = {}
+        for entry in node.get_outgoing(link_type=LinkType.CREATE).all():
+            namespace, _, label = entry.link_label.partition('__')
+            if namespace == 'batch' and label:
+                name, index = label.rsplit('_', 1)
+                outputs.setdefault(int(index), {})[name] = entry.node
+        return outputs
+
+    @classmethod
+    def get_tile_prefix(cls, mkm_filename):
+        """
+        Return the prefix of the files of the strips of a split grid, see `run_tiled` of the runner.
+
+        :param mkm_filename: name of the mkm file of the model
+        :return: the prefix, the names of the files are `<prefix>_<index>.<extension>`
+        """
+        return f'{os.path.splitext(mkm_filename)[0]}_tile'
+
+    @classmethod
+    def get_profile_filenames(cls, mkm_filename):
+        """
+        Return the names of the files written by the runner for a model when it is profiled, see `Profiler` of the runner.
+
+        :param mkm_filename: name of the mkm file of the model
+        :return: tuple of the names of the JSON file with the timings and of the file with the cProfile statistics
+        """
+        stem = os.path.splitext(mkm_filename)[0]
+        return f'{stem}_timings.json', f'{stem}.pstats'
+
+    @classmethod
+    def get_output_variables(cls, inputs):
+        """
+        Return the output variables whose maps are retrieved.
+
+        :param inputs: mapping of the input nodes
+        :return: list of the output variables, e.g. `coverage`
+        """
+        if 'output_variables' in inputs:
+            return [variable for variable in MAP_OUTPUTS.values() if variable in inputs['output_variables'].get_list()]
+        return list(MAP_OUTPUTS.values())
 
+    @classmethod
+    def get_map_outputs(cls, inputs):
+        """
+        Return the map outputs of a calculation, those of its output variables.
+
+        :param inputs: mapping of the input nodes
+        :return: list of the link labels of the map outputs, e.g. `coverage_map`
+        """
+        variables = cls.get_output_variables(inputs)
+        return [link_label for link_label, variable in MAP_OUTPUTS.items() if variable in variables]
+
+    @classmethod
+    def get_data_filename(cls, filename, inputs, index):
+        """
+        Return the name of a file written for a model, which is numbered in a batched run.
+
+        :param filename: name of the file for a single model
+        :param inputs: mapping of the input nodes
+        :param index: index of the model
+        :return: the name of the file
+        """
+        return cls.get_batch_filename(filename, index) if 'batch_parameters' in inputs else filename
+
+    @classmethod
+    def get_mkm_values(cls, inputs, overrides=None):
+        """
+        Return the values of the mkm file as Python objects.
+
+        :param inputs: mapping of the input nodes, inputs that are not given take their default value
+        :param overrides: optional dictionary of values that take precedence over the inputs
+        :return: dictionary of the mkm values
+        """
+        ports = cls.spec().inputs
+        values = {}
+        for name in MKM_INPUTS:
+            if name in inputs:
+                node = inputs[name]
+            elif ports[name].has_default():
+                node = ports[name].default() if callable(ports[name].default) else ports[name].default
+            else:
+                continue
+            if isinstance(node, List):
+                values[name] = node.get_list()
+            elif isinstance(node, Dict):
+                values[name] = node.get_dict()
+            else:
+                values[name] = node.value
+        values['input_file'] = inputs['energies'].filename
+        values.update(overrides or {})
+        return values
+
+    @classmethod
+    def get_models(cls, inputs):
+        """
+        Return the models that a calculation with the given inputs runs, one unless the models are batched.
+
+        :param inputs: mapping of the input nodes
+        :return: list of `(mkm_filename, labels_filename, values)` tuples
+        """
+        mkm_filename = inputs['mkm_filename'].value if 'mkm_filename' in inputs else cls._INPUT_FILE_NAME
+        values = cls.get_mkm_values(inputs)
+
+        if 'batch_parameters' not in inputs:
+            return [(mkm_filename, cls._LABELS_FILE_NAME, values)]
+
+        models = []
+        for index, overrides in enumerate(inputs['batch_parameters'].get_list()):
+            overrides = {**overrides, 'data_file': cls.get_batch_filename(values['data_file'], index)}
+            models.append((
+                cls.get_batch_filename(mkm_filename, index),
+                cls.get_batch_filename(cls._LABELS_FILE_NAME, index),
+                {**values, **overrides},
+            ))
+        return models
+
+    @classmethod
+    def render_mkm(cls, values):
+        """
+        Return the content of the mkm setup file.
+
+        :param values: dictionary of the mkm values, see `get_mkm_values`
+        :return: the content of the file as a string
+        """
+        handle = io.StringIO()
+        cls._write_mkm(handle, values)
+        return handle.getvalue()
+
+    @classmethod
+    def get_cache_key(cls, inputs):
+        """
+        Return the cache key of a calculation with the given inputs.
+
+        The key only depends on the canonical form of the mkm files, see `canonicalize_mkm`, the content of the
+        energies file and the options that change the outputs.
+
+        :param inputs: mapping of the input nodes
+        :return: the hexadecimal cache key
+        """
+        options = inputs.get('metadata', {}).get('options', {})
+        output_options = {
+            'output_format': options.get('output_format', 'list'),
+            'keep_precision': options.get('keep_precision', False),
+        }
+        if 'output_variables' in inputs:
+            output_options['output_variables'] = cls.get_output_variables(inputs)
+
+        if isinstance(inputs['energies'], EnergiesData):
+            energies_checksum = get_checksum(io.BytesIO(inputs['energies'].get_content().encode('utf8')))
+        else:
+            with inputs['energies'].open(mode='rb') as handle:
+                energies_checksum = get_checksum(handle)
+        return get_cache_key([cls.render_mkm(values) for _, _, values in cls.get_models(inputs)], energies_checksum, output_options)
+
+    @staticmethod
+    def _write_mkm(handle, values):
+        """
+        Write the mkm setup file.
+
+        :param handle: text file handle to write to
+        :param values: dictionary of the mkm values, see `get_mkm_values`
+        """
+        handle.write(MKM_TEMPLATES['reaction'].format(**values))
+
+        ## Only related to electrochemistry
+        if values['electrocatal'] == True: #pylint: disable=singleton-comparison
+            if values['scaler'] == 'GeneralizedLinearScaler':
+                handle.write(MKM_TEMPLATES['generalized_linear_scaler'].format(**values))
+            else:
+                handle.write(MKM_TEMPLATES['thermodynamic_scaler'].format(**values))
+            handle.write(MKM_TEMPLATES['beta'].format(**values))
+            for val in values['electrochemical_thermo_mode']:
+                handle.write(MKM_TEMPLATES['electrochemical_thermo_mode'].format(val))
+
+        ## Write numerical data last
+        handle.write(MKM_TEMPLATES['numerical'].format(**values))
+
+    def _setup_db_record(self):
+        """
+        Set up the node of the calculation, with the key of the model it solves in the `catmap_cache_key` attribute.
+
+        The hash of the node is left to AiiDA and covers all the input nodes, while calculations that solve the same
+        model, even with differently formatted mkm files, are found by their attribute, see `find_cached_calculation`.
+
+        The key is deliberately not folded into the hash, e.g. in place of the inputs it covers: AiiDA 1.x loads the
+        nodes of all calculations as plain `CalcJobNode`, which a plugin cannot subclass, so the hash recomputed by
+        `verdi node rehash` would disagree with a hash that this class computed when storing the node.
+        """
+        super(CatMAPCalculation, self)._setup_db_record()
+        self.node.set_attribute('catmap_cache_key', self.get_cache_key(self.inputs))
 
     def prepare_for_submission(self, folder):
         """
@@ -90,58 +517,76 @@ class CatMAPCalculation(CalcJob):
             the calculation.
         :return: `aiida.common.datastructures.CalcInfo` instance
         """
+        mkm_filename = self.inputs.mkm_filename.value
+        models = self.get_models(self.inputs)
+        tiled = 'parallel_workers' in self.inputs or 'checkpoints' in self.inputs
+        variables = self.get_output_variables(self.inputs)
+        compress = self.inputs.metadata.options.compress_outputs
+        suffix = '.gz' if compress else ''
+        stream_filenames = []
+        if self.inputs.metadata.options.stream_maps:
+            stream_filenames = [
+                self.get_data_filename(self._STREAM_FILE_NAME, self.inputs, index) + suffix for index in range(len(models))
+            ]
+
+        # set up the mkm files, a single one unless the models are batched
+        for filename, _, values in models:
+            with folder.open(filename, 'w', encoding='utf8') as handle:
+                self._write_mkm(handle, values)
+
+        # write the run command, the models are run by the runner script
+        folder.insert_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runner.py'), self._RUNNER_FILE_NAME)
+        runner = os.path.splitext(self._RUNNER_FILE_NAME)[0]
+
+        # write the initial guess, the runner seeds the data file of every model with it
+        arguments = ''
+        if 'initial_guess' in self.inputs:
+            arguments = f", initial_guess='{self._INITIAL_GUESS_FILE_NAME}'"
+            descriptors, coverages = map_to_arrays(self.inputs.initial_guess)
+            with folder.open(self._INITIAL_GUESS_FILE_NAME, 'w', encoding='utf8') as handle:
+                json.dump({'descriptors': descriptors.tolist(), 'coverage': coverages.tolist()}, handle)
+
+        if 'profile' in self.inputs:
+            arguments += f", profile='{self.inputs.profile.value}'"
 
-        # set up the mkm file
-        with folder.open(self.inputs.mkm_filename.value, 'w', encoding='utf8') as handle:
-
-            ## Writing the reaction conditions
-            handle.write(f"scaler = '{self.inputs.scaler.value}' \n")
-            handle.write(f'rxn_expressions = {self.inputs.rxn_expressions.get_list()} \n')
-            handle.write(f'surface_names = {self.inputs.surface_names.get_list()} \n')
-            handle.write(f'descriptor_names = {self.inputs.descriptor_names.get_list()} \n')
-            handle.write(f'descriptor_ranges = {self.inputs.descriptor_ranges.get_list()} \n')
-            handle.write(f'resolution = {self.inputs.resolution.value} \n')
-            handle.write(f'temperature = {self.inputs.temperature.value} \n')
-            handle.write(f'species_definitions = {self.inputs.species_definitions.get_dict()} \n')
-            handle.write(f"data_file = '{self.inputs.data_file.value}' \n")
-            handle.write(f"input_file = '{self.inputs.energies.filename}' \n")
-            handle.write(f"gas_thermo_mode = '{self.inputs.gas_thermo_mode.value}' \n")
-            handle.write(f"adsorbate_thermo_mode = '{self.inputs.adsorbate_thermo_mode.value}' \n")
-            # handle.write('ideal_gas_params = {d} \n'.format(d=self.inputs.ideal_gas_params.get_dict()))
-            handle.write(f'scaling_constraint_dict = {self.inputs.scaling_constraint_dict.get_dict()} \n')
-
-            ## Only related to electrochemistry
-            if self.inputs.electrocatal.value == True: #pylint: disable=singleton-comparison
-                if self.inputs.scaler.value == 'GeneralizedLinearScaler': #pylint: disable=singleton-comparison
-                    handle.write(f'voltage = {self.inputs.voltage.value} \n')
-                    handle.write(f'pH = {self.inputs.pH.value} \n')
-
-                elif self.inputs.scaler.value != 'GeneralizedLinearScaler':
-                    handle.write(f"potential_reference_scale = '{self.inputs.potential_reference_scale.value}' \n")
-                    handle.write(f'extrapolated_potential = {self.inputs.extrapolated_potential.value} \n')
-                    handle.write(f'voltage_diff_drop = {self.inputs.voltage_diff_drop.value} \n')
-                    handle.write(f'sigma_input = {self.inputs.sigma_input.get_list()} \n')
-                    handle.write(f'Upzc = {self.inputs.Upzc.value} \n')
-
-                handle.write(f'beta = {self.inputs.beta.value} \n')
-                for val in self.inputs.electrochemical_thermo_mode.get_list():
-                    handle.write(f"electrochemical_thermo_mode = '{val}' \n")
-
-            ## Write numerical data last
-            handle.write(f'decimal_precision = {self.inputs.decimal_precision.value} \n')
-            handle.write(f'tolerance = {self.inputs.tolerance.value} \n')
-            handle.write(f'max_rootfinding_iterations = {self.inputs.max_rootfinding_iterations.value} \n')
-            handle.write(f'max_bisections = {self.inputs.max_bisections.value} \n')
-            handle.write(f"numerical_solver = '{self.inputs.numerical_solver.value}' \n")
-
-
-        # write the simplest run command
         with folder.open(self.options.input_filename, 'w', encoding='utf8') as handle:
-            handle.write('from catmap import ReactionModel \n')
-            handle.write(f"mkm_file = '{self.inputs.mkm_filename.value}' \n")
-            handle.write('model = ReactionModel(setup_file=mkm_file) \n')
-            handle.write("model.output_variables += ['production_rate'] \n")
-            handle.write('model.run() \n')
+            if 'batch_parameters' in self.inputs:
+                num_processes = self.inputs.metadata.options.resources.get('num_mpiprocs_per_machine', 1)
+                handle.write(f'models = {[(filename, labels) for filename, labels, _ in models]} \n')
+                function, arguments = 'run_batch', f'models, processes={num_processes}{arguments}'
+            elif tiled:
+                workers = self.inputs.parallel_workers.value if 'parallel_workers' in self.inputs else 1
+                if 'checkpoints' in self.inputs:
+                    arguments += f', tiles={self.inputs.checkpoints.value}'
+                function, arguments = 'run_tiled', f"'{mkm_filename}', '{self._LABELS_FILE_NAME}', workers={workers}{arguments}"
+            else:
+                function, arguments = 'run_model', f"'{mkm_filename}', '{self._LABELS_FILE_NAME}'{arguments}"
+
+            # hand the models over to a persistent worker, which falls back to running them in this process
+            worker_address = self.inputs.metadata.options.get('worker_address', None)
+            if worker_address is not None:
+                handle.write(f'from {runner} import {function}, submit \n')
+                handle.write(f"submit('{worker_address}', {function}, {arguments}) \n")
+            else:
+                handle.write(f'from {runner} import {function} \n')
+                handle.write(f'{function}({arguments}) \n')
+
+            # convert the data files into map streams that the parser reads one chunk at a time
+            if stream_filenames:
+                handle.write(f'from {runner} import write_map_stream \n')
+                for stream_filename, (_, _, values) in zip(stream_filenames, models):
+                    handle.write(
+                        f"write_map_stream('{values['data_file']}', '{stream_filename}', {variables}, "
+                        f"{values['decimal_precision']}{', compress=True' if compress else ''}) \n"
+                    )
+            # or compress the maps of the output variables
+            elif compress:
+                handle.write(f'from {runner} import compress_data_file \n')
+                for _, _, values in models:
+                    handle.write(
+                        f"compress_data_file('{values['data_file']}', '{values['data_file']}{suffix}', {variables}, "
+                        f"{values['decimal_precision']}) \n"
+                    )
 
         codeinfo = datastructures.CodeInfo()
         codeinfo.code_uuid = self.inputs.code.uuid
@@ -152,9 +597,40 @@ class CatMAPCalculation(CalcJob):
         # Prepare a `CalcInfo` to be returned to the engine
         calcinfo = datastructures.CalcInfo()
         calcinfo.codes_info = [codeinfo]
-        calcinfo.local_copy_list = [
-            (self.inputs.energies.uuid, self.inputs.energies.filename, self.inputs.energies.filename),
-        ]
-        calcinfo.retrieve_list = [self.metadata.options.output_filename, self.inputs.data_file.value]
+        calcinfo.local_copy_list = []
+        if isinstance(self.inputs.energies, EnergiesData):
+            with folder.open(self.inputs.energies.filename, 'w', encoding='utf8') as handle:
+                handle.write(self.inputs.energies.get_content())
+        else:
+            calcinfo.local_copy_list.append(
+                (self.inputs.energies.uuid, self.inputs.energies.filename, self.inputs.energies.filename)
+            )
+        calcinfo.retrieve_list = stream_filenames or [values['data_file'] + suffix for _, _, values in models]
+
+        # the log is only retrieved temporarily, for the parser, when the outputs are compressed
+        calcinfo.retrieve_temporary_list = []
+        if compress and not self.inputs.metadata.options.debug:
+            calcinfo.retrieve_temporary_list.append(self.metadata.options.output_filename)
+        else:
+            calcinfo.retrieve_list.insert(0, self.metadata.options.output_filename)
+        calcinfo.retrieve_list += [labels for _, labels, _ in models]
+        if 'profile' in self.inputs:
+            for filename, _, _ in models:
+                calcinfo.retrieve_list += list(self.get_profile_filenames(filename))
+
+        # the solved strips of a split grid are only left behind if the run was interrupted, and only needed by the
+        # parser to attach the partial results
+        if tiled:
+            stem = self.get_tile_prefix(mkm_filename)
+            calcinfo.retrieve_temporary_list += [f'{stem}_*.pickle', f'{stem}_*_labels.json']
+
+        # the solved strips of an interrupted calculation are reused
+        calcinfo.remote_copy_list = []
+        if 'parent_folder' in self.inputs:
+            calcinfo.remote_copy_list.append((
+                self.inputs.parent_folder.computer.uuid,
+                os.path.join(self.inputs.parent_folder.get_remote_path(), f'{self.get_tile_prefix(mkm_filename)}_*'),
+                '.',
+            ))
 
         return calcinfo
@@ -0,0 +1,659 @@
+"""
+Run script for CatMAP, copied as `catmap_runner.py` next to the input files of a `CatMAPCalculation`.
+
+This module is executed on the computer that runs CatMAP, where neither `aiida`
+nor `aiida_catmap` are necessarily installed: it may only import from the
+standard library and from CatMAP itself.
+"""
+import argparse
+import contextlib
+import cProfile
+import gzip
+import io
+import itertools
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import pstats
+import shutil
+import time
+import traceback
+
+## Decimals to which the descriptor points are rounded to identify the points of the grid
+DECIMALS = 10
+
+## Environment variable with the name of the file of the key shared by a persistent worker and its clients
+WORKER_KEY_VARIABLE = 'AIIDA_CATMAP_WORKER_KEY'
+WORKER_KEY_FILE = os.path.join(os.path.expanduser('~'), '.aiida-catmap-worker.key')
+
+
+def run_model(mkm_file, labels_file, initial_guess=None, profile=None):
+    """
+    Run a single CatMAP model.
+
+    The maps are written by CatMAP to the `data_file` of the model, the output
+    labels (species names of the maps) are dumped to `labels_file`.
+
+    :param mkm_file: name of the mkm setup file
+    :param labels_file: name of the JSON file to dump the output labels to
+    :param initial_guess: optional name of the JSON file with the coverage map to start the root finding from
+    :param profile: optional profiling mode, `timers` or `cprofile`, see `Profiler`
+    """
+    from catmap import ReactionModel
+
+    values = read_mkm(mkm_file)
+    if initial_guess is not None:
+        seed_data_file(initial_guess, values['data_file'], values.get('decimal_precision', 15))
+
+    profiler = Profiler(profile)
+    with profiler.phase('setup'):
+        model = ReactionModel(setup_file=mkm_file)
+    model.output_variables += ['production_rate']
+
+    if profile is not None:
+        profiler.instrument(getattr(model, 'scaler', None), 'get_rxn_parameters', 'scaler')
+        profiler.instrument(getattr(model, 'solver', None), 'get_coverage', 'root_finding', per_point=True)
+        profiler.count_residuals(getattr(model, 'solver', None))
+    with profiler.phase('run'):
+        model.run()
+
+    with profiler.phase('labels'):
+        with open(labels_file, 'w') as handle:
+            json.dump(getattr(model, 'output_labels', {}), handle, default=str)
+
+    if profile is not None:
+        profiler.dump(mkm_file, get_grid(values['descriptor_ranges'], values['resolution']))
+
+
+def read_mkm(mkm_file):
+    """
+    Return the values set in an mkm setup file.
+
+    :param mkm_file: name of the mkm setup file
+    :return: dictionary of the variables assigned in the file
+    """
+    namespace = {}
+    with open(mkm_file) as handle:
+        exec(handle.read(), namespace)  # pylint: disable=exec-used
+    return {key: value for key, value in namespace.items() if not key.startswith('__')}
+
+
+def get_grid(descriptor_ranges, resolution):
+    """
+    Return the points of the descriptor grid, the first descriptor varying slowest.
+
+    :param descriptor_ranges: list of `[start, stop]` pairs, one per descriptor
+    :param resolution: number of points along every descriptor, or a list with one number per descriptor
+    :return: list of the descriptor points
+    """
+    if isinstance(resolution, int):
+        resolution = [resolution] * len(descriptor_ranges)
+
+    axes = []
+    for (start, stop), number in zip(descriptor_ranges, resolution):
+        step = (stop - start) / (number - 1) if number > 1 else 0.
+        axes.append([stop if index == number - 1 and number > 1 else start + index * step for index in range(number)])
+    return [list(point) for point in itertools.product(*axes)]
+
+
+def seed_data_file(initial_guess, data_file, precision):
+    """
+    Write the coverage map of an initial guess to the data file of a model.
+
+    CatMAP loads an existing data file on start, and its coverage map is used
+    as the initial guess of the root finding at the descriptor points it contains.
+
+    :param initial_guess: name of the JSON file with the `descriptors` and `coverage` of the initial guess
+    :param data_file: name of the data file of the model
+    :param precision: decimal precision of the model
+    """
+    import mpmath
+
+    with open(initial_guess) as handle:
+        guess = json.load(handle)
+
+    with mpmath.workdps(precision):
+        coverage_map = [
+            [point, [mpmath.mpf(value) for value in values]]
+            for point, values in zip(guess['descriptors'], guess['coverage'])
+        ]
+        with open(data_file, 'wb') as handle:
+            pickle.dump({'coverage_map': coverage_map}, handle)
+
+
+def get_tiles(descriptor_ranges, resolution, num_tiles):
+    """
+    Split the descriptor grid into strips along the first descriptor.
+
+    The points of every strip coincide with points of the full grid, so that
+    the maps of the strips together are the map of the full grid.
+
+    :param descriptor_ranges: list of `[start, stop]` pairs, one per descriptor
+    :param resolution: number of points along each descriptor
+    :param num_tiles: requested number of strips, at most `resolution`
+    :return: list of `(descriptor_ranges, resolution)` tuples, one per strip
+    """
+    num_tiles = max(1, min(num_tiles, resolution))
+    start, stop = descriptor_ranges[0]
+    step = (stop - start) / (resolution - 1) if resolution > 1 else 0.
+
+    tiles = []
+    for tile in range(num_tiles):
+        first = tile * resolution // num_tiles
+        last = (tile + 1) * resolution // num_tiles - 1
+        tile_range = [start + first * step, stop if last == resolution - 1 else start + last * step]
+        tile_resolution = [last - first + 1] + [resolution] * (len(descriptor_ranges) - 1)
+        tiles.append(([tile_range] + list(descriptor_ranges[1:]), tile_resolution))
+    return tiles
+
+
+def merge_data_files(data_files, data_file, precision):
+    """
+    Merge the pickle files of the strips of a grid into a single pickle file.
+
+    The `<variable>_map` entries are concatenated, all other entries are taken from the first file.
+
+    :param data_files: names of the pickle files of the strips, in grid order
+    :param data_file: name of the merged pickle file
+    :param precision: decimal precision of the model, the mpmath values are rounded to it on unpickling
+    """
+    import mpmath
+
+    merged = {}
+    with mpmath.workdps(precision):
+        for filename in data_files:
+            with open(filename, 'rb') as handle:
+                data = pickle.load(handle)
+            for key, value in data.items():
+                if key.endswith('_map') and key in merged:
+                    merged[key] = merged[key] + list(value)
+                else:
+                    merged.setdefault(key, value)
+        with open(data_file, 'wb') as handle:
+            pickle.dump(merged, handle)
+
+
+def run_tiled(mkm_file, labels_file, workers, initial_guess=None, tiles=None, profile=None):  # pylint: disable=too-many-arguments,too-many-locals
+    """
+    Run a single CatMAP model with its descriptor grid split over a pool of worker processes.
+
+    Every strip of the grid is solved as a separate model with its own mkm and
+    data file, the maps are then merged into the `data_file` of the model.
+
+    The data file of a strip doubles as a checkpoint: a strip is solved once
+    its labels file is written, and strips that are already solved with the
+    same mkm file, e.g. copied from the working directory of an interrupted
+    calculation, are not solved again. The data files of the strips are
+    removed once they are merged.
+
+    :param mkm_file: name of the mkm setup file
+    :param labels_file: name of the JSON file to dump the output labels to
+    :param workers: number of worker processes
+    :param initial_guess: optional name of the JSON file with the coverage map to start the root finding from
+    :param tiles: optional number of strips, by default one per worker
+    :param profile: optional profiling mode, the strips are profiled separately and their timings are included in
+        those of the model, see `Profiler`
+    """
+    values = read_mkm(mkm_file)
+    stem = os.path.splitext(mkm_file)[0]
+
+    with open(mkm_file) as handle:
+        setup = handle.read()
+
+    models = []
+    data_files = []
+    tile_labels_files = []
+    for index, (descriptor_ranges, resolution) in enumerate(get_tiles(values['descriptor_ranges'], values['resolution'], tiles or workers)):
+        tile_mkm_file = f'{stem}_tile_{index}.mkm'
+        data_files.append(f'{stem}_tile_{index}.pickle')
+        tile_labels_files.append(f'{stem}_tile_{index}_labels.json')
+        tile_setup = setup + (
+            f'descriptor_ranges = {descriptor_ranges} \n'
+            f'resolution = {resolution} \n'
+            f"data_file = '{data_files[-1]}' \n"
+        )
+        if is_solved(tile_mkm_file, tile_setup, data_files[-1], tile_labels_files[-1]):
+            print(f'strip {index} of the descriptor grid already solved', flush=True)
+            continue
+        with open(tile_mkm_file, 'w') as handle:
+            handle.write(tile_setup)
+        models.append((tile_mkm_file, tile_labels_files[-1]))
+
+    ## The strips profile themselves, a profiler cannot be enabled while another one is
+    profiler = Profiler(None if profile is None else 'timers')
+    with profiler.phase('solve'):
+        run_batch(models, workers, initial_guess, profile)
+
+    missing = [filename for filename, labels in zip(data_files, tile_labels_files) if not os.path.isfile(labels)]
+    if missing:
+        raise RuntimeError(f'the strips {missing} of the descriptor grid were not solved')
+
+    with profiler.phase('merge'):
+        merge_data_files(data_files, values['data_file'], values.get('decimal_precision', 15))
+        shutil.copyfile(tile_labels_files[0], labels_file)
+    for filename in data_files:
+        os.remove(filename)
+
+    if profile is not None:
+        profiler.dump(mkm_file, parts=[f'{stem}_tile_{index}.mkm' for index in range(len(data_files))])
+
+
+def is_solved(mkm_file, setup, data_file, labels_file):
+    """
+    Return whether a model has already been solved with the given mkm setup.
+
+    :param mkm_file: name of the mkm setup file of the model
+    :param setup: content that the mkm setup file should have
+    :param data_file: name of the data file of the model
+    :param labels_file: name of the labels file, which is only written once the model is solved
+    """
+    if not all(os.path.isfile(filename) for filename in (mkm_file, data_file, labels_file)):
+        return False
+    with open(mkm_file) as handle:
+        return handle.read() == setup
+
+
+def write_map_stream(data_file, stream_file, variables, precision, chunk_size=10000, compress=False):  # pylint: disable=too-many-arguments
+    """
+    Write the maps of a data file as a stream of chunks that can be read back one chunk at a time.
+
+    For every variable a `(variable, n_points)` header is pickled, with `n_points`
+    None if the map is absent, followed by the `[descriptor_point, values]` pairs
+    of the map in chunks of `chunk_size`. Nothing is written if the data file is
+    absent, e.g. because its model failed.
+
+    :param data_file: name of the data file of the model
+    :param stream_file: name of the stream file
+    :param variables: names of the output variables, e.g. `coverage`
+    :param precision: decimal precision of the model, the mpmath values are rounded to it on unpickling
+    :param chunk_size: number of points per chunk
+    :param compress: compress the stream with gzip
+    """
+    import mpmath
+
+    if not os.path.isfile(data_file):
+        return
+
+    with mpmath.workdps(precision):
+        with open(data_file, 'rb') as handle:
+            data = pickle.load(handle)
+        with (gzip.open if compress else open)(stream_file, 'wb') as handle:
+            for variable in variables:
+                raw_map = data.get(f'{variable}_map')
+                pickle.dump((variable, None if raw_map is None else len(raw_map)), handle)
+                for start in range(0, len(raw_map or []), chunk_size):
+                    pickle.dump(list(raw_map[start:start + chunk_size]), handle)
+
+
+def compress_data_file(data_file, compressed_file, variables, precision):
+    """
+    Write the maps of the given output variables of a data file to a gzip compressed pickle.
+
+    Nothing is written if the data file is absent, e.g. because its model failed.
+
+    :param data_file: name of the data file of the model
+    :param compressed_file: name of the compressed data file
+    :param variables: names of the output variables whose maps are kept, e.g. `coverage`
+    :param precision: decimal precision of the model, the mpmath values are rounded to it on unpickling
+    """
+    import mpmath
+
+    if not os.path.isfile(data_file):
+        return
+
+    with mpmath.workdps(precision):
+        with open(data_file, 'rb') as handle:
+            data = pickle.load(handle)
+        maps = {f'{variable}_map': data[f'{variable}_map'] for variable in variables if f'{variable}_map' in data}
+        del data
+        with gzip.open(compressed_file, 'wb') as handle:
+            pickle.dump(maps, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _get_point(descriptors):
+    """Return a descriptor point as a hashable tuple of rounded floats, or None if it is not a point."""
+    try:
+        return tuple(round(float(value), DECIMALS) for value in descriptors)
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_statistics(counts):
+    """Return the total, mean and maximum of a list of counts, or None if it is empty."""
+    if not counts:
+        return None
+    return {'total': sum(counts), 'mean': sum(counts) / len(counts), 'max': max(counts)}
+
+
+class Profiler:
+    """
+    Timers of the phases of a CatMAP run and counters of its root finding, dumped to `<stem>_timings.json`.
+
+    The root finding is counted per descriptor point: the calls to the solver,
+    which are repeated at a point when the bisection of the grid passes through
+    it, and the evaluations of the steady state residual that the solver passes
+    to its root finding. The points that are not on the grid are the
+    intermediate points of the bisection. The counts that cannot be taken
+    because the model lacks the instrumented methods, e.g. in another version
+    of CatMAP, are listed as `unavailable` and dumped as None instead of zeros.
+    In the `cprofile` mode the phases are also profiled, and the statistics are
+    dumped to `<stem>.pstats`. Without a mode nothing is timed.
+    """
+
+    def __init__(self, mode=None):
+        """
+        :param mode: profiling mode, `timers` or `cprofile`, or None
+        """
+        self.mode = mode
+        self.timings = {}
+        self.calls = {}
+        self.points = {}
+        self._point = None
+        self._depth = {}
+        self.unavailable = []
+        self._profile = cProfile.Profile() if mode == 'cprofile' else None
+
+    def _add_time(self, name, start):
+        """Add the time elapsed since `start` to the timer `name`."""
+        self.timings[name] = self.timings.get(name, 0.) + time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a phase of the run, and profile it in the `cprofile` mode."""
+        if self.mode is None:
+            yield
+            return
+        start = time.perf_counter()
+        if self._profile is not None:
+            self._profile.enable()
+        try:
+            yield
+        finally:
+            if self._profile is not None:
+                self._profile.disable()
+            self._add_time(name, start)
+
+    def instrument(self, owner, method, name, per_point=False):
+        """
+        Replace a method of an object by a wrapper that times and counts its calls.
+
+        If the object does not have the method, e.g. in another version of CatMAP, the timer is listed as unavailable.
+
+        :param owner: object whose method is instrumented, e.g. the solver of the model, or None
+        :param method: name of the method
+        :param name: name of the timer
+        :param per_point: count the calls per descriptor point, the first argument of the method
+        """
+        function = getattr(owner, method, None)
+        if function is None:
+            self.unavailable.append(name)
+            return
+
+        def wrapper(*args, **kwargs):
+            outer = self._point
+            if per_point and args:
+                self._point = _get_point(args[0])
+                if self._point is not None:
+                    self.points.setdefault(self._point, [0, 0])[0] += 1
+            self.calls[name] = self.calls.get(name, 0) + 1
+            depth = self._depth.get(name, 0)
+            self._depth[name] = depth + 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._depth[name] = depth
+                if depth == 0:
+                    self._add_time(name, start)
+                self._point = outer
+
+        setattr(owner, method, wrapper)
+
+    def count_residuals(self, solver):
+        """
+        Count the evaluations of the steady state residual per descriptor point, see `instrument` for the points.
+
+        CatMAP solves every point with `get_steady_state_coverage(rxn_parameters, steady_state_fn, jacobian_fn, ...)`
+        of its solver, whose `steady_state_fn` argument is the residual that the root finding evaluates. The method is
+        replaced by a wrapper that passes a counting `steady_state_fn` instead. If the solver does not have the method,
+        the residual evaluations are listed as unavailable.
+
+        :param solver: the solver of the model, or None
+        """
+        function = getattr(solver, 'get_steady_state_coverage', None)
+        if function is None:
+            self.unavailable.append('residual_evaluations')
+            return
+
+        def count(steady_state_fn):
+            def counted(*args, **kwargs):
+                if self._point is not None:
+                    self.points.setdefault(self._point, [0, 0])[1] += 1
+                return steady_state_fn(*args, **kwargs)
+            return counted
+
+        def wrapper(*args, **kwargs):
+            if 'steady_state_fn' in kwargs:
+                kwargs['steady_state_fn'] = count(kwargs['steady_state_fn'])
+            elif len(args) > 1:
+                args = (args[0], count(args[1])) + args[2:]
+            return function(*args, **kwargs)
+
+        setattr(solver, 'get_steady_state_coverage', wrapper)
+
+    def dump(self, mkm_file, grid=None, parts=()):
+        """
+        Write the timings, and the cProfile statistics in the `cprofile` mode.
+
+        :param mkm_file: name of the mkm setup file of the model, the files are named after it
+        :param grid: optional descriptor points of the grid of the model, to count the root finding per point
+        :param parts: mkm setup files of the models that the run was split into, e.g. the strips of a grid,
+            whose timings and statistics are included and then removed
+        """
+        stem = os.path.splitext(mkm_file)[0]
+        timings = {'mode': self.mode, 'seconds': self.timings, 'calls': self.calls, 'unavailable': self.unavailable}
+
+        if grid is not None and 'root_finding' in self.unavailable:
+            timings['points'] = timings['root_finding_calls'] = timings['residual_evaluations'] = None
+        elif grid is not None:
+            grid = {_get_point(point) for point in grid}
+            solved = [point for point in self.points if point in grid]
+            timings['points'] = {'grid': len(grid), 'solved': len(solved), 'bisection': len(self.points) - len(solved)}
+            timings['root_finding_calls'] = _get_statistics([calls for calls, _ in self.points.values()])
+            timings['residual_evaluations'] = None
+            if 'residual_evaluations' not in self.unavailable:
+                timings['residual_evaluations'] = _get_statistics([evaluations for _, evaluations in self.points.values()])
+
+        statistics = []
+        if self._profile is not None:
+            self._profile.create_stats()
+            if self._profile.stats:
+                statistics.append(pstats.Stats(self._profile))
+
+        if parts:
+            timings['parts'] = []
+            for part in parts:
+                part_stem = os.path.splitext(part)[0]
+                part_timings = None
+                if os.path.isfile(f'{part_stem}_timings.json'):
+                    with open(f'{part_stem}_timings.json') as handle:
+                        part_timings = json.load(handle)
+                    os.remove(f'{part_stem}_timings.json')
+                timings['parts'].append(part_timings)
+                if os.path.isfile(f'{part_stem}.pstats'):
+                    statistics.append(pstats.Stats(f'{part_stem}.pstats'))
+                    os.remove(f'{part_stem}.pstats')
+
+        with open(f'{stem}_timings.json', 'w') as handle:
+            json.dump(timings, handle)
+
+        if statistics:
+            statistics[0].add(*statistics[1:])
+            statistics[0].dump_stats(f'{stem}.pstats')
+
+
+def _run_model_safe(mkm_file, labels_file, initial_guess=None, profile=None):
+    """Run a single CatMAP model, returning the traceback instead of raising."""
+    try:
+        run_model(mkm_file, labels_file, initial_guess, profile)
+    except Exception:  # pylint: disable=broad-except
+        return traceback.format_exc()
+    return None
+
+
+def run_batch(models, processes=1, initial_guess=None, profile=None):
+    """
+    Run several CatMAP models, in a pool of `processes` worker processes.
+
+    A failing model does not stop the others, its traceback is printed and
+    its data file is simply not written.
+
+    :param models: list of `(mkm_file, labels_file)` tuples
+    :param processes: number of worker processes
+    :param initial_guess: optional name of the JSON file with the coverage map to start the root finding from
+    :param profile: optional profiling mode of every model, see `Profiler`
+    """
+    processes = max(1, min(processes, len(models)))
+    arguments = [(mkm_file, labels_file, initial_guess, profile) for mkm_file, labels_file in models]
+    if processes > 1:
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            errors = pool.starmap(_run_model_safe, arguments, chunksize=1)
+    else:
+        errors = [_run_model_safe(*argument) for argument in arguments]
+
+    for (mkm_file, _), error in zip(models, errors):
+        if error is not None:
+            print(f'CatMAP model {mkm_file} failed:\n{error}', flush=True)
+
+
+## Functions that a persistent worker runs on behalf of its clients
+WORKER_FUNCTIONS = ('run_model', 'run_tiled', 'run_batch')
+
+
+def get_worker_address(address):
+    """
+    Return the address of a persistent worker in the form expected by `multiprocessing.connection`.
+
+    :param address: path of a Unix socket, or `host:port` of a TCP socket
+    :return: the path, or a `(host, port)` tuple
+    """
+    if not address.startswith(os.sep) and ':' in address:
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address
+
+
+def get_worker_key(create=False):
+    """
+    Return the key that authenticates the clients of a persistent worker.
+
+    The key is read from the file named by the `AIIDA_CATMAP_WORKER_KEY` environment variable, by default
+    `~/.aiida-catmap-worker.key`, which is only readable by its owner.
+
+    :param create: create the file with a random key if it does not exist
+    :return: the key as bytes, or None if the file does not exist
+    """
+    filename = os.environ.get(WORKER_KEY_VARIABLE, WORKER_KEY_FILE)
+    if not os.path.isfile(filename):
+        if not create:
+            return None
+        with open(os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as handle:
+            handle.write(os.urandom(32).hex().encode('ascii'))
+    with open(filename, 'rb') as handle:
+        return handle.read().strip()
+
+
+def _handle_request(connection):
+    """Run the request of a client of a persistent worker in its working directory and send back the output."""
+    with connection:
+        function, directory, args, kwargs = connection.recv()
+        output = io.StringIO()
+        if function not in WORKER_FUNCTIONS:
+            connection.send(('', f'{function} is not one of {WORKER_FUNCTIONS}'))
+            return
+        try:
+            os.chdir(directory)
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                globals()[function](*args, **kwargs)
+        except Exception:  # pylint: disable=broad-except
+            connection.send((output.getvalue(), traceback.format_exc()))
+        else:
+            connection.send((output.getvalue(), None))
+
+
+def serve(address):
+    """
+    Run a persistent worker that solves the models of its clients, see `submit`.
+
+    CatMAP and its dependencies are imported once, every request is then run in a process forked from the worker,
+    which inherits the imported modules instead of starting a new interpreter. The clients authenticate with the
+    key of `get_worker_key`, which is created if it does not exist yet.
+
+    :param address: path of a Unix socket, or `host:port` of a TCP socket, to listen on
+    """
+    import catmap  # pylint: disable=unused-import
+
+    authkey = get_worker_key(create=True)
+    address = get_worker_address(address)
+    context = multiprocessing.get_context('fork')
+    processes = []
+
+    with multiprocessing.connection.Listener(address, authkey=authkey) as listener:
+        if isinstance(address, str):
+            os.chmod(address, 0o600)
+        print(f'CatMAP worker listening on {listener.address}', flush=True)
+        while True:
+            try:
+                connection = listener.accept()
+            except multiprocessing.AuthenticationError:
+                print('CatMAP worker rejected a client with the wrong key', flush=True)
+                continue
+            process = context.Process(target=_handle_request, args=(connection,))
+            process.start()
+            connection.close()
+            processes = [process for process in processes if process.is_alive()] + [process]
+
+
+def submit(address, function, *args, **kwargs):
+    """
+    Run a function of the runner in the persistent worker at `address`, or in this process if there is none.
+
+    The function is run in the current working directory, its output is printed once it returns.
+
+    :param address: address of the worker, see `get_worker_address`
+    :param function: one of `run_model`, `run_tiled` and `run_batch`
+    :param args: positional arguments of the function
+    :param kwargs: keyword arguments of the function
+    :raises RuntimeError: if the function failed in the worker
+    """
+    authkey = get_worker_key()
+    try:
+        if authkey is None:
+            raise FileNotFoundError('the key of the worker does not exist')
+        connection = multiprocessing.connection.Client(get_worker_address(address), authkey=authkey)
+    except (OSError, multiprocessing.AuthenticationError) as exception:
+        print(f'CatMAP worker at {address} not available, running in this process: {exception}', flush=True)
+        function(*args, **kwargs)
+        return
+
+    with connection:
+        connection.send((function.__name__, os.getcwd(), args, kwargs))
+        output, error = connection.recv()
+
+    print(output, end='', flush=True)
+    if error is not None:
+        raise RuntimeError(f'{function.__name__} failed in the CatMAP worker:\n{error}')
+
+
+def main():
+    """Run a persistent worker, see `serve`."""
+    parser = argparse.ArgumentParser(description='Persistent worker that runs CatMAP models for CatMAPCalculations.')
+    parser.add_argument('command', choices=['serve'])
+    parser.add_argument('address', help='path of a Unix socket, or host:port of a TCP socket, to listen on')
+    serve(parser.parse_args().address)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Data types provided by aiida_catmap.
+
+Register data types via the "aiida.data" entry point in setup.json.
+"""
+import io
+import re
+import numpy
+from aiida.orm import ArrayData
+
+## Columns of the energies table that CatMAP needs, any other columns are kept as text
+REQUIRED_COLUMNS = ('surface_name', 'site_name', 'species_name', 'formation_energy')
+
+## Gas species that CatMAP defines itself, the proton-electron pair and the electron of electrochemical reactions
+PSEUDO_GASES = ('pe', 'ele')
+
+
+def parse_energies(content):
+    """
+    Parse the tab-separated energies table read by CatMAP.
+
+    :param content: content of the energies file, the first line being the header
+    :returns: dictionary of the columns in header order, `formation_energy` as floats and all other columns as strings
+    :raises ValueError: if the table is malformed
+    """
+    lines = [line for line in content.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError('the energies table is empty')
+
+    header = lines[0].split('\t')
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f'the energies table does not have the columns {missing}')
+    if not all(header):
+        raise ValueError('the energies table has a column without a name')
+    duplicates = sorted({column for column in header if header.count(column) > 1})
+    if duplicates:
+        raise ValueError(f'the energies table has the duplicate columns {duplicates}')
+
+    columns = {column: [] for column in header}
+    for number, line in enumerate(lines[1:], start=2):
+        fields = line.split('\t')
+        if len(fields) != len(header):
+            raise ValueError(f'line {number} of the energies table has {len(fields)} fields, expected {len(header)}')
+        for column, field in zip(header, fields):
+            columns[column].append(field)
+
+    try:
+        columns['formation_energy'] = [float(value) for value in columns['formation_energy']]
+    except ValueError as exception:
+        raise ValueError(f'invalid formation energy in the energies table: {exception}') from exception
+
+    return columns
+
+
+def get_gas_species(rxn_expressions):
+    """
+    Return the names of the gas species of the reaction expressions, e.g. `CO` for `CO_g`.
+
+    :param rxn_expressions: list of reaction expressions such as `'*_s + CO_g -> CO*'`
+    :returns: set of the names of the gas species
+    """
+    species = set()
+    for expression in rxn_expressions:
+        for state in re.split('<?->', expression):
+            for term in state.split('+'):
+                term = term.strip().lstrip('0123456789')
+                if term.endswith('_g'):
+                    species.add(term[:-len('_g')])
+    return species
+
+
+def get_site_names(rxn_expressions):
+    """
+    Return the names of the adsorption sites of the reaction expressions, e.g. `s` for `*_s` and `CO*`.
+
+    :param rxn_expressions: list of reaction expressions such as `'*_s + CO_g -> CO*'`
+    :returns: set of the names of the sites, always including the default site `s`
+    """
+    sites = {'s'}
+    for expression in rxn_expressions:
+        for state in re.split('<?->', expression):
+            for term in state.split('+'):
+                term = term.strip()
+                if '_' in term and not term.endswith('_g'):
+                    sites.add(term.rsplit('_', 1)[1])
+    return sites
+
+
+def validate_energies(columns, surface_names, rxn_expressions, descriptor_names, scaler='GeneralizedLinearScaler'):
+    """
+    Check that the energies table has the entries that a model needs.
+
+    All the gas species of the reaction expressions need a gas phase energy,
+    except the pseudo-gases that CatMAP defines itself, e.g. `pe_g`.
+    With the `GeneralizedLinearScaler` the descriptors are the energies of
+    adsorbates, so every surface needs an energy for each of the descriptors
+    that name a species on a site of the reaction expressions, e.g. `O_s`.
+    Other descriptors, e.g. a d-band center, are not in the table.
+
+    :param columns: columns of the energies table, see `parse_energies`
+    :param surface_names: names of the surfaces of the model
+    :param rxn_expressions: reaction expressions of the model
+    :param descriptor_names: names of the descriptors of the model, e.g. `O_s`
+    :param scaler: name of the scaler of the model
+    :returns: an error message, or None if the table is complete
+    """
+    entries = set(zip(columns['surface_name'], columns['site_name'], columns['species_name']))
+    surface_species = {(surface, species) for surface, _, species in entries}
+
+    missing_surfaces = sorted(set(surface_names).difference(columns['surface_name']))
+    if missing_surfaces:
+        return f'the surfaces {missing_surfaces} are not in the energies table'
+
+    missing_gases = sorted(
+        species for species in get_gas_species(rxn_expressions).difference(PSEUDO_GASES)
+        if ('None', 'gas', species) not in entries
+    )
+    if missing_gases:
+        return f'the gas species {missing_gases} are not in the energies table'
+
+    if scaler != 'GeneralizedLinearScaler':
+        return None
+
+    sites = get_site_names(rxn_expressions)
+    descriptor_species = [
+        name.rsplit('_', 1)[0] for name in descriptor_names if '_' in name and name.rsplit('_', 1)[1] in sites
+    ]
+    missing = sorted(
+        f'{species} on {surface}' for surface in surface_names for species in descriptor_species
+        if (surface, species) not in surface_species
+    )
+    if missing:
+        return f'the descriptor energies {missing} are not in the energies table'
+
+
+class EnergiesData(ArrayData):
+    """
+    Energies table of CatMAP, parsed and validated when it is created.
+
+    Every column of the table is stored as an array, the formation energies as
+    float64 and all other columns as strings, which keeps the node compact and
+    its hash independent of the formatting of the text file. The arrays are
+    named by the position of their column, since the names of arrays are more
+    restricted than those of columns, see `get_column`. The text file that
+    CatMAP reads is regenerated from the arrays with `get_content`.
+    """
+
+    def __init__(self, file=None, filename=None, **kwargs):  # pylint: disable=redefined-builtin
+        """
+        Construct a new instance and set the table from the content of `file`.
+
+        :param file: optional absolute path to a file or a filelike object of the energies table
+        :param filename: optional name of the file that CatMAP reads, by default the name of `file` or `energies.txt`
+        """
+        super(EnergiesData, self).__init__(**kwargs)
+        if file is not None:
+            self.set_file(file, filename)
+
+    @property
+    def filename(self):
+        """Return the name of the energies file that CatMAP reads."""
+        return self.get_attribute('filename')
+
+    @property
+    def columns(self):
+        """Return the names of the columns, in the order of the table."""
+        return self.get_attribute('columns')
+
+    @property
+    def surface_names(self):
+        """Return the sorted names of the surfaces in the table, without the gas phase."""
+        return self.get_attribute('surface_names')
+
+    @property
+    def species_names(self):
+        """Return the sorted names of the species in the table."""
+        return self.get_attribute('species_names')
+
+    def set_file(self, file, filename=None):  # pylint: disable=redefined-builtin
+        """
+        Parse the energies table and store its columns.
+
+        :param file: absolute path to a file or a filelike object of the energies table
+        :param filename: optional name of the file that CatMAP reads, by default the name of `file` or `energies.txt`
+        :raises ValueError: if the table is malformed
+        """
+        import os
+
+        if isinstance(file, str):
+            filename = filename or os.path.basename(file)
+            with open(file, 'r', encoding='utf8') as handle:
+                content = handle.read()
+        else:
+            content = file.read()
+            filename = filename or os.path.basename(getattr(file, 'name', '') or 'energies.txt')
+        if isinstance(content, bytes):
+            content = content.decode('utf8')
+
+        columns = parse_energies(content)
+        for index, (column, values) in enumerate(columns.items()):
+            dtype = numpy.float64 if column == 'formation_energy' else str
+            self.set_array(f'column_{index}', numpy.array(values, dtype=dtype))
+
+        self.set_attribute('filename', filename)
+        self.set_attribute('columns', list(columns))
+        self.set_attribute('surface_names', sorted(set(columns['surface_name']).difference(['None'])))
+        self.set_attribute('species_names', sorted(set(columns['species_name'])))
+
+    def get_column(self, name):
+        """
+        Return a column of the table.
+
+        :param name: name of the column, e.g. `formation_energy`
+        :returns: the array of the column
+        :raises KeyError: if the table does not have the column
+        """
+        if name not in self.columns:
+            raise KeyError(f'the energies table does not have the column `{name}`')
+        return self.get_array(f'column_{self.columns.index(name)}')
+
+    def get_columns(self):
+        """
+        Return the columns of the table.
+
+        :returns: dictionary of the columns in table order, see `parse_energies`
+        """
+        return {column: self.get_column(column).tolist() for column in self.columns}
+
+    def get_content(self):
+        """
+        Return the energies table as the tab-separated text that CatMAP reads.
+
+        :returns: the content of the energies file
+        """
+        columns = self.get_columns()
+        columns['formation_energy'] = [repr(value) for value in columns['formation_energy']]
+
+        handle = io.StringIO()
+        handle.write('\t'.join(columns) + '\n')
+        for row in zip(*columns.values()):
+            handle.write('\t'.join(row) + '\n')
+        return handle.getvalue()
@@ -0,0 +1,135 @@
+"""
+Mock of CatMAP to test the submission, retrieval and parsing of `CatMAPCalculation`s without the real solver.
+
+The `aiida-catmap-mock` executable is a drop-in replacement for the Python
+interpreter of a CatMAP code: it runs the job script that it reads from the
+standard input with `catmap.ReactionModel` replaced by `MockReactionModel`,
+so the run script of the calculation is used as is. The mock model writes
+synthetic maps on the descriptor grid of the mkm file in milliseconds.
+"""
+import itertools
+import os
+import pickle
+import sys
+import types
+from aiida_catmap.calculations.runner import get_grid, read_mkm
+
+
+def get_species(rxn_expressions):
+    """
+    Return the adsorbates and the gas species of the reaction expressions.
+
+    :param rxn_expressions: list of reaction expressions such as `'*_s + CO_g -> CO*'`
+    :return: tuple of the sorted adsorbates, e.g. `CO_s`, and the sorted gas species, e.g. `CO_g`
+    """
+    adsorbates = set()
+    gases = set()
+    for expression in rxn_expressions:
+        states = expression.replace('<->', '->').split('->')
+        for term in itertools.chain.from_iterable(state.split('+') for state in (states[0], states[-1])):
+            term = term.strip().lstrip('0123456789')
+            if term.endswith('_g'):
+                gases.add(term)
+            elif not term.startswith('*'):
+                adsorbates.add(term.replace('*', '_s'))
+    return sorted(adsorbates), sorted(gases)
+
+
+class MockSolver:
+    """Stand-in for the solver of `catmap.ReactionModel`, whose coverages are the roots of trivial residuals."""
+
+    def get_coverage(self, descriptors, n_species):
+        """
+        Return the synthetic coverages at a descriptor point, solved by `get_steady_state_coverage` as the real solver does.
+
+        :param descriptors: descriptor point
+        :param n_species: number of adsorbates
+        :return: list of the coverages
+        """
+        targets = [MockReactionModel.get_value(descriptors, index) for index in range(n_species)]
+        return self.get_steady_state_coverage(targets, self.steady_state_function, None, [0.5] * n_species)
+
+    @staticmethod
+    def steady_state_function(coverages, rxn_parameters):
+        """Return the residuals of the coverages, which vanish at the synthetic values `rxn_parameters`."""
+        return [coverage - target for coverage, target in zip(coverages, rxn_parameters)]
+
+    @staticmethod
+    def get_steady_state_coverage(rxn_parameters, steady_state_fn, jacobian_fn, c0=None, findrootArgs=None):  # pylint: disable=invalid-name,unused-argument
+        """
+        Return the roots of the residuals found by `mpmath.findroot`, with the signature of the method of CatMAP.
+
+        :param rxn_parameters: synthetic values of the coverages
+        :param steady_state_fn: function of the coverages and `rxn_parameters` returning the residuals
+        :param jacobian_fn: unused
+        :param c0: initial guess of the coverages
+        :param findrootArgs: unused
+        :return: list of the coverages
+        """
+        import mpmath
+        return [
+            mpmath.findroot(lambda x, index=index: steady_state_fn([x] * len(c0), rxn_parameters)[index], c0[index])
+            for index in range(len(c0))
+        ]
+
+
+class MockReactionModel:
+    """Stand-in for `catmap.ReactionModel` that writes synthetic maps instead of solving the model."""
+
+    def __init__(self, setup_file):
+        """
+        Read the mkm setup file.
+
+        :param setup_file: name of the mkm setup file
+        """
+        self.__dict__.update(read_mkm(setup_file))
+        self.output_variables = ['coverage', 'rate']
+        self.output_labels = {}
+        self.solver = MockSolver()
+
+    def run(self):
+        """Write the maps of the output variables to the data file of the model."""
+        import mpmath
+
+        adsorbates, gases = get_species(self.rxn_expressions)
+        labels = {'coverage': adsorbates, 'rate': list(self.rxn_expressions), 'production_rate': gases}
+        points = get_grid(self.descriptor_ranges, self.resolution)
+
+        data = {}
+        with mpmath.workdps(getattr(self, 'decimal_precision', 15)):
+            for variable in self.output_variables:
+                if variable == 'coverage':
+                    data[f'{variable}_map'] = [[point, self.solver.get_coverage(point, len(adsorbates))] for point in points]
+                else:
+                    data[f'{variable}_map'] = [
+                        [point, [self.get_value(point, index) for index in range(len(labels[variable]))]] for point in points
+                    ]
+                self.output_labels[variable] = labels[variable]
+            with open(self.data_file, 'wb') as handle:
+                pickle.dump(data, handle)
+
+    @staticmethod
+    def get_value(point, index):
+        """Return a smooth synthetic value between 0 and 1 for species `index` at a descriptor point."""
+        import mpmath
+        return 1 / (1 + mpmath.exp(mpmath.mpf(sum(point)) - index))
+
+
+def main():
+    """Run the job script read from the standard input, or from the file given as argument, against the mock."""
+    module = types.ModuleType('catmap')
+    module.ReactionModel = MockReactionModel
+    sys.modules['catmap'] = module
+    sys.path.insert(0, os.getcwd())
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as handle:
+            script = handle.read()
+    else:
+        script = sys.stdin.read()
+
+    exec(compile(script, 'mkm_job.py', 'exec'), {'__name__': '__main__'})  # pylint: disable=exec-used
+
+
+if __name__ == '__main__':
+    main()
@@ -3,15 +3,103 @@ Parsers provided by aiida_catmap.
 
 Register parsers via the "aiida.parsers" entry point in setup.json.
 """
-import pickle  # pylint: disable=syntax-error
+import concurrent.futures
+import contextlib
+import gzip
+import itertools
+import json
+import os
+import pstats
+import re
+import shutil
+import tempfile
+import time
+import numpy
 from aiida.parsers.parser import Parser
+from aiida_catmap.parsers.decoding import (
+    MalformedMapError, MapDecodingError, MissingMapError, decode_data_files, decode_maps, read_map_stream, validate_map
+)
+from aiida_catmap.parsers.summary import get_species_names, get_surface_descriptors, summarize_map, summarize_surfaces
+
+## Number of functions of the cProfile statistics listed in the timings, by cumulative time
+PROFILE_FUNCTIONS = 20
+
+## Reaction conditions recorded in the summary
+SUMMARY_CONDITIONS = ('temperature', 'voltage', 'pH')
+
+MAP_OUTPUTS = {
+    'coverage_map': 'coverage',
+    'rate_map': 'rate',
+    'production_rate_map': 'production_rate',
+}
+
+
+def map_to_arraydata(descriptors, values, species_names=None, descriptor_names=None):
+    """
+    Pack a decoded CatMAP map into an `ArrayData` node.
+
+    :param descriptors: array of the descriptor points, shape `(n_points, n_descriptors)`
+    :param values: array of the values, shape `(n_points, n_species)`
+    :param species_names: optional names of the species, one per column of `values`
+    :param descriptor_names: optional names of the descriptors
+    :returns: an `ArrayData` node
+    """
+    from aiida.orm import ArrayData
+
+    node = ArrayData()
+    node.set_array('descriptors', descriptors)
+    node.set_array('values', values)
+    node.set_attribute('species_names', species_names)
+    node.set_attribute('descriptor_names', descriptor_names)
+    return node
+
+
+def _to_contiguous(arrays):
+    """Return the `(descriptors, values)` arrays of a map as C-contiguous arrays, which are saved without a copy."""
+    return tuple(numpy.ascontiguousarray(array) for array in arrays)
+
+
+def map_to_list(descriptors, values, species_names=None, descriptor_names=None):
+    """
+    Pack a decoded CatMAP map into a `List` node of `[descriptor_point, values]` pairs.
+
+    :param descriptors: array of the descriptor points, shape `(n_points, n_descriptors)`
+    :param values: array of the values, shape `(n_points, n_species)`
+    :param species_names: optional names of the species, one per column of `values`
+    :param descriptor_names: optional names of the descriptors
+    :returns: a `List` node
+    """
+    from aiida.orm import List
+
+    node = List(list=[list(pair) for pair in zip(descriptors.tolist(), values.tolist())])
+    node.set_attribute('species_names', species_names)
+    node.set_attribute('descriptor_names', descriptor_names)
+    return node
+
+
+def map_to_arrays(node):
+    """
+    Return the arrays of a map output node, in either of the output formats.
+
+    :param node: a `List` or `ArrayData` map output
+    :returns: tuple of the `descriptors` and `values` arrays
+    """
+    from aiida.orm import ArrayData
+
+    if isinstance(node, ArrayData):
+        return node.get_array('descriptors'), node.get_array('values')
+
+    data = node.get_list()
+    descriptors = numpy.array([point for point, _ in data], dtype=numpy.float64)
+    values = numpy.array([values for _, values in data], dtype=numpy.float64)
+    return descriptors, values
 
 
 class CatMAPParser(Parser):
     """
     Parser class for parsing output of calculation.
     """
-    def __init__(self, node):  # pylint: disable=useless-super-delegation
+    def __init__(self, node):
         """
         Initialize Parser instance
 
@@ -19,20 +107,75 @@ class CatMAPParser(Parser):
         :param type node: :class:`aiida.orm.ProcessNode`
         """
         super(CatMAPParser, self).__init__(node)
+        self._energies_columns = None
+        self._timings = {}
+        self._map_outputs = MAP_OUTPUTS
+        self._decoded = {}
+        self._temporary_files = {}
 
-    def parse(self, **kwargs):  # pylint: disable=too-many-locals, inconsistent-return-statements
+    def parse(self, **kwargs):
         """
         Parse outputs, store results in database.
         :returns: an exit code, if parsing fails (or nothing if parsing succeeds)
         """
-        from aiida.orm import SinglefileData, List
+        start = time.perf_counter()
+        exit_code = self._parse_outputs(kwargs.get('retrieved_temporary_folder', None))
 
+        ## The timings of the run and of the parser are attached if the calculation was profiled
+        if 'profile' in self.node.inputs:
+            self._timings['total'] = time.perf_counter() - start
+            self._parse_timings()
+
+        return exit_code
+
+    @contextlib.contextmanager
+    def _timer(self, name):
+        """Add the time spent in the block to the parser timer `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timings[name] = self._timings.get(name, 0.) + time.perf_counter() - start
+
+    def _parse_outputs(self, retrieved_temporary_folder=None):  # pylint: disable=too-many-locals, inconsistent-return-statements
+        """
+        Parse the log and the maps of the run.
+        :param retrieved_temporary_folder: optional absolute path of the folder of the temporarily retrieved files,
+            i.e. the log if the outputs are compressed and the solved strips of a split grid
+        :returns: an exit code, if parsing fails (or nothing if parsing succeeds)
+        """
         output_filename = self.node.get_option('output_filename')
-        pickle_filename = self.node.inputs.data_file.value
+        labels_filename = self.node.process_class._LABELS_FILE_NAME  # pylint: disable=protected-access
+        batched = 'batch_parameters' in self.node.inputs
+
+        ## Only the maps of the requested output variables are retrieved
+        variables = self.node.process_class.get_output_variables(self.node.inputs)
+        self._map_outputs = {link_label: variable for link_label, variable in MAP_OUTPUTS.items() if variable in variables}
+
+        ## The maps are read from the map stream instead of the data file if requested, compressed if requested
+        if self.node.get_option('stream_maps'):
+            data_filename = self.node.process_class._STREAM_FILE_NAME  # pylint: disable=protected-access
+        else:
+            data_filename = self.node.inputs.data_file.value
+        suffix = '.gz' if self.node.get_option('compress_outputs') else ''
+
+        ## The log is only retrieved temporarily when the outputs are compressed, unless debugging
+        store_log = not self.node.get_option('compress_outputs') or self.node.get_option('debug')
 
         # Check that folder content is as expected
         files_retrieved = self.retrieved.list_object_names()
-        files_expected = [output_filename, pickle_filename]
+        files_expected = [output_filename] if store_log else []
+        if not batched:
+            files_expected.append(data_filename + suffix)
+
+        ## An interrupted run of a split grid leaves the data files of the solved strips, only retrieved temporarily
+        partial = []
+        if data_filename + suffix not in files_retrieved and not batched and retrieved_temporary_folder is not None:
+            partial = self._get_solved_tiles(os.listdir(retrieved_temporary_folder))
+            for filename in itertools.chain.from_iterable(partial):
+                self._temporary_files[filename] = os.path.join(retrieved_temporary_folder, filename)
+        if partial:
+            files_expected = files_expected[:-1]
         # Note: set(A) <= set(B) checks whether A is a subset of B
         if not set(files_expected) <= set(files_retrieved):
             self.logger.error(
@@ -40,38 +183,425 @@ class CatMAPParser(Parser):
             )
             return self.exit_codes.ERROR_MISSING_OUTPUT_FILES
 
-        # add output file
-        self.logger.info(f"Parsing '{output_filename}'")
+        # add output file, unless it is too large to be worth storing
+        if store_log:
+            self._parse_log(output_filename)
+        else:
+            self._scan_log(retrieved_temporary_folder, output_filename)
+
+        if partial:
+            self.logger.warning(f'the run was interrupted, parsing the {len(partial)} solved strips of the grid')
+            self._decode_data_files([pickle for pickle, _ in partial])
+            exit_code = self._parse_maps(partial[0][0], partial[0][1], partial_filenames=[pickle for pickle, _ in partial])
+            return exit_code or self.exit_codes.ERROR_PARTIAL_RESULTS
+
+        if not batched:
+            if not self.node.get_option('stream_maps'):
+                self._decode_data_files([data_filename + suffix])
+            return self._parse_maps(data_filename + suffix, labels_filename)
+
+        ## Every model of a batched run has its own data file, the maps go to the `batch` namespace
+        get_batch_filename = self.node.process_class.get_batch_filename
+        if not self.node.get_option('stream_maps'):
+            self._decode_data_files([
+                get_batch_filename(data_filename, index) + suffix
+                for index in range(len(self.node.inputs.batch_parameters.get_list()))
+                if get_batch_filename(data_filename, index) + suffix in files_retrieved
+            ])
+        failed = []
+        for index, overrides in enumerate(self.node.inputs.batch_parameters.get_list()):
+            batch_data_filename = get_batch_filename(data_filename, index) + suffix
+            if batch_data_filename not in files_retrieved:
+                self.logger.error(f"Model {index} of the batch did not produce '{batch_data_filename}'")
+                failed.append(index)
+                continue
+            exit_code = self._parse_maps(
+                batch_data_filename, get_batch_filename(labels_filename, index), f'batch.{{}}_{index}', overrides
+            )
+            if exit_code is not None:
+                failed.append(index)
+
+        if failed:
+            return self.exit_codes.ERROR_BATCH_MODEL_FAILED
+
+    def _parse_log(self, output_filename):
+        """
+        Attach the CatMAP log as the `log` output, unless it is larger than the `max_log_size` option.
+
+        :param output_filename: name of the retrieved log file
+        """
+        from aiida.orm import SinglefileData
+
+        max_log_size = self.node.get_option('max_log_size')
         with self.retrieved.open(output_filename, 'rb') as handle:
-            output_node = SinglefileData(file=handle)
-        self.out('log', output_node)
-
-        # Parsing the pickle file
-        self.logger.info(f"Parsing '{pickle_filename}'")
-        # pickledata = pickle.load(self.retrieved.open(pickle_filename, 'rb'))
-        with self.retrieved.open(pickle_filename, 'rb') as handle:
-            pickledata = pickle.load(handle)
+            size = handle.seek(0, os.SEEK_END)
+            if max_log_size is not None and size > max_log_size:
+                self.logger.warning(f"'{output_filename}' is {size} bytes, larger than max_log_size, not stored")
+                return
+            handle.seek(0)
+            self.logger.info(f"Parsing '{output_filename}'")
+            self.out('log', SinglefileData(file=handle))
+
+    def _scan_log(self, retrieved_temporary_folder, output_filename):
+        """
+        Report the errors of the temporarily retrieved CatMAP log, which is not stored, in the log of the node.
+
+        The errors are the last lines of the tracebacks, e.g. those of the failed models of a batched run.
+
+        :param retrieved_temporary_folder: absolute path of the folder of the temporarily retrieved files, or None
+        :param output_filename: name of the log file
+        :returns: list of the error lines
+        """
+        filepath = os.path.join(retrieved_temporary_folder or '', output_filename)
+        if retrieved_temporary_folder is None or not os.path.isfile(filepath):
+            self.logger.warning(f"'{output_filename}' not retrieved, errors of the run not available")
+            return []
+
+        errors = []
+        in_traceback = False
+        with open(filepath, 'r', errors='replace') as handle:
+            for line in handle:
+                if line.startswith('Traceback (most recent call last)'):
+                    in_traceback = True
+                elif in_traceback and line.strip() and not line[0].isspace():
+                    errors.append(line.strip())
+                    in_traceback = False
+
+        for error in errors:
+            self.logger.error(f"'{output_filename}': {error}")
+        return errors
+
+    def _parse_maps(self, data_filename, labels_filename, link_label_format='{}', overrides=None, partial_filenames=None):  # pylint: disable=too-many-arguments
+        """
+        Parse the maps of a data file or map stream and attach them as outputs.
+
+        :param data_filename: name of the retrieved pickle file, or of the map stream if the `stream_maps` option is set
+        :param labels_filename: name of the retrieved JSON file with the output labels
+        :param link_label_format: format string of the output link labels, formatted with the map output name
+        :param overrides: optional input values of the model that take precedence over the inputs of the node
+        :param partial_filenames: optional names of the retrieved pickle files of the solved strips of an interrupted
+            run, whose maps are concatenated instead of reading `data_filename`
+        :returns: an exit code, if parsing fails (or nothing if parsing succeeds)
+        """
+        output_format = self.node.get_option('output_format') or 'list'
+        overrides = overrides or {}
+        resolution = overrides.get('resolution', self.node.inputs.resolution.value)
+        descriptor_ranges = overrides.get('descriptor_ranges', self.node.inputs.descriptor_ranges.get_list())
+        precision = self._get_precision()
+
+        ## Streamed maps are decoded into arrays on disk, which only live until they are stored in the nodes
+        with tempfile.TemporaryDirectory() as directory:
+            self.logger.info(f"Parsing '{data_filename}'")
+            with self._timer('read'):
+                if partial_filenames:
+                    maps = self._read_data_files(partial_filenames, precision)
+                elif self.node.get_option('stream_maps'):
+                    maps = self._read_map_stream(data_filename, directory, precision)
+                else:
+                    maps = self._read_data_file(data_filename, precision)
+            if not isinstance(maps, dict):
+                return maps
+
+            with self._timer('validate'):
+                for link_label, (descriptors, values) in maps.items():
+                    try:
+                        n_missing = validate_map(descriptors, values, resolution, descriptor_ranges)
+                    except MapDecodingError as exception:
+                        self.logger.error(f"Invalid '{MAP_OUTPUTS[link_label]}_map' in '{data_filename}': {exception}")
+                        return self.exit_codes.ERROR_MALFORMED_MAP
+                    if n_missing:
+                        self.logger.warning(f"'{MAP_OUTPUTS[link_label]}_map' has no solution for {n_missing} descriptor points")
+
+            ## The three main outputs
+            ## The solution to the kinetic model - coverages
+            ## The rate and the production rate also provided
+            labels = self._parse_labels(labels_filename)
+            descriptor_names = overrides.get('descriptor_names', self.node.inputs.descriptor_names.get_list())
+            with self._timer('nodes'):
+                if output_format == 'array':
+                    ## The arrays are made contiguous by a pool of threads, the nodes are only built on the main thread
+                    with concurrent.futures.ThreadPoolExecutor(self._get_workers()) as executor:
+                        arrays = dict(zip(maps, executor.map(_to_contiguous, maps.values())))
+                    nodes = {
+                        link_label: map_to_arraydata(descriptors, values, labels.get(MAP_OUTPUTS[link_label]), descriptor_names)
+                        for link_label, (descriptors, values) in arrays.items()
+                    }
+                else:
+                    nodes = {
+                        link_label: map_to_list(descriptors, values, labels.get(MAP_OUTPUTS[link_label]), descriptor_names)
+                        for link_label, (descriptors, values) in maps.items()
+                    }
+
+            ## The queryable summary of the maps
+            with self._timer('summary'):
+                nodes['summary'] = self._get_summary(maps, labels, overrides)
+            del maps
+
+        for link_label, node in nodes.items():
+            self.out(link_label_format.format(link_label), node)
+
+    def _open(self, filename, mode='r'):
+        """Open a retrieved file, or a file of the temporary folder if it was only retrieved temporarily."""
+        if filename in self._temporary_files:
+            return open(self._temporary_files[filename], mode)
+        return self.retrieved.open(filename, mode)
+
+    @contextlib.contextmanager
+    def _open_maps(self, filename):
+        """Open a retrieved data file or map stream in binary mode, decompressing it if it is compressed with gzip."""
+        with self._open(filename, 'rb') as handle:
+            if filename.endswith('.gz'):
+                with gzip.GzipFile(fileobj=handle, mode='rb') as decompressed:
+                    yield decompressed
+            else:
+                yield handle
+
+    def _get_precision(self):
+        """Return the decimal precision of the values, None to convert them to float64, see `decode_map`."""
+        if (self.node.get_option('output_format') or 'list') == 'array' and self.node.get_option('keep_precision'):
+            return self.node.inputs.decimal_precision.value
+        return None
+
+    def _get_workers(self):
+        """Return the number of workers that decode the data files and write the arrays, see `parser_workers`."""
+        return self.node.get_option('parser_workers') or 1
+
+    def _decode_data_files(self, data_filenames):
+        """
+        Decode the retrieved pickle files in a pool of `parser_workers` processes, ahead of `_read_data_file`.
+
+        The files are copied to a temporary directory for the workers to read. A single file is decoded in a worker
+        process as well, and nothing is done with a single worker.
+
+        :param data_filenames: names of the retrieved pickle files
+        """
+        if self._get_workers() < 2 or not data_filenames:
+            return
+        processes = min(self._get_workers(), len(data_filenames))
+
+        with self._timer('read'), tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for data_filename in data_filenames:
+                paths.append(os.path.join(directory, data_filename))
+                with self._open(data_filename, 'rb') as source, open(paths[-1], 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            results = decode_data_files(paths, list(self._map_outputs.values()), self._get_precision(), processes)
+        self._decoded.update(zip(data_filenames, results))
+
+    def _read_data_file(self, data_filename, precision):
+        """
+        Read and decode the maps of a retrieved pickle file, unless it was decoded by `_decode_data_files`.
+
+        :param data_filename: name of the retrieved pickle file
+        :param precision: decimal precision of the values, see `decode_map`
+        :returns: dictionary of `(descriptors, values)` arrays keyed by map output, or an exit code
+        """
         try:
-            coverage_data = [[a[0], list(map(float, a[1]))]
-                             for a in pickledata['coverage_map']]
-        except KeyError:
+            maps = self._decoded.pop(data_filename, None)
+            if maps is None:
+                with self._open_maps(data_filename) as handle:
+                    maps = decode_maps(handle, list(self._map_outputs.values()), precision)
+            elif isinstance(maps, MapDecodingError):
+                raise maps
+        except MissingMapError as exception:
+            self.logger.error(str(exception))
+            return self.exit_codes.ERROR_MISSING_MAP
+        except MalformedMapError as exception:
+            self.logger.error(f"{exception} in '{data_filename}'")
+            return self.exit_codes.ERROR_MALFORMED_MAP
+        except MapDecodingError as exception:
+            self.logger.error(str(exception))
             return self.exit_codes.ERROR_NO_PICKLE_FILE
 
-        ## Choose not to change the mpmath format
-        ## the downside is that mpmath must then be present
-        ## wherever this is being parsed
-        rate_data = [[a[0], list(map(float, a[1]))]
-                     for a in pickledata['rate_map']]
-        production_data = [[a[0], list(map(float, a[1]))]
-                           for a in pickledata['production_rate_map']]
-
-        coverage_map = List(list=coverage_data)
-        rate_map = List(list=rate_data)
-        production_map = List(list=production_data)
-
-        ## The three main outputs
-        ## The solution to the kinetic model - coverages
-        ## The rate and the production rate also provided
-        self.out('coverage_map', coverage_map)
-        self.out('rate_map', rate_map)
-        self.out('production_rate_map', production_map)
+        return {link_label: maps[variable] for link_label, variable in self._map_outputs.items()}
+
+    def _read_data_files(self, data_filenames, precision):
+        """
+        Read, decode and concatenate the maps of several retrieved pickle files, e.g. the strips of a grid.
+
+        :param data_filenames: names of the retrieved pickle files
+        :param precision: decimal precision of the values, see `decode_map`
+        :returns: dictionary of `(descriptors, values)` arrays keyed by map output, or an exit code
+        """
+        parts = []
+        for data_filename in data_filenames:
+            maps = self._read_data_file(data_filename, precision)
+            if not isinstance(maps, dict):
+                return maps
+            parts.append(maps)
+
+        return {
+            link_label: tuple(numpy.concatenate([maps[link_label][index] for maps in parts]) for index in range(2))
+            for link_label in self._map_outputs
+        }
+
+    def _get_solved_tiles(self, filenames):
+        """
+        Return the data files of the solved strips of a split grid, see `run_tiled` of the runner.
+
+        A strip is solved once its labels file is written, the data file alone may only hold an initial guess.
+
+        :param filenames: names of the temporarily retrieved files
+        :returns: list of the `(data_filename, labels_filename)` tuples of the solved strips, in grid order
+        """
+        inputs = self.node.inputs
+        mkm_filename = inputs.mkm_filename.value if 'mkm_filename' in inputs else self.node.process_class._INPUT_FILE_NAME  # pylint: disable=protected-access
+        prefix = self.node.process_class.get_tile_prefix(mkm_filename)
+        pattern = re.compile(re.escape(prefix) + r'_(\d+)_labels\.json')
+
+        tiles = []
+        for index in sorted(int(match.group(1)) for match in map(pattern.fullmatch, filenames) if match):
+            if f'{prefix}_{index}.pickle' in filenames:
+                tiles.append((f'{prefix}_{index}.pickle', f'{prefix}_{index}_labels.json'))
+        return tiles
+
+    def _read_map_stream(self, stream_filename, directory, precision):
+        """
+        Read and decode the maps of a retrieved map stream, one chunk at a time.
+
+        :param stream_filename: name of the retrieved map stream
+        :param directory: directory to write the arrays to
+        :param precision: decimal precision of the values, see `decode_map`
+        :returns: dictionary of `(descriptors, values)` memory-mapped arrays keyed by map output, or an exit code
+        """
+        try:
+            with self._open_maps(stream_filename) as handle:
+                maps = read_map_stream(handle, list(self._map_outputs.values()), directory, precision)
+        except MissingMapError as exception:
+            self.logger.error(str(exception))
+            return self.exit_codes.ERROR_MISSING_MAP
+        except MapDecodingError as exception:
+            self.logger.error(f"Invalid map stream '{stream_filename}': {exception}")
+            return self.exit_codes.ERROR_MALFORMED_MAP
+        return {link_label: maps[variable] for link_label, variable in self._map_outputs.items()}
+
+    def _get_summary(self, maps, labels, overrides):
+        """
+        Return the summary of the maps of a model, see `aiida_catmap.parsers.summary`.
+
+        :param maps: dictionary of the `(descriptors, values)` arrays keyed by map output
+        :param labels: dictionary of species names keyed by output variable
+        :param overrides: input values of the model that take precedence over the inputs of the node
+        :returns: a `Dict` node
+        """
+        from aiida.orm import Dict
+
+        summary = {
+            link_label: summarize_map(descriptors, values, labels.get(MAP_OUTPUTS[link_label]))
+            for link_label, (descriptors, values) in maps.items()
+        }
+        summary['species_names'] = {
+            link_label: get_species_names(labels.get(MAP_OUTPUTS[link_label]), values.shape[1])
+            for link_label, (_, values) in maps.items()
+        }
+        summary['conditions'] = {
+            name: overrides.get(name, self.node.inputs[name].value if name in self.node.inputs else None)
+            for name in SUMMARY_CONDITIONS
+        }
+
+        surface_descriptors = self._get_surface_descriptors(overrides) if 'production_rate_map' in maps else {}
+        if surface_descriptors:
+            descriptors, values = maps['production_rate_map']
+            summary['surfaces'] = summarize_surfaces(descriptors, values, surface_descriptors, labels.get('production_rate'))
+
+        return Dict(dict=summary)
+
+    def _get_surface_descriptors(self, overrides):
+        """
+        Return the descriptor values of the surfaces of a model from the energies table.
+
+        :param overrides: input values of the model that take precedence over the inputs of the node
+        :returns: dictionary of the descriptor point keyed by surface name, empty if not available
+        """
+        from aiida_catmap.data.energies import EnergiesData, parse_energies
+
+        inputs = self.node.inputs
+        if 'energies' not in inputs or 'surface_names' not in inputs:
+            return {}
+
+        if self._energies_columns is None:
+            try:
+                self._energies_columns = (
+                    inputs.energies.get_columns() if isinstance(inputs.energies, EnergiesData)
+                    else parse_energies(inputs.energies.get_content())
+                )
+            except ValueError as exception:
+                self.logger.warning(f'surfaces not summarized, invalid energies: {exception}')
+                self._energies_columns = {}
+        if not self._energies_columns:
+            return {}
+
+        return get_surface_descriptors(
+            self._energies_columns,
+            overrides.get('surface_names', inputs.surface_names.get_list()),
+            overrides.get('descriptor_names', inputs.descriptor_names.get_list()),
+        )
+
+    def _parse_timings(self):
+        """
+        Attach the timings of the models written by the runner and the timings of the parser as the `timings` output.
+
+        The timings of a model are None if they were not retrieved, e.g. because the model failed. If the models were
+        profiled with cProfile, the functions with the largest cumulative time are listed under `functions`.
+        """
+        from aiida.orm import Dict
+
+        inputs = self.node.inputs
+        mkm_filename = inputs.mkm_filename.value if 'mkm_filename' in inputs else self.node.process_class._INPUT_FILE_NAME  # pylint: disable=protected-access
+        if 'batch_parameters' in inputs:
+            get_batch_filename = self.node.process_class.get_batch_filename
+            mkm_filenames = [get_batch_filename(mkm_filename, index) for index in range(len(inputs.batch_parameters.get_list()))]
+        else:
+            mkm_filenames = [mkm_filename]
+
+        files_retrieved = self.retrieved.list_object_names()
+        models = []
+        for filename in mkm_filenames:
+            timings_filename, profile_filename = self.node.process_class.get_profile_filenames(filename)
+            if timings_filename not in files_retrieved:
+                self.logger.warning(f"'{timings_filename}' not retrieved, timings of the model not available")
+                models.append(None)
+                continue
+            with self.retrieved.open(timings_filename, 'r') as handle:
+                timings = json.load(handle)
+            if profile_filename in files_retrieved:
+                timings['functions'] = self._parse_profile(profile_filename)
+            models.append(timings)
+
+        self.out('timings', Dict(dict={'models': models, 'parser': self._timings}))
+
+    def _parse_profile(self, profile_filename):
+        """
+        Return the functions with the largest cumulative time of the retrieved cProfile statistics.
+
+        :param profile_filename: name of the retrieved file with the cProfile statistics
+        :returns: list of dictionaries with the `function`, the number of `calls` and the `cumulative` and `internal`
+            times, the largest cumulative time first
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            ## The statistics are loaded with `marshal`, which can only read actual files
+            filepath = os.path.join(directory, profile_filename)
+            with self.retrieved.open(profile_filename, 'rb') as source, open(filepath, 'wb') as target:
+                target.write(source.read())
+            statistics = pstats.Stats(filepath).stats  # pylint: disable=no-member
+
+        functions = sorted(statistics.items(), key=lambda item: -item[1][3])[:PROFILE_FUNCTIONS]
+        return [{
+            'function': pstats.func_std_string(function),
+            'calls': calls,
+            'cumulative': cumulative,
+            'internal': internal,
+        } for function, (_, calls, internal, cumulative, _) in functions]
+
+    def _parse_labels(self, labels_filename):
+        """
+        Return the output labels written by the run script.
+
+        :param labels_filename: name of the retrieved JSON file with the output labels
+        :returns: dictionary of species names keyed by output variable, empty if not retrieved
+        """
+        if labels_filename not in self._temporary_files and labels_filename not in self.retrieved.list_object_names():
+            self.logger.warning(f"'{labels_filename}' not retrieved, species names not available")
+            return {}
+        with self._open(labels_filename, 'r') as handle:
+            return json.load(handle)
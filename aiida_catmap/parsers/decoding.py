@@ -0,0 +1,339 @@
+"""
+Decoding of the maps stored by CatMAP in its pickle file.
+
+CatMAP stores every map as a list of `[descriptor_point, values]` pairs where
+the values are `mpmath.mpf` numbers. The functions in this module convert such
+a map in bulk into a `descriptors` array of shape `(n_points, n_descriptors)`
+and a `values` array of shape `(n_points, n_species)`.
+
+Large maps can also be read from the map stream written by the run script,
+in which case they are decoded chunk by chunk into arrays on disk. The data
+files of many models can be decoded in a pool of worker processes.
+"""
+import concurrent.futures
+import gzip
+import itertools
+import multiprocessing
+import operator
+import os
+import pickle  # pylint: disable=syntax-error
+import numpy
+
+## Number of significant digits that survive a conversion to float64
+FLOAT64_DIGITS = 15
+
+## Characters on top of the significant digits of a value formatted with `mpmath.libmp.to_str`: sign, point, exponent
+STR_EXTRA_CHARACTERS = 16
+
+
+class MapDecodingError(ValueError):
+    """Raised when the maps in the pickle file are malformed."""
+
+
+class MissingMapError(MapDecodingError):
+    """Raised when an expected map is not present in the pickle file."""
+
+
+class MalformedMapError(MapDecodingError):
+    """Raised when a map of the pickle file cannot be converted into arrays."""
+
+
+def load_maps(handle, variables):
+    """
+    Load the maps of the given output variables from a CatMAP pickle file.
+
+    The pickle format cannot be read selectively, so the whole file is
+    unpickled, including the maps that are not requested; only the requested
+    `<variable>_map` entries are kept and everything else is released straight
+    away. The `mpmath.mpf` values keep the mantissas they were pickled with.
+
+    :param handle: binary file handle of the pickle file
+    :param variables: names of the output variables, e.g. `coverage`
+    :returns: dictionary of the raw maps keyed by output variable
+    :raises MapDecodingError: if the file cannot be unpickled
+    :raises MissingMapError: if one of the maps is not present
+    """
+    try:
+        pickledata = _Unpickler(handle).load()
+    except (pickle.UnpicklingError, EOFError, OSError, AttributeError, ImportError, IndexError) as exception:
+        raise MapDecodingError(f'could not unpickle the data file: {exception}') from exception
+
+    if not isinstance(pickledata, dict):
+        raise MapDecodingError(f'expected a dictionary in the data file, found {type(pickledata).__name__}')
+
+    missing = [variable for variable in variables if f'{variable}_map' not in pickledata]
+    if missing:
+        raise MissingMapError(f'maps of {missing} not found in the data file')
+
+    maps = {variable: pickledata[f'{variable}_map'] for variable in variables}
+    del pickledata
+    return maps
+
+
+def decode_maps(handle, variables, precision=None):
+    """
+    Load the maps of the given output variables from a CatMAP pickle file and convert them into arrays.
+
+    :param handle: binary file handle of the pickle file
+    :param variables: names of the output variables, e.g. `coverage`
+    :param precision: decimal precision of the values, see `decode_map`
+    :returns: dictionary of the `(descriptors, values)` arrays keyed by output variable
+    :raises MapDecodingError: if the file cannot be unpickled
+    :raises MissingMapError: if one of the maps is not present
+    :raises MalformedMapError: if one of the maps cannot be converted
+    """
+    raw_maps = load_maps(handle, variables)
+    maps = {}
+    for variable in variables:
+        try:
+            maps[variable] = decode_map(raw_maps.pop(variable), precision)
+        except MapDecodingError as exception:
+            raise MalformedMapError(f"invalid '{variable}_map': {exception}") from exception
+    return maps
+
+
+def decode_data_file(path, variables, precision=None):
+    """
+    Decode the maps of a CatMAP pickle file on disk, compressed with gzip if its name ends in `.gz`, see `decode_maps`.
+    """
+    with (gzip.open if path.endswith('.gz') else open)(path, 'rb') as handle:
+        return decode_maps(handle, variables, precision)
+
+
+def decode_data_files(paths, variables, precision=None, processes=1):
+    """
+    Decode the maps of several CatMAP pickle files on disk in a pool of worker processes.
+
+    The workers are spawned rather than forked, so that they do not inherit the threads and the database connection
+    of the process that parses, e.g. a daemon worker.
+
+    :param paths: paths of the pickle files
+    :param variables: names of the output variables, e.g. `coverage`
+    :param precision: decimal precision of the values, see `decode_map`
+    :param processes: number of worker processes
+    :returns: list with, for every file, the dictionary of its maps or the `MapDecodingError` raised for it
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context) as executor:
+        futures = [executor.submit(decode_data_file, path, variables, precision) for path in paths]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except MapDecodingError as exception:
+                results.append(exception)
+    return results
+
+
+def read_map_stream(handle, variables, directory, precision=None):
+    """
+    Read the maps of the given output variables from a map stream into arrays on disk.
+
+    The stream consists of consecutive pickles: for every map a `(variable, n_points)`
+    header, with `n_points` None if the map is absent, followed by the chunks of
+    `[descriptor_point, values]` pairs of the map. Only a single chunk is held in
+    memory at any time, the decoded values are written to `.npy` files in `directory`.
+
+    :param handle: binary file handle of the map stream
+    :param variables: names of the output variables, e.g. `coverage`
+    :param directory: directory to write the `.npy` files to
+    :param precision: decimal precision of the values, see `decode_map`
+    :returns: dictionary of `(descriptors, values)` memory-mapped arrays keyed by output variable
+    :raises MapDecodingError: if the stream cannot be unpickled or a map is malformed
+    :raises MissingMapError: if one of the maps is not present
+    """
+    from numpy.lib.format import open_memmap
+
+    maps = {}
+    for variable, n_points in _iter_stream(handle):
+        if n_points is None or variable not in variables:
+            _skip_chunks(handle, n_points or 0)
+            continue
+
+        descriptors = values = None
+        position = 0
+        while position < n_points:
+            chunk_descriptors, chunk_values = decode_map(_load_chunk(handle), precision)
+            if descriptors is None:
+                dtype = chunk_values.dtype
+                if dtype.kind == 'U':
+                    dtype = numpy.dtype(f'U{precision + STR_EXTRA_CHARACTERS}')
+                descriptors = open_memmap(
+                    os.path.join(directory, f'{variable}_descriptors.npy'), mode='w+', dtype=numpy.float64,
+                    shape=(n_points, chunk_descriptors.shape[1])
+                )
+                values = open_memmap(
+                    os.path.join(directory, f'{variable}_values.npy'), mode='w+', dtype=dtype,
+                    shape=(n_points, chunk_values.shape[1])
+                )
+            stop = position + chunk_values.shape[0]
+            if stop > n_points or chunk_descriptors.shape[1] != descriptors.shape[1] \
+                    or chunk_values.shape[1] != values.shape[1] or chunk_values.dtype.itemsize > values.dtype.itemsize:
+                raise MapDecodingError(f'chunk of rows {position} to {stop} of `{variable}_map` does not fit the map')
+            descriptors[position:stop] = chunk_descriptors
+            values[position:stop] = chunk_values
+            position = stop
+        maps[variable] = (descriptors, values)
+
+    missing = [variable for variable in variables if variable not in maps]
+    if missing:
+        raise MissingMapError(f'maps of {missing} not found in the map stream')
+
+    return maps
+
+
+def _iter_stream(handle):
+    """Yield the `(variable, n_points)` headers of a map stream, the caller has to consume the chunks in between."""
+    while True:
+        try:
+            header = pickle.load(handle)
+        except EOFError:
+            return
+        except (pickle.UnpicklingError, OSError, AttributeError, ImportError, IndexError) as exception:
+            raise MapDecodingError(f'could not unpickle the map stream: {exception}') from exception
+        try:
+            variable, n_points = header
+        except (TypeError, ValueError) as exception:
+            raise MapDecodingError(f'invalid header in the map stream: {header!r}') from exception
+        yield variable, n_points
+
+
+def _load_chunk(handle):
+    """Load the next chunk of a map stream."""
+    try:
+        return _Unpickler(handle).load()
+    except (pickle.UnpicklingError, EOFError, OSError, AttributeError, ImportError, IndexError) as exception:
+        raise MapDecodingError(f'could not unpickle a chunk of the map stream: {exception}') from exception
+
+
+def _skip_chunks(handle, n_points):
+    """Read past the chunks of a map of `n_points` points without decoding them."""
+    position = 0
+    while position < n_points:
+        chunk = _load_chunk(handle)
+        if not chunk:
+            raise MapDecodingError('empty chunk in the map stream')
+        position += len(chunk)
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler that restores `mpmath.mpf` values with their pickled mantissas in every version of mpmath."""
+
+    def find_class(self, module, name):
+        """Return the exact constructor of `mpmath.mpf` for mpmath 1.4, whose own one rounds to the working precision."""
+        if (module, name) == ('mpmath.ctx_mp_python', '_make_mpf'):
+            return _make_mpf
+        return super().find_class(module, name)
+
+
+def _make_mpf(value):
+    """Return the `mpmath.mpf` with the `(sign, mantissa, exponent, bitcount)` tuple `value`, without rounding it."""
+    import mpmath
+    from mpmath.libmp import MPZ
+
+    sign, mantissa, exponent, bitcount = value
+    number = mpmath.mpf.__new__(mpmath.mpf)
+    number._mpf_ = (sign, MPZ(mantissa), exponent, bitcount)  # pylint: disable=protected-access
+    return number
+
+
+def _mpf_to_float(values):
+    """Convert an iterable of `mpmath.mpf` to floats without going through `mpf.__float__`."""
+    from mpmath.libmp import to_float, round_nearest
+    mantissas = map(operator.attrgetter('_mpf_'), values)
+    return map(to_float, mantissas, itertools.repeat(False), itertools.repeat(round_nearest))
+
+
+def _mpf_to_str(values, precision):
+    """Convert an iterable of `mpmath.mpf` to strings with `precision` significant digits."""
+    from mpmath.libmp import to_str
+    return (to_str(value._mpf_, precision) for value in values)  # pylint: disable=protected-access
+
+
+def _is_mpf(value):
+    """Return whether `value` is an `mpmath.mpf` without requiring mpmath for plain floats."""
+    return type(value).__module__.startswith('mpmath') and hasattr(value, '_mpf_')
+
+
+def decode_map(raw_map, precision=None):
+    """
+    Convert a raw CatMAP map into arrays.
+
+    :param raw_map: list of `[descriptor_point, values]` pairs
+    :param precision: if larger than the precision of float64, the values are
+        returned as a string array with this number of significant digits
+    :returns: tuple of the `descriptors` and `values` arrays
+    :raises MapDecodingError: if the map is empty or its rows have different lengths
+    """
+    if not raw_map:
+        raise MapDecodingError('map is empty')
+
+    try:
+        points, rows = zip(*raw_map)
+    except (TypeError, ValueError) as exception:
+        raise MapDecodingError(f'map entries are not `[descriptor_point, values]` pairs: {exception}') from exception
+
+    try:
+        descriptors = numpy.array(points, dtype=numpy.float64)
+    except (TypeError, ValueError) as exception:
+        raise MapDecodingError(f'invalid descriptor points: {exception}') from exception
+
+    try:
+        row_lengths = set(map(len, rows))
+    except TypeError as exception:
+        raise MapDecodingError(f'values of the map are not sequences: {exception}') from exception
+    if len(row_lengths) != 1:
+        raise MapDecodingError(f'rows of the map have different lengths: {sorted(row_lengths)}')
+    n_species = row_lengths.pop()
+    count = len(rows) * n_species
+
+    flat = itertools.chain.from_iterable(rows)
+    first = rows[0][0] if n_species else None
+
+    try:
+        if precision is not None and precision > FLOAT64_DIGITS:
+            if _is_mpf(first):
+                values = numpy.array(list(_mpf_to_str(flat, precision)))
+            else:
+                values = numpy.array([repr(float(value)) for value in flat])
+        elif _is_mpf(first):
+            values = numpy.fromiter(_mpf_to_float(flat), dtype=numpy.float64, count=count)
+        else:
+            values = numpy.fromiter(flat, dtype=numpy.float64, count=count)
+    except (AttributeError, TypeError, ValueError) as exception:
+        raise MapDecodingError(f'invalid values in the map: {exception}') from exception
+
+    return descriptors, values.reshape(len(rows), n_species)
+
+
+def validate_map(descriptors, values, resolution, descriptor_ranges):
+    """
+    Check the shape of a decoded map against the descriptor grid of the calculation.
+
+    CatMAP leaves out points for which no solution was found, so fewer points
+    than `resolution ** n_descriptors` are accepted.
+
+    :param descriptors: array of the descriptor points
+    :param values: array of the values
+    :param resolution: number of points along each descriptor
+    :param descriptor_ranges: list of `[start, stop]` pairs, one per descriptor
+    :returns: the number of grid points missing from the map
+    :raises MapDecodingError: if the map does not fit the descriptor grid
+    """
+    n_descriptors = len(descriptor_ranges)
+    if descriptors.ndim != 2 or descriptors.shape[1] != n_descriptors:
+        raise MapDecodingError(f'descriptor points have shape {descriptors.shape}, expected {n_descriptors} columns')
+    if values.shape[0] != descriptors.shape[0]:
+        raise MapDecodingError(f'{values.shape[0]} rows of values for {descriptors.shape[0]} descriptor points')
+
+    n_expected = resolution**n_descriptors
+    if descriptors.shape[0] > n_expected:
+        raise MapDecodingError(f'{descriptors.shape[0]} points found, the descriptor grid only has {n_expected}')
+
+    bounds = numpy.sort(numpy.array(descriptor_ranges, dtype=numpy.float64), axis=1)
+    atol = 1e-8 * numpy.maximum(1., numpy.abs(bounds).max(axis=1))
+    outside = (descriptors < bounds[:, 0] - atol) | (descriptors > bounds[:, 1] + atol)
+    if outside.any():
+        raise MapDecodingError(f'{numpy.count_nonzero(outside.any(axis=1))} points lie outside the descriptor ranges')
+
+    return n_expected - descriptors.shape[0]
@@ -0,0 +1,146 @@
+"""
+Summary of the maps of a CatMAP calculation, stored in a `Dict` so that it can be queried.
+
+The summary holds, for every species of every map, the minimum, the maximum
+and the descriptor point of the maximum, and for every surface of the model
+the production rates at the grid point closest to the descriptors of the
+surface. Non-finite values are stored as None, which JSON can represent.
+The keys of AiiDA attributes cannot contain a `.`, so the names of species
+and surfaces are escaped, see `escape_key`. The database does not keep the
+order of the keys, so the names of the species of every map are also stored
+in order, under `species_names`.
+"""
+import numpy
+
+## Number of points of a map reduced at a time, which bounds the memory used for large and memory-mapped maps
+CHUNK_POINTS = 65536
+
+
+def _to_float(value):
+    """Return `value` as a float, or None if it is not finite."""
+    value = float(value)
+    return value if numpy.isfinite(value) else None
+
+
+def escape_key(name):
+    """
+    Return a name as a valid key of an AiiDA attribute, with `%` and `.` percent-encoded, e.g. `0.5O2_g` as `0%2E5O2_g`.
+
+    :param name: the name of a species or surface
+    :returns: the escaped key, which is the name itself for names without `%` and `.`
+    """
+    return str(name).replace('%', '%25').replace('.', '%2E')
+
+
+def unescape_key(key):
+    """
+    Return the name of an escaped key, see `escape_key`.
+
+    :param key: the escaped key
+    :returns: the original name
+    """
+    return key.replace('%2E', '.').replace('%25', '%')
+
+
+def get_species_names(species_names, n_species):
+    """
+    Return the names of the columns of a map, generic names if the output labels do not match.
+
+    :param species_names: names of the species from the output labels, or None
+    :param n_species: number of columns of the map
+    :returns: list of `n_species` names
+    """
+    if species_names is not None and len(species_names) == n_species:
+        return [str(name) for name in species_names]
+    return [f'species_{index}' for index in range(n_species)]
+
+
+def summarize_map(descriptors, values, species_names=None, chunk_points=CHUNK_POINTS):
+    """
+    Return the extrema of every species of a map.
+
+    The values are reduced `chunk_points` points at a time, so that only a chunk
+    of a memory-mapped map is read into memory, and converted if they are strings.
+
+    :param descriptors: array of the descriptor points, shape `(n_points, n_descriptors)`
+    :param values: array of the values, shape `(n_points, n_species)`, string values are converted to float
+    :param species_names: optional names of the species, one per column of `values`
+    :param chunk_points: number of points reduced at a time
+    :returns: dictionary with the `min`, `max` and `argmax` descriptor point keyed by escaped species name
+    """
+    values = numpy.asarray(values)
+    n_species = values.shape[1]
+    minima = numpy.full(n_species, numpy.inf)
+    maxima = numpy.full(n_species, -numpy.inf)
+    argmax = numpy.zeros(n_species, dtype=numpy.int64)
+    columns = numpy.arange(n_species)
+    for start in range(0, len(values), chunk_points):
+        ## Float64 chunks are views, the non-finite values are left out of the extrema
+        chunk = numpy.asarray(values[start:start + chunk_points], dtype=numpy.float64)
+        finite = numpy.isfinite(chunk)
+        minima = numpy.minimum(minima, numpy.where(finite, chunk, numpy.inf).min(axis=0))
+        chunk = numpy.where(finite, chunk, -numpy.inf)
+        rows = chunk.argmax(axis=0)
+        larger = chunk[rows, columns] > maxima
+        maxima[larger] = chunk[rows, columns][larger]
+        argmax[larger] = start + rows[larger]
+
+    summary = {}
+    for column, name in enumerate(map(escape_key, get_species_names(species_names, n_species))):
+        if not numpy.isfinite(maxima[column]):
+            summary[name] = {'min': None, 'max': None, 'argmax': None}
+            continue
+        summary[name] = {
+            'min': float(minima[column]),
+            'max': float(maxima[column]),
+            'argmax': numpy.asarray(descriptors[argmax[column]], dtype=numpy.float64).tolist(),
+        }
+    return summary
+
+
+def get_surface_descriptors(columns, surface_names, descriptor_names):
+    """
+    Return the descriptor values of the surfaces, the formation energies of the descriptor species.
+
+    :param columns: columns of the energies table, see `aiida_catmap.data.energies.parse_energies`
+    :param surface_names: names of the surfaces of the model
+    :param descriptor_names: names of the descriptors, e.g. `O_s`
+    :returns: dictionary of the descriptor point keyed by surface name, None for surfaces missing a descriptor
+    """
+    energies = {}
+    for surface, species, energy in zip(columns['surface_name'], columns['species_name'], columns['formation_energy']):
+        energies.setdefault((surface, species), energy)
+
+    descriptor_species = [name.rsplit('_', 1)[0] for name in descriptor_names]
+    points = {}
+    for surface in surface_names:
+        point = [energies.get((surface, species)) for species in descriptor_species]
+        points[surface] = None if None in point else point
+    return points
+
+
+def summarize_surfaces(descriptors, values, surface_descriptors, species_names=None):
+    """
+    Return the values of a map at the grid point closest to each surface.
+
+    :param descriptors: array of the descriptor points, shape `(n_points, n_descriptors)`
+    :param values: array of the values, shape `(n_points, n_species)`
+    :param surface_descriptors: dictionary of the descriptor point keyed by surface name, see `get_surface_descriptors`
+    :param species_names: optional names of the species, one per column of `values`
+    :returns: dictionary with the `descriptors` of the surface, the closest `grid_point` and the `values`
+        keyed by escaped species name, keyed by escaped surface name
+    """
+    descriptors = numpy.asarray(descriptors, dtype=numpy.float64)
+    names = [escape_key(name) for name in get_species_names(species_names, values.shape[1])]
+
+    summary = {}
+    for surface, point in surface_descriptors.items():
+        if point is None:
+            continue
+        nearest = int(numpy.argmin(numpy.sum((descriptors - numpy.asarray(point, dtype=numpy.float64))**2, axis=1)))
+        summary[escape_key(surface)] = {
+            'descriptors': [float(value) for value in point],
+            'grid_point': descriptors[nearest].tolist(),
+            'values': {name: _to_float(value) for name, value in zip(names, numpy.asarray(values[nearest]).astype(numpy.float64))},
+        }
+    return summary
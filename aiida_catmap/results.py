@@ -0,0 +1,222 @@
+"""
+Lazy access to the maps of finished `CatMAPCalculation`s for analysis and plotting.
+
+The arrays of the map outputs are memory-mapped from the repository instead of
+being read into memory, so that selecting the values of one species at a few
+descriptor points only reads those from disk. Maps stored as `List` nodes are
+decoded once into arrays on disk. The memory maps are cached for the rest of
+the session, keyed by the UUID of the output node, which never changes once
+it is stored.
+"""
+import os
+import shutil
+import tempfile
+import numpy
+from aiida_catmap.parsers.catmap import MAP_OUTPUTS, map_to_arrays
+from aiida_catmap.parsers.summary import get_species_names
+
+## Decimals to which the descriptor values are rounded to find the axes of the grid
+DECIMALS = 10
+
+## Memory-mapped arrays of the session keyed by `(uuid, array name)`, and the directory of the decoded arrays
+_CACHE = {}
+_CACHE_DIRECTORY = None
+
+
+def clear_cache():
+    """Release the memory-mapped arrays of the session and remove the arrays decoded from `List` maps."""
+    global _CACHE_DIRECTORY  # pylint: disable=global-statement
+    _CACHE.clear()
+    if _CACHE_DIRECTORY is not None:
+        _CACHE_DIRECTORY.cleanup()
+        _CACHE_DIRECTORY = None
+
+
+def _get_cache_directory():
+    """Return the directory of the session to which arrays are copied or decoded, created on first use."""
+    global _CACHE_DIRECTORY  # pylint: disable=global-statement
+    if _CACHE_DIRECTORY is None:
+        _CACHE_DIRECTORY = tempfile.TemporaryDirectory(prefix='aiida-catmap-results-')
+    return _CACHE_DIRECTORY.name
+
+
+def _get_repository_path(node, filename):
+    """Return the path of a file of a stored node on disk, or None if the repository does not expose it."""
+    try:
+        path = node._repository._get_base_folder().get_abs_path(filename)  # pylint: disable=protected-access
+    except (AttributeError, OSError, ValueError):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def load_array(node, name):
+    """
+    Return an array of a map output as a read-only memory map, cached for the session.
+
+    The `.npy` files of `ArrayData` nodes are mapped in place, or copied to the cache directory first if the
+    repository does not expose them as files. `List` maps are decoded into `descriptors` and `values` arrays once.
+
+    :param node: a stored `ArrayData` or `List` map output
+    :param name: name of the array, `descriptors` or `values`
+    :returns: a `numpy.memmap` of the array
+    """
+    from aiida.orm import ArrayData
+
+    key = (node.uuid, name)
+    if key in _CACHE:
+        return _CACHE[key]
+
+    path = os.path.join(_get_cache_directory(), f'{node.uuid}_{name}.npy')
+    if isinstance(node, ArrayData):
+        repository_path = _get_repository_path(node, f'{name}.npy')
+        if repository_path is not None:
+            path = repository_path
+        else:
+            with node.open(f'{name}.npy', mode='rb') as source, open(path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+    else:
+        for array_name, array in zip(('descriptors', 'values'), map_to_arrays(node)):
+            numpy.save(os.path.join(_get_cache_directory(), f'{node.uuid}_{array_name}.npy'), array)
+
+    _CACHE[key] = numpy.load(path, mmap_mode='r')
+    return _CACHE[key]
+
+
+def get_grid(descriptors, values):
+    """
+    Return the values of a map arranged on the axes of its descriptor grid.
+
+    :param descriptors: array of the descriptor points, shape `(n_points, n_descriptors)`
+    :param values: array of the values of one species, shape `(n_points,)`
+    :returns: tuple of the list of the sorted values along every descriptor and the array of the values with one
+        dimension per descriptor, NaN at the grid points without a value
+    """
+    rounded = numpy.round(numpy.asarray(descriptors, dtype=numpy.float64), DECIMALS)
+    axes = [numpy.unique(rounded[:, column]) for column in range(rounded.shape[1])]
+    indices = tuple(numpy.searchsorted(axis, rounded[:, column]) for column, axis in enumerate(axes))
+
+    grid = numpy.full(tuple(len(axis) for axis in axes), numpy.nan)
+    grid[indices] = numpy.asarray(values).astype(numpy.float64)
+    return axes, grid
+
+
+class CatMAPResults:
+    """
+    Maps of a finished `CatMAPCalculation`, indexed by map and species name and loaded lazily.
+
+    The maps are the outputs of the calculation, or those of one model of a batched run if `index` is given::
+
+        results = CatMAPResults(node)
+        results.get_values('coverage_map', 'CO_s')  # memory-mapped column of the CO coverages
+        axes, grid = results.get_grid('production_rate_map', 'CO2_g')  # on the descriptor grid, for plotting
+    """
+
+    def __init__(self, node, index=None):
+        """
+        :param node: the calculation node, or its pk or UUID
+        :param index: optional index of the model of a batched run
+        """
+        from aiida.common import LinkType
+        from aiida.orm import load_node
+
+        self.node = node if hasattr(node, 'get_outgoing') else load_node(node)
+        self.index = index
+
+        outputs = {entry.link_label: entry.node for entry in self.node.get_outgoing(link_type=LinkType.CREATE).all()}
+        label = '{}' if index is None else f'batch__{{}}_{index}'
+        names = list(MAP_OUTPUTS) + ['summary']
+        self._outputs = {name: outputs[label.format(name)] for name in names if label.format(name) in outputs}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}<{self.node.pk}>' + ('' if self.index is None else f'[{self.index}]')
+
+    @property
+    def maps(self):
+        """Return the names of the map outputs, e.g. `coverage_map`."""
+        return [name for name in MAP_OUTPUTS if name in self._outputs]
+
+    def _get_map_name(self, map_name):
+        """Return the output name of a map given as its output name, `coverage_map`, or its variable, `coverage`."""
+        map_name = map_name if map_name in MAP_OUTPUTS else f'{map_name}_map'
+        if map_name not in self.maps:
+            raise KeyError(f'{self!r} has no map `{map_name}`, available maps are {self.maps}')
+        return map_name
+
+    def _get_map(self, map_name):
+        """Return the output node of a map, see `_get_map_name`."""
+        return self._outputs[self._get_map_name(map_name)]
+
+    def get_descriptor_names(self, map_name='coverage_map'):
+        """
+        Return the names of the descriptors of a map.
+
+        :param map_name: name of the map output, e.g. `coverage_map`, or of its variable, e.g. `coverage`
+        :returns: list of the descriptor names
+        """
+        names = self._get_map(map_name).get_attribute('descriptor_names', None)
+        if names is None and 'descriptor_names' in self.node.inputs:
+            names = self.node.inputs.descriptor_names.get_list()
+        return names or [f'descriptor_{index}' for index in range(self.get_descriptors(map_name).shape[1])]
+
+    def get_species_names(self, map_name='coverage_map'):
+        """
+        Return the names of the species of a map, the columns of its values.
+
+        The names are those of the output labels of the run, stored on the map by the parser or, in order, in the
+        summary, otherwise generic names.
+
+        :param map_name: name of the map output, e.g. `coverage_map`, or of its variable, e.g. `coverage`
+        :returns: list of the species names
+        """
+        node = self._get_map(map_name)
+        names = node.get_attribute('species_names', None)
+        if names is None and 'summary' in self._outputs:
+            names = self._outputs['summary'].get_dict().get('species_names', {}).get(self._get_map_name(map_name))
+        return get_species_names(names, load_array(node, 'values').shape[1])
+
+    def get_descriptors(self, map_name='coverage_map'):
+        """
+        Return the descriptor points of a map.
+
+        :param map_name: name of the map output, e.g. `coverage_map`, or of its variable, e.g. `coverage`
+        :returns: memory-mapped array of shape `(n_points, n_descriptors)`
+        """
+        return load_array(self._get_map(map_name), 'descriptors')
+
+    def get_values(self, map_name='coverage_map', species=None):
+        """
+        Return the values of a map, of all species or only of the given ones.
+
+        :param map_name: name of the map output, e.g. `coverage_map`, or of its variable, e.g. `coverage`
+        :param species: optional name of a species, or list of names
+        :returns: memory-mapped array of shape `(n_points, n_species)`, or `(n_points,)` for a single species name
+        :raises KeyError: if a species is not in the map
+        """
+        values = load_array(self._get_map(map_name), 'values')
+        if species is None:
+            return values
+
+        names = self.get_species_names(map_name)
+        missing = [name for name in numpy.atleast_1d(species) if name not in names]
+        if missing:
+            raise KeyError(f'species {missing} not in `{map_name}`, available species are {names}')
+        if isinstance(species, str):
+            return values[:, names.index(species)]
+        return values[:, [names.index(name) for name in species]]
+
+    def get_grid(self, map_name, species):
+        """
+        Return the values of one species of a map arranged on the descriptor grid, e.g. for a contour plot.
+
+        :param map_name: name of the map output, e.g. `coverage_map`, or of its variable, e.g. `coverage`
+        :param species: name of the species
+        :returns: tuple of the list of the values along every descriptor and the array of the values with one
+            dimension per descriptor, see `get_grid`
+        """
+        return get_grid(self.get_descriptors(map_name), self.get_values(map_name, species))
+
+    def __getitem__(self, key):
+        """Return the values of a map, `results['coverage_map']`, or of its species, `results['coverage_map', 'CO_s']`."""
+        if isinstance(key, tuple):
+            return self.get_values(*key)
+        return self.get_values(key)
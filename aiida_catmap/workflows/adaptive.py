@@ -0,0 +1,234 @@
+"""
+Work chain to solve a CatMAP model on an adaptively refined descriptor grid.
+"""
+import itertools
+import numpy
+from aiida import orm
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, calcfunction, while_
+from aiida_catmap.calculations.catmap import CatMAPCalculation
+from aiida_catmap.parsers.catmap import MAP_OUTPUTS, map_to_arraydata, map_to_arrays
+
+## Decimals to which the descriptor points are rounded to identify the points shared by neighbouring regions
+DECIMALS = 10
+
+
+def validate_inputs(value, _=None):
+    """Validate the inputs of the entire input namespace."""
+    if value['catmap']['resolution'].value < 2:
+        return 'the resolution of the coarse grid has to be at least 2'
+    if value['refinement']['variable'].value not in MAP_OUTPUTS:
+        return f"refinement.variable has to be one of {list(MAP_OUTPUTS)}"
+    if value['refinement']['variable'].value not in CatMAPCalculation.get_map_outputs(value['catmap']):
+        return 'the map of refinement.variable has to be in catmap.output_variables'
+    if value['refinement']['resolution'].value < 2:
+        return 'refinement.resolution has to be at least 2'
+
+
+def get_cells(descriptor_ranges, resolution):
+    """
+    Return the cells of a uniform grid, the hyper-rectangles between neighbouring grid points.
+
+    :param descriptor_ranges: list of `[start, stop]` pairs, one per descriptor
+    :param resolution: number of points along every descriptor
+    :returns: list of cells, each a list of `[start, stop]` pairs
+    """
+    axes = [numpy.linspace(start, stop, resolution).tolist() for start, stop in descriptor_ranges]
+    intervals = [list(zip(axis[:-1], axis[1:])) for axis in axes]
+    return [[list(interval) for interval in cell] for cell in itertools.product(*intervals)]
+
+
+def flag_cells(descriptors, values, regions, threshold, log_scale=False):
+    """
+    Return the cells of the solved regions in which the values vary by more than `threshold`.
+
+    The variation of a cell is the largest difference, over all species, between
+    the values at its corners. Cells with corners without a solution are not flagged.
+
+    :param descriptors: array of all the descriptor points solved so far, shape `(n_points, n_descriptors)`
+    :param values: array of the values at these points, shape `(n_points, n_species)`
+    :param regions: list of the `(descriptor_ranges, resolution)` uniform grids whose cells are considered
+    :param threshold: variation above which a cell is flagged
+    :param log_scale: compare the base 10 logarithms of the absolute values, e.g. for rates
+    :returns: list of `(variation, cell)` tuples, the largest variation first
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    if log_scale:
+        values = numpy.log10(numpy.maximum(numpy.abs(values), numpy.finfo(numpy.float64).tiny))
+    index = {tuple(point): row for row, point in enumerate(numpy.round(descriptors, DECIMALS).tolist())}
+
+    flagged = []
+    for descriptor_ranges, resolution in regions:
+        for cell in get_cells(descriptor_ranges, resolution):
+            corners = [tuple(numpy.round(corner, DECIMALS).tolist()) for corner in itertools.product(*cell)]
+            rows = [index.get(corner) for corner in corners]
+            if None in rows:
+                continue
+            corner_values = values[rows]
+            variation = float(numpy.max(corner_values.max(axis=0) - corner_values.min(axis=0)))
+            if variation > threshold:
+                flagged.append((variation, cell))
+
+    return sorted(flagged, key=lambda entry: -entry[0])
+
+
+def merge_maps(maps):
+    """
+    Merge maps on different descriptor grids into a single map on the union of their points.
+
+    Points that appear in several maps take the values of the last one, the
+    points of the merged map are sorted.
+
+    :param maps: list of `(descriptors, values)` tuples
+    :returns: tuple of the `descriptors` and `values` arrays of the merged map
+    """
+    descriptors = numpy.concatenate([entry[0] for entry in maps])
+    values = numpy.concatenate([numpy.asarray(entry[1], dtype=numpy.float64) for entry in maps])
+
+    rounded = numpy.round(descriptors, DECIMALS)
+    _, last = numpy.unique(rounded[::-1], axis=0, return_index=True)
+    rows = numpy.sort(len(rounded) - 1 - last)
+    order = numpy.lexsort(rounded[rows].T[::-1])
+    return descriptors[rows][order], values[rows][order]
+
+
+@calcfunction
+def merge_refinement(descriptor_names, **maps):
+    """
+    Merge the maps of all the calculations of an adaptive refinement into `ArrayData` nodes.
+
+    :param descriptor_names: `List` of the names of the descriptors
+    :param maps: map outputs with link labels `<output>_<index>`, the index being the order in which they were solved
+    :returns: dictionary of `ArrayData` nodes keyed by map output, for the maps that the calculations produced
+    """
+    results = {}
+    for link_label in MAP_OUTPUTS:
+        keys = [key for key in maps if key.rsplit('_', 1)[0] == link_label]
+        if not keys:
+            continue
+        nodes = [maps[key] for key in sorted(keys, key=lambda key: int(key.rsplit('_', 1)[1]))]
+        species_names = nodes[0].get_attribute('species_names', None) if isinstance(nodes[0], orm.ArrayData) else None
+        descriptors, values = merge_maps([map_to_arrays(node) for node in nodes])
+        results[link_label] = map_to_arraydata(descriptors, values, species_names, descriptor_names.get_list())
+    return results
+
+
+class CatMAPAdaptiveWorkChain(WorkChain):
+    """
+    Solve a CatMAP model on a coarse grid and refine the cells in which the solution varies strongly.
+
+    Every refinement solves a fine uniform grid of `refinement.resolution` points along each
+    descriptor on each of the flagged cells, all of them in a single batched `CatMAPCalculation`.
+    The cells of these fine grids are in turn considered for the next refinement. The maps of
+    all the calculations are merged into single maps on the resulting non-uniform set of points.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        """Define inputs, outputs and outline of the work chain."""
+        # yapf: disable
+        super(CatMAPAdaptiveWorkChain, cls).define(spec)
+
+        spec.expose_inputs(CatMAPCalculation, namespace='catmap', exclude=('batch_parameters',))
+
+        spec.input_namespace('refinement', help='Parameters of the adaptive refinement')
+        spec.input('refinement.variable', valid_type=orm.Str, default=lambda: orm.Str('coverage_map'),
+            help='Map whose variation flags the cells to refine')
+        spec.input('refinement.threshold', valid_type=orm.Float, default=lambda: orm.Float(0.1),
+            help='Variation across a cell above which it is refined; in decades for the rate maps')
+        spec.input('refinement.resolution', valid_type=orm.Int, default=lambda: orm.Int(3),
+            help='Number of points along every descriptor of the grid solved on a refined cell')
+        spec.input('refinement.max_iterations', valid_type=orm.Int, default=lambda: orm.Int(2),
+            help='Maximum number of refinements')
+        spec.input('refinement.max_cells', valid_type=orm.Int, default=lambda: orm.Int(100),
+            help='Maximum number of cells refined per refinement, those with the largest variation first')
+        spec.inputs.validator = validate_inputs
+
+        spec.outline(
+            cls.setup,
+            cls.run_calculation,
+            cls.inspect_calculation,
+            while_(cls.should_refine)(
+                cls.run_calculation,
+                cls.inspect_calculation,
+            ),
+            cls.results,
+        )
+
+        for link_label in MAP_OUTPUTS:
+            spec.output(link_label, valid_type=orm.ArrayData, required=False,
+                help=f'Merged `{link_label}` on the refined set of points, if in `catmap.output_variables`')
+
+        spec.exit_code(400, 'ERROR_COARSE_CALCULATION_FAILED', message='The calculation of the coarse grid failed')
+        spec.exit_code(401, 'ERROR_REFINEMENT_FAILED', message='Some of the refined cells could not be solved')
+
+    def setup(self):
+        """Set up the coarse grid as the first region to solve."""
+        self.ctx.iteration = 0
+        self.ctx.regions = [[self.inputs.catmap.descriptor_ranges.get_list(), self.inputs.catmap.resolution.value]]
+        self.ctx.maps = {}
+        self.ctx.solved = 0
+        self.ctx.refinement_failed = False
+
+    def should_refine(self):
+        """Return whether there are cells to refine and refinements left."""
+        return bool(self.ctx.regions) and self.ctx.iteration <= self.inputs.refinement.max_iterations.value
+
+    def run_calculation(self):
+        """Run the coarse grid, or all the cells of the current refinement in a single batched calculation."""
+        inputs = AttributeDict(self.exposed_inputs(CatMAPCalculation, 'catmap'))
+        if self.ctx.iteration > 0:
+            for name in ('parallel_workers', 'checkpoints', 'parent_folder'):
+                inputs.pop(name, None)
+            inputs.batch_parameters = orm.List(list=[
+                {'descriptor_ranges': descriptor_ranges, 'resolution': resolution}
+                for descriptor_ranges, resolution in self.ctx.regions
+            ])
+        inputs.metadata = {**inputs.get('metadata', {}), 'call_link_label': f'iteration_{self.ctx.iteration}'}
+
+        node = self.submit(CatMAPCalculation, **inputs)
+        self.report(f'submitted {node.process_label}<{node.pk}> for {len(self.ctx.regions)} region(s)')
+        return self.to_context(calculation=node)
+
+    def inspect_calculation(self):
+        """Collect the maps of the last calculation and flag the cells of its regions to refine."""
+        calculation = self.ctx.calculation
+        link_labels = CatMAPCalculation.get_map_outputs(self.inputs.catmap)
+
+        if self.ctx.iteration == 0:
+            if not calculation.is_finished_ok:
+                return self.exit_codes.ERROR_COARSE_CALCULATION_FAILED
+            outputs = [{link_label: calculation.outputs[link_label] for link_label in link_labels}]
+        else:
+            if not calculation.is_finished_ok:
+                self.ctx.refinement_failed = True
+            batch = CatMAPCalculation.get_batch_outputs(calculation)
+            outputs = []
+            for index in range(len(self.ctx.regions)):
+                nodes = {link_label: batch.get(index, {}).get(link_label) for link_label in link_labels}
+                if None not in nodes.values():
+                    outputs.append(nodes)
+
+        for nodes in outputs:
+            for link_label, node in nodes.items():
+                self.ctx.maps[f'{link_label}_{self.ctx.solved}'] = node
+            self.ctx.solved += 1
+
+        ## Flag the cells of the regions just solved, on all the points solved so far
+        variable = self.inputs.refinement.variable.value
+        descriptors, values = merge_maps([map_to_arrays(node) for key, node in self.ctx.maps.items() if key.rsplit('_', 1)[0] == variable])
+        flagged = flag_cells(
+            descriptors, values, self.ctx.regions, self.inputs.refinement.threshold.value, variable != 'coverage_map'
+        )[:self.inputs.refinement.max_cells.value]
+
+        self.ctx.iteration += 1
+        self.ctx.regions = [[cell, self.inputs.refinement.resolution.value] for _, cell in flagged]
+        self.report(f'flagged {len(flagged)} cell(s) for refinement')
+
+    def results(self):
+        """Merge the maps of all the calculations."""
+        self.out_many(merge_refinement(self.inputs.catmap.descriptor_names, **self.ctx.maps))
+
+        if self.ctx.refinement_failed:
+            self.report('some of the refined cells could not be solved, the coarse values are kept there')
+            return self.exit_codes.ERROR_REFINEMENT_FAILED
@@ -0,0 +1,192 @@
+"""
+Work chain to sweep a CatMAP model over a grid of reaction conditions.
+"""
+import itertools
+import numpy
+from aiida import orm
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, append_, calcfunction, while_
+from aiida_catmap.calculations.bulk import get_node, store_nodes
+from aiida_catmap.calculations.catmap import CatMAPCalculation
+from aiida_catmap.parsers.catmap import MAP_OUTPUTS, map_to_arraydata, map_to_arrays
+
+SWEEP_AXES = ('voltage', 'pH', 'temperature')
+
+
+def validate_inputs(value, _=None):
+    """Validate the inputs of the entire input namespace."""
+    sweep = value.get('sweep', {})
+    axes = [axis for axis in SWEEP_AXES if axis in sweep]
+    if not axes:
+        return f'at least one of the sweep axes {SWEEP_AXES} has to be specified'
+    for axis in axes:
+        if not sweep[axis].get_list():
+            return f'sweep axis `{axis}` is empty'
+    if 'temperature' not in sweep and 'temperature' not in value.get('catmap', {}):
+        return 'specify either `catmap.temperature` or `sweep.temperature`'
+
+
+def stack_maps(maps, shape):
+    """
+    Stack the maps of all the points of a sweep into a single array.
+
+    Descriptor points that have no solution for some sweep points, as well as
+    sweep points that failed altogether, are filled with NaN.
+
+    :param maps: list of `(descriptors, values)` tuples in sweep order, None for failed points
+    :param shape: shape of the sweep grid
+    :returns: tuple of the `descriptors` array of shape `(n_points, n_descriptors)`
+        and the `values` array of shape `(*shape, n_points, n_species)`
+    """
+    finished = [entry for entry in maps if entry is not None]
+
+    ## Union of the descriptor points of all the maps, in order of appearance
+    index = {}
+    rows = []
+    for descriptors, _ in finished:
+        keys = [tuple(point) for point in numpy.round(descriptors, 10).tolist()]
+        rows.append([index.setdefault(key, len(index)) for key in keys])
+
+    n_species = finished[0][1].shape[1]
+    values = numpy.full((len(maps), len(index), n_species), numpy.nan)
+    finished_rows = iter(rows)
+    for position, entry in enumerate(maps):
+        if entry is not None:
+            values[position, next(finished_rows)] = entry[1].astype(numpy.float64)
+
+    descriptors = numpy.array(list(index), dtype=numpy.float64)
+    return descriptors, values.reshape(*shape, len(index), n_species)
+
+
+@calcfunction
+def stack_sweep(sweep, **maps):
+    """
+    Stack the map outputs of the calculations of a sweep into `ArrayData` nodes.
+
+    :param sweep: `Dict` with the `axes`, their `values` and the `descriptor_names`
+    :param maps: map outputs with link labels `point_<index>_<output>`, failed points are absent
+    :returns: dictionary of `ArrayData` nodes keyed by map output, for the maps that the calculations produced
+    """
+    sweep = sweep.get_dict()
+    shape = tuple(len(sweep['values'][axis]) for axis in sweep['axes'])
+    n_points = int(numpy.prod(shape))
+
+    results = {}
+    produced = {key.split('_', 2)[2] for key in maps}
+    for link_label in [link_label for link_label in MAP_OUTPUTS if link_label in produced]:
+        nodes = [maps.get(f'point_{index}_{link_label}') for index in range(n_points)]
+        species_names = next(node.get_attribute('species_names', None) for node in nodes if node is not None)
+        descriptors, values = stack_maps([map_to_arrays(node) if node is not None else None for node in nodes], shape)
+
+        node = map_to_arraydata(descriptors, values, species_names, sweep['descriptor_names'])
+        for axis in sweep['axes']:
+            node.set_array(axis, numpy.array(sweep['values'][axis], dtype=numpy.float64))
+        node.set_attribute('sweep_axes', sweep['axes'])
+        results[link_label] = node
+
+    return results
+
+
+class CatMAPSweepWorkChain(WorkChain):
+    """
+    Run a `CatMAPCalculation` for every combination of the swept reaction conditions.
+
+    The values of the maps of all the calculations are stacked into a single
+    array of shape `(*sweep_shape, n_points, n_species)`, with the sweep axes
+    in the order `voltage`, `pH`, `temperature`.
+
+    At most `max_concurrent` calculations run at the same time: the points are
+    submitted in batches of that size, each awaited before the next one.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        """Define inputs, outputs and outline of the work chain."""
+        # yapf: disable
+        super(CatMAPSweepWorkChain, cls).define(spec)
+
+        spec.expose_inputs(CatMAPCalculation, namespace='catmap')
+        spec.inputs['catmap']['temperature'].required = False
+
+        spec.input_namespace('sweep', help='Values of the reaction conditions to sweep over')
+        for axis in SWEEP_AXES:
+            spec.input(f'sweep.{axis}', valid_type=orm.List, required=False, help=f'Values of `{axis}` to sweep over')
+        spec.input('max_concurrent', valid_type=orm.Int, default=lambda: orm.Int(50),
+            help='Maximum number of calculations that run at the same time')
+        spec.inputs.validator = validate_inputs
+
+        spec.outline(
+            cls.setup,
+            while_(cls.should_submit)(
+                cls.submit_calculations,
+            ),
+            cls.results,
+        )
+
+        for link_label in MAP_OUTPUTS:
+            spec.output(link_label, valid_type=orm.ArrayData, required=False,
+                help=f'Stacked `{link_label}` of all the sweep points, if in `catmap.output_variables`')
+
+        spec.exit_code(400, 'ERROR_ALL_CALCULATIONS_FAILED', message='None of the calculations finished successfully')
+        spec.exit_code(401, 'ERROR_SOME_CALCULATIONS_FAILED', message='Some of the calculations did not finish successfully')
+
+    def setup(self):
+        """Set up the grid of sweep points."""
+        self.ctx.axes = [axis for axis in SWEEP_AXES if axis in self.inputs.sweep]
+        self.ctx.points = list(itertools.product(*(self.inputs.sweep[axis].get_list() for axis in self.ctx.axes)))
+        self.ctx.submitted = 0
+
+    def should_submit(self):
+        """Return whether there are sweep points left to submit."""
+        return self.ctx.submitted < len(self.ctx.points)
+
+    def submit_calculations(self):
+        """Submit the next batch of calculations, at most `max_concurrent` of them."""
+        ## The exposed inputs are the stored nodes, e.g. `energies` is shared by all calculations
+        inputs = self.exposed_inputs(CatMAPCalculation, 'catmap')
+        start = self.ctx.submitted
+        stop = min(start + self.inputs.max_concurrent.value, len(self.ctx.points))
+
+        ## The points of the batch share the nodes of the values along every axis, stored in a single transaction
+        nodes = {}
+        points = []
+        for index in range(start, stop):
+            inputs_point = AttributeDict(inputs)
+            inputs_point.metadata = {**inputs.get('metadata', {}), 'call_link_label': f'point_{index}'}
+            for axis, value in zip(self.ctx.axes, self.ctx.points[index]):
+                inputs_point[axis] = get_node(axis, float(value), nodes)
+            points.append((index, inputs_point))
+        store_nodes(nodes.values())
+
+        for index, inputs_point in points:
+            node = self.submit(CatMAPCalculation, **inputs_point)
+            self.report(f'submitted {node.process_label}<{node.pk}> for point {index}')
+            self.to_context(calculations=append_(node))
+
+        self.ctx.submitted = stop
+
+    def results(self):
+        """Stack the maps of the finished calculations."""
+        maps = {}
+        failed = []
+        link_labels = CatMAPCalculation.get_map_outputs(self.inputs.catmap)
+        for index, calculation in enumerate(self.ctx.calculations):
+            if not calculation.is_finished_ok:
+                failed.append(index)
+                continue
+            for link_label in link_labels:
+                maps[f'point_{index}_{link_label}'] = calculation.outputs[link_label]
+
+        if len(failed) == len(self.ctx.calculations):
+            return self.exit_codes.ERROR_ALL_CALCULATIONS_FAILED
+
+        sweep = orm.Dict(dict={
+            'axes': self.ctx.axes,
+            'values': {axis: self.inputs.sweep[axis].get_list() for axis in self.ctx.axes},
+            'descriptor_names': self.inputs.catmap.descriptor_names.get_list(),
+        })
+        self.out_many(stack_sweep(sweep, **maps))
+
+        if failed:
+            self.report(f'calculations of the points {failed} failed, their values are NaN')
+            return self.exit_codes.ERROR_SOME_CALCULATIONS_FAILED
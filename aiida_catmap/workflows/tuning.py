@@ -0,0 +1,247 @@
+"""
+Work chain to tune the numerical settings of a CatMAP model on a subsample of its descriptor grid.
+"""
+import numpy
+from aiida import orm
+from aiida.common import AttributeDict
+from aiida.engine import WorkChain, calcfunction, if_
+from aiida_catmap.calculations.caching import get_mechanism_key
+from aiida_catmap.calculations.catmap import CatMAPCalculation
+from aiida_catmap.parsers.catmap import map_to_arrays
+from aiida_catmap.workflows.adaptive import DECIMALS
+
+## Numerical settings that are tuned, with the type of their input node
+TUNED_SETTINGS = {
+    'decimal_precision': orm.Int,
+    'tolerance': orm.Float,
+    'max_rootfinding_iterations': orm.Int,
+    'max_bisections': orm.Int,
+}
+
+## Candidate settings tried by default, in order of escalating precision
+DEFAULT_CANDIDATES = [
+    {'decimal_precision': 25, 'tolerance': 1e-10, 'max_rootfinding_iterations': 50, 'max_bisections': 3},
+    {'decimal_precision': 50, 'tolerance': 1e-25, 'max_rootfinding_iterations': 100, 'max_bisections': 3},
+    {'decimal_precision': 75, 'tolerance': 1e-35, 'max_rootfinding_iterations': 100, 'max_bisections': 5},
+]
+
+
+def validate_candidates(value, _=None):
+    """Validate the `tuning.candidates` input."""
+    candidates = value.get_list()
+    if not candidates:
+        return 'tuning.candidates is empty'
+    for index, candidate in enumerate(candidates):
+        if not isinstance(candidate, dict) or not candidate:
+            return f'entry {index} of tuning.candidates is not a non-empty dictionary'
+        invalid = set(candidate).difference(TUNED_SETTINGS)
+        if invalid:
+            return f'entry {index} of tuning.candidates contains invalid keys {sorted(invalid)}'
+
+
+def get_deviation(reference, candidate):
+    """
+    Return the largest absolute difference between the values of two maps at the points of the reference.
+
+    Points that are missing or without a solution in the candidate but solved in the reference count as an
+    infinite difference.
+
+    :param reference: tuple of the `descriptors` and `values` arrays of the reference map
+    :param candidate: tuple of the `descriptors` and `values` arrays of the candidate map
+    :returns: the largest difference as a float
+    """
+    index = {tuple(point): row for row, point in enumerate(numpy.round(candidate[0], DECIMALS).tolist())}
+    rows = [index.get(tuple(point)) for point in numpy.round(reference[0], DECIMALS).tolist()]
+    if None in rows:
+        return numpy.inf
+
+    reference_values = numpy.asarray(reference[1], dtype=numpy.float64)
+    difference = numpy.abs(reference_values - numpy.asarray(candidate[1], dtype=numpy.float64)[rows])
+    difference[numpy.isnan(reference_values)] = 0.
+    difference[numpy.isnan(difference)] = numpy.inf
+    return float(difference.max()) if difference.size else 0.
+
+
+def get_cheapest(deviations, costs, agreement):
+    """
+    Return the index of the cheapest candidate whose results agree with the reference.
+
+    :param deviations: deviation of every candidate from the reference, see `get_deviation`
+    :param costs: run time of every candidate, or None where it is not known
+    :param agreement: largest deviation for which a candidate agrees with the reference
+    :returns: the index of the candidate, the first agreeing one if their costs are not all known, or None
+    """
+    agreeing = [index for index, deviation in enumerate(deviations) if deviation <= agreement]
+    if not agreeing:
+        return None
+    if any(costs[index] is None for index in agreeing):
+        return agreeing[0]
+    return min(agreeing, key=lambda index: costs[index])
+
+
+@calcfunction
+def select_settings(candidates, agreement, timings=None, **maps):
+    """
+    Select the cheapest candidate settings whose coverages agree with those of the reference settings.
+
+    :param candidates: `List` of the candidate settings, followed by the reference settings
+    :param agreement: `Float` largest deviation of the coverages from the reference
+    :param timings: optional `timings` output of the tuning calculation, whose run times are the costs
+    :param maps: `coverage_map` outputs of the tuning calculation with link labels `coverage_map_<index>`
+    :returns: dictionary with the selected settings as the `settings` Dict, the reference settings if none agree
+    """
+    candidates = candidates.get_list()
+    reference = maps[f'coverage_map_{len(candidates) - 1}']
+
+    deviations = []
+    costs = []
+    models = timings.get_dict()['models'] if timings is not None else [None] * len(candidates)
+    for index, model in enumerate(models[:-1]):
+        node = maps.get(f'coverage_map_{index}')
+        deviations.append(numpy.inf if node is None else get_deviation(map_to_arrays(reference), map_to_arrays(node)))
+        costs.append(model['seconds'].get('run') if model is not None else None)
+
+    index = get_cheapest(deviations, costs, agreement.value)
+    return {'settings': orm.Dict(dict=candidates[-1 if index is None else index])}
+
+
+def find_tuned_settings(inputs):
+    """
+    Return the settings selected by the most recent successful tuning of the same reaction mechanism.
+
+    :param inputs: mapping of the inputs of a `CatMAPCalculation`, e.g. the `catmap` namespace of a builder
+    :returns: the `settings` Dict output of the tuning work chain, or None
+    """
+    key = get_mechanism_key(inputs['rxn_expressions'].get_list(), inputs['scaler'].value, inputs['descriptor_names'].get_list())
+    query = orm.QueryBuilder().append(
+        orm.WorkChainNode,
+        filters={'extras.catmap_mechanism_key': key, 'attributes.exit_status': 0},
+        tag='workchain',
+    ).append(orm.Dict, with_incoming='workchain', edge_filters={'label': 'settings'}, project='*')
+    query.order_by({'workchain': {'ctime': 'desc'}})
+    result = query.first()
+    return result[0] if result else None
+
+
+class CatMAPTuningWorkChain(WorkChain):
+    """
+    Select the cheapest numerical settings of a CatMAP model and solve the full grid with them.
+
+    The candidate settings and the settings of the `catmap` inputs, taken as the reference, are solved in a single
+    batched `CatMAPCalculation` on a coarse grid of `tuning.resolution` points along every descriptor. The settings
+    with the shortest run time whose coverages agree with the reference within `tuning.agreement` are selected,
+    the reference settings if none agree. The selected settings are attached as the `settings` output and the work
+    chain is tagged with the `catmap_mechanism_key` extra, so that later tunings of the same reaction mechanism can
+    reuse them, see `find_tuned_settings`.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        """Define inputs, outputs and outline of the work chain."""
+        # yapf: disable
+        super(CatMAPTuningWorkChain, cls).define(spec)
+
+        spec.expose_inputs(CatMAPCalculation, namespace='catmap', exclude=('batch_parameters',))
+
+        spec.input_namespace('tuning', help='Parameters of the tuning')
+        spec.input('tuning.candidates', valid_type=orm.List, default=lambda: orm.List(list=DEFAULT_CANDIDATES),
+            validator=validate_candidates,
+            help='Candidate settings, dictionaries with some of the keys `decimal_precision`, `tolerance`, '
+                 '`max_rootfinding_iterations` and `max_bisections`; the other settings are those of the reference')
+        spec.input('tuning.resolution', valid_type=orm.Int, default=lambda: orm.Int(3),
+            help='Number of points along every descriptor of the grid on which the candidates are compared')
+        spec.input('tuning.agreement', valid_type=orm.Float, default=lambda: orm.Float(1e-6),
+            help='Largest difference of the coverages from those of the reference settings')
+        spec.input('tuning.reuse', valid_type=orm.Bool, default=lambda: orm.Bool(False),
+            help='Reuse the settings of a previous tuning of the same reaction mechanism instead of tuning again')
+
+        spec.outline(
+            cls.setup,
+            if_(cls.should_tune)(
+                cls.run_tuning,
+                cls.inspect_tuning,
+            ),
+            cls.run_calculation,
+            cls.results,
+        )
+
+        spec.expose_outputs(CatMAPCalculation)
+        spec.output('settings', valid_type=orm.Dict, help='Numerical settings selected for the model')
+
+        spec.exit_code(400, 'ERROR_REFERENCE_FAILED', message='The model could not be solved with the reference settings')
+        spec.exit_code(401, 'ERROR_CALCULATION_FAILED', message='The calculation of the full grid failed')
+
+    def setup(self):
+        """Tag the work chain with the key of its reaction mechanism and look up previous settings if requested."""
+        catmap = self.inputs.catmap
+        key = get_mechanism_key(catmap.rxn_expressions.get_list(), catmap.scaler.value, catmap.descriptor_names.get_list())
+        self.node.set_extra('catmap_mechanism_key', key)
+
+        self.ctx.settings = None
+        if self.inputs.tuning.reuse.value:
+            self.ctx.settings = find_tuned_settings(catmap)
+            if self.ctx.settings is not None:
+                self.report(f'reusing the settings of {self.ctx.settings.creator.process_label}<{self.ctx.settings.creator.pk}>')
+
+    def should_tune(self):
+        """Return whether the settings have to be tuned."""
+        return self.ctx.settings is None
+
+    def run_tuning(self):
+        """Solve the coarse grid with every candidate and the reference settings in a single batched calculation."""
+        inputs = AttributeDict(self.exposed_inputs(CatMAPCalculation, 'catmap'))
+        for name in ('parallel_workers', 'checkpoints', 'parent_folder'):
+            inputs.pop(name, None)
+
+        resolution = self.inputs.tuning.resolution.value
+        candidates = self.inputs.tuning.candidates.get_list()
+        inputs.batch_parameters = orm.List(list=[{**candidate, 'resolution': resolution} for candidate in candidates + [{}]])
+        inputs.profile = orm.Str('timers')
+        inputs.metadata = {**inputs.get('metadata', {}), 'call_link_label': 'tuning'}
+
+        node = self.submit(CatMAPCalculation, **inputs)
+        self.report(f'submitted {node.process_label}<{node.pk}> for {len(candidates)} candidate settings')
+        return self.to_context(tuning=node)
+
+    def inspect_tuning(self):
+        """Select the cheapest candidate settings that agree with the reference."""
+        calculation = self.ctx.tuning
+        candidates = self.inputs.tuning.candidates.get_list()
+        batch = CatMAPCalculation.get_batch_outputs(calculation)
+
+        if 'coverage_map' not in batch.get(len(candidates), {}):
+            return self.exit_codes.ERROR_REFERENCE_FAILED
+
+        reference = {name: self.inputs.catmap[name].value for name in TUNED_SETTINGS}
+        maps = {
+            f'coverage_map_{index}': batch[index]['coverage_map']
+            for index in range(len(candidates) + 1) if 'coverage_map' in batch.get(index, {})
+        }
+        if 'timings' in calculation.outputs:
+            maps['timings'] = calculation.outputs.timings
+
+        self.ctx.settings = select_settings(
+            orm.List(list=[{**reference, **candidate} for candidate in candidates] + [reference]),
+            self.inputs.tuning.agreement,
+            **maps,
+        )['settings']
+        self.report(f'selected the settings {self.ctx.settings.get_dict()}')
+
+    def run_calculation(self):
+        """Solve the full grid with the selected settings."""
+        inputs = AttributeDict(self.exposed_inputs(CatMAPCalculation, 'catmap'))
+        for name, value in self.ctx.settings.get_dict().items():
+            inputs[name] = TUNED_SETTINGS[name](value)
+        inputs.metadata = {**inputs.get('metadata', {}), 'call_link_label': 'calculation'}
+
+        node = self.submit(CatMAPCalculation, **inputs)
+        self.report(f'submitted {node.process_label}<{node.pk}> for the full grid')
+        return self.to_context(calculation=node)
+
+    def results(self):
+        """Attach the outputs of the calculation of the full grid and the selected settings."""
+        if not self.ctx.calculation.is_finished_ok:
+            return self.exit_codes.ERROR_CALCULATION_FAILED
+
+        self.out_many(self.exposed_outputs(self.ctx.calculation, CatMAPCalculation))
+        self.out('settings', self.ctx.settings)
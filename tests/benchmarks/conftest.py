@@ -0,0 +1,14 @@
+"""pytest configuration of the benchmarks, which only run when requested."""
+import os
+import pytest  # pylint: disable=import-error
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks unless they are requested with `--benchmark-only`."""
+    if config.getoption('benchmark_only', default=False):
+        return
+    directory = os.path.dirname(os.path.abspath(__file__))
+    skip = pytest.mark.skip(reason='benchmarks only run with `--benchmark-only`')
+    for item in items:
+        if str(item.fspath).startswith(directory):
+            item.add_marker(skip)
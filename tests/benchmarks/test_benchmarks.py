@@ -0,0 +1,170 @@
+"""
+Benchmarks of the input generation and the parsing at realistic grid sizes.
+
+The benchmarks are skipped unless run with `pytest tests/benchmarks --benchmark-only`.
+The wall times are reported by pytest-benchmark and the peak memory, traced
+once outside of the timed rounds, is stored as `peak_memory_kb` in the
+`extra_info` of every benchmark.
+"""
+import io
+import json
+import pickle
+import tracemalloc
+import mpmath
+import numpy
+import pytest
+from aiida_catmap.calculations.runner import write_map_stream
+from aiida_catmap.parsers.decoding import decode_map, load_maps, read_map_stream
+
+RESOLUTIONS = (10, 50, 100, 200)
+N_SPECIES = 6
+PRECISION = 100
+
+
+def generate_data_file(resolution, n_species=N_SPECIES):
+    """Return the content of a synthetic CatMAP pickle file with `mpmath.mpf` valued maps on a square grid."""
+    grid = numpy.linspace(-1., 1., resolution).tolist()
+    points = [[x, y] for x in grid for y in grid]
+    with mpmath.workdps(PRECISION):
+        values = [[mpmath.mpf(index % 97 + species) / 101 for species in range(n_species)] for index in range(len(points))]
+        data = {f'{variable}_map': [list(pair) for pair in zip(points, values)] for variable in ('coverage', 'rate', 'production_rate')}
+        return pickle.dumps(data)
+
+
+def record_peak_memory(benchmark, function, *args):
+    """Run `function` once with tracemalloc and store its peak memory in the `extra_info` of the benchmark."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info['peak_memory_kb'] = peak // 1024
+
+
+@pytest.fixture(scope='module')
+def data_files(tmp_path_factory):
+    """Return a function that returns the path of the synthetic data file of a resolution, written once per module."""
+    directory = tmp_path_factory.mktemp('benchmarks')
+    paths = {}
+
+    def _data_files(resolution):
+        if resolution not in paths:
+            paths[resolution] = directory / f'aiida_{resolution}.pickle'
+            paths[resolution].write_bytes(generate_data_file(resolution))
+        return paths[resolution]
+
+    return _data_files
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_decode(benchmark, data_files, resolution):
+    """Benchmark loading and decoding the maps of a data file to float64."""
+    content = data_files(resolution).read_bytes()
+
+    def decode():
+        raw_maps = load_maps(io.BytesIO(content), ['coverage', 'rate', 'production_rate'])
+        return {variable: decode_map(raw_map) for variable, raw_map in raw_maps.items()}
+
+    record_peak_memory(benchmark, decode)
+    maps = benchmark(decode)
+    assert maps['coverage'][1].shape == (resolution**2, N_SPECIES)
+
+
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_read_map_stream(benchmark, data_files, tmp_path, resolution):
+    """Benchmark decoding the maps from a map stream into arrays on disk."""
+    stream = tmp_path / 'aiida_maps.stream'
+    write_map_stream(str(data_files(resolution)), str(stream), ['coverage', 'rate', 'production_rate'], PRECISION)
+
+    def read():
+        with open(stream, 'rb') as handle:
+            return read_map_stream(handle, ['coverage', 'rate', 'production_rate'], str(tmp_path))
+
+    record_peak_memory(benchmark, read)
+    maps = benchmark(read)
+    assert maps['coverage'][1].shape == (resolution**2, N_SPECIES)
+
+
+@pytest.mark.parametrize('output_format', ('list', 'array'))
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_parse(benchmark, fixture_localhost, generate_calc_job_node, generate_parser, data_files, tmp_path, resolution,
+               output_format):
+    """Benchmark the parser, including the creation of the output nodes."""
+    from aiida import orm
+
+    (tmp_path / 'aiida.out').write_text('')
+    (tmp_path / 'aiida.pickle').write_bytes(data_files(resolution).read_bytes())
+    (tmp_path / 'aiida_labels.json').write_text(json.dumps({'coverage': [f'X{index}_s' for index in range(N_SPECIES)]}))
+
+    inputs = {
+        'data_file': orm.Str('aiida.pickle'),
+        'descriptor_names': orm.List(list=['O_s', 'CO_s']),
+        'descriptor_ranges': orm.List(list=[[-1, 1], [-1, 1]]),
+        'resolution': orm.Int(resolution),
+        'decimal_precision': orm.Int(PRECISION),
+        'metadata': {'options': {'output_filename': 'aiida.out', 'output_format': output_format}},
+    }
+    ## An absolute path takes precedence over the fixtures directory of the tests
+    node = generate_calc_job_node('catmap', fixture_localhost, str(tmp_path), inputs)
+    parser = generate_parser('catmap')
+
+    def parse():
+        return parser(node).parse()
+
+    record_peak_memory(benchmark, parse)
+    assert benchmark(parse) is None
+
+
+@pytest.mark.parametrize('output_format', ('list', 'array'))
+@pytest.mark.parametrize('resolution', RESOLUTIONS)
+def test_store(benchmark, data_files, resolution, output_format):
+    """Benchmark storing the output nodes of a map."""
+    from aiida_catmap.parsers.catmap import map_to_arraydata, map_to_list
+
+    raw_maps = load_maps(io.BytesIO(data_files(resolution).read_bytes()), ['coverage'])
+    descriptors, values = decode_map(raw_maps['coverage'])
+
+    def store():
+        if output_format == 'array':
+            return map_to_arraydata(descriptors, values).store()
+        return map_to_list(descriptors, values).store()
+
+    record_peak_memory(benchmark, store)
+    assert benchmark(store).is_stored
+
+
+@pytest.mark.parametrize('n_models', (1, 10, 100))
+def test_prepare_for_submission(benchmark, fixture_sandbox, generate_calc_job, generate_inputs_catmap, n_models):
+    """Benchmark writing the input files, for a batch of `n_models` models."""
+    from aiida import orm
+
+    inputs = generate_inputs_catmap()
+    inputs['resolution'] = orm.Int(200)
+    if n_models > 1:
+        inputs['batch_parameters'] = orm.List(list=[{'temperature': 400. + index} for index in range(n_models)])
+
+    def prepare():
+        return generate_calc_job(fixture_sandbox, 'catmap', inputs)
+
+    record_peak_memory(benchmark, prepare)
+    assert len(benchmark(prepare).retrieve_list) == 1 + 2 * n_models
+
+
+@pytest.mark.parametrize('n_surfaces', (10, 100, 1000))
+def test_energies_data(benchmark, n_surfaces):
+    """Benchmark parsing an energies table with `n_surfaces` surfaces into an `EnergiesData` node."""
+    from aiida_catmap.data.energies import EnergiesData
+
+    lines = ['surface_name\tsite_name\tspecies_name\tformation_energy\tbulk_structure\tfrequencies\tother_parameters\treference']
+    lines += [f'None\tgas\t{species}\t{index}.5\tNone\t[2170]\t[]\tsynthetic' for index, species in enumerate(('CO', 'O2', 'CO2'))]
+    for surface in range(n_surfaces):
+        for species in ('O', 'CO', 'O-CO', 'O-O'):
+            lines.append(f'S{surface}\t111\t{species}\t{surface / n_surfaces}\tfcc\t[]\t[]\tsynthetic')
+    content = '\n'.join(lines)
+
+    def create():
+        return EnergiesData(io.StringIO(content)).store()
+
+    record_peak_memory(benchmark, create)
+    assert len(benchmark(create).surface_names) == n_surfaces
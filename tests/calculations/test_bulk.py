@@ -0,0 +1,44 @@
+"""Tests for building many ``CatMAPCalculation`` inputs at once."""
+import numpy
+import pytest
+from aiida import orm
+from aiida_catmap.calculations.bulk import get_inputs, get_node, store_nodes
+
+
+def test_get_node():
+    """Test that the same name and value give the same node, of the type of the input port."""
+    nodes = {}
+    voltage = get_node('voltage', numpy.float64(-0.5), nodes)
+
+    assert isinstance(voltage, orm.Float)
+    assert get_node('voltage', -0.5, nodes) is voltage
+    assert get_node('pH', -0.5, nodes) is not voltage
+    assert get_node('descriptor_ranges', numpy.array([[-1, 3]]), nodes).get_list() == [[-1, 3]]
+    assert get_node('voltage', voltage) is voltage
+
+    with pytest.raises(ValueError):
+        get_node('energies', 'energies.txt')
+
+
+def test_get_inputs(generate_inputs_catmap):
+    """Test that the calculations share the unchanged inputs and one node per distinct varied value."""
+    inputs = generate_inputs_catmap()
+    voltages = numpy.repeat(numpy.linspace(-1, 0, 3), 2)
+    calculations = get_inputs(inputs, {'voltage': voltages, 'pH': [0., 7.] * 3})
+
+    assert len(calculations) == 6
+    assert all(calculation['energies'] is inputs['energies'] for calculation in calculations)
+    assert calculations[0]['voltage'] is calculations[1]['voltage']
+    assert calculations[0]['pH'] is calculations[2]['pH']
+    assert [calculation['voltage'].value for calculation in calculations] == voltages.tolist()
+
+    with pytest.raises(ValueError):
+        get_inputs(inputs, {'voltage': voltages, 'pH': [0., 7.]})
+
+
+def test_store_nodes():
+    """Test that the nodes are stored in batches, each of them once."""
+    nodes = [orm.Float(value) for value in range(5)]
+    store_nodes(nodes + nodes[:2] + [orm.Float(5).store()], batch_size=2)
+
+    assert all(node.is_stored for node in nodes)
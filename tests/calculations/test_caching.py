@@ -0,0 +1,52 @@
+"""Tests for the cache keys of the ``CatMAPCalculation``."""
+import pytest
+from aiida_catmap.calculations.caching import canonicalize_mkm, get_cache_key, get_mechanism_key
+
+MKM = """scaler = 'GeneralizedLinearScaler' 
+resolution = 3 
+temperature = 500.0 
+species_definitions = {'CO_g': {'pressure': 1.0}, 's': {'total': 1, 'site_names': ['111']}} 
+data_file = 'aiida.pickle' 
+electrochemical_thermo_mode = 'simple_electrochemical' 
+electrochemical_thermo_mode = 'hbond_electrochemical' 
+"""
+
+
+def test_canonicalize_mkm():
+    """Test that the formatting, the order of the keys and the file names do not change the canonical form."""
+    reformatted = """scaler = "GeneralizedLinearScaler"
+species_definitions = {'s': {'site_names': ['111'], 'total': 1.0}, 'CO_g': {'pressure': 1}}
+temperature = 500
+resolution = 3.0
+data_file = 'aiida_0.pickle'
+electrochemical_thermo_mode = 'hbond_electrochemical'
+"""
+    assert canonicalize_mkm(reformatted) == canonicalize_mkm(MKM)
+    assert canonicalize_mkm(MKM.replace('500.0', '400.0')) != canonicalize_mkm(MKM)
+    assert canonicalize_mkm(MKM.replace("= 'hbond", "= 'simple")) != canonicalize_mkm(MKM)
+
+
+@pytest.mark.parametrize('content', ('import os', 'temperature = float(500)', 'temperature = '))
+def test_canonicalize_mkm_invalid(content):
+    """Test that content that is not a plain list of literal assignments is rejected."""
+    with pytest.raises(ValueError):
+        canonicalize_mkm(content)
+
+
+def test_get_cache_key():
+    """Test that the cache key depends on the models, the energies and the options."""
+    key = get_cache_key([MKM], 'checksum', {'output_format': 'list'})
+
+    assert get_cache_key([MKM.replace('500.0', '500')], 'checksum', {'output_format': 'list'}) == key
+    assert get_cache_key([MKM], 'other', {'output_format': 'list'}) != key
+    assert get_cache_key([MKM], 'checksum', {'output_format': 'array'}) != key
+    assert get_cache_key([MKM, MKM], 'checksum', {'output_format': 'list'}) != key
+
+
+def test_get_mechanism_key():
+    """Test that the mechanism key does not depend on the order and the spacing of the reaction expressions."""
+    key = get_mechanism_key(['CO_g + *_s -> CO*', 'O2_g + 2*_s -> 2O*'], 'GeneralizedLinearScaler', ['O_s', 'CO_s'])
+
+    assert get_mechanism_key(['O2_g + 2*_s ->  2O*', 'CO_g + *_s -> CO*'], 'GeneralizedLinearScaler', ['O_s', 'CO_s']) == key
+    assert get_mechanism_key(['CO_g + *_s -> CO*'], 'GeneralizedLinearScaler', ['O_s', 'CO_s']) != key
+    assert get_mechanism_key(['CO_g + *_s -> CO*', 'O2_g + 2*_s -> 2O*'], 'GeneralizedLinearScaler', ['CO_s', 'O_s']) != key
@@ -19,3 +19,189 @@ def test_default(fixture_sandbox, generate_calc_job, generate_inputs_catmap,
 
     # Checks on the files written to the sandbox folder as raw input
     file_regression.check(input_written, encoding='utf-8', extension='.in')
+
+
+def test_batch(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that runs several models in a single job."""
+    from aiida.orm import List
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['batch_parameters'] = List(list=[{'temperature': 400.0}, {'temperature': 500.0, 'resolution': 2}])
+    inputs['metadata']['options']['resources'] = {'num_machines': 1, 'num_mpiprocs_per_machine': 4}
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert sorted(calc_info.retrieve_list) == sorted([
+        'aiida.out', 'aiida_0.pickle', 'aiida_1.pickle', 'aiida_labels_0.json', 'aiida_labels_1.json'
+    ])
+    assert {'aiida_0.mkm', 'aiida_1.mkm', 'catmap_runner.py', 'mkm_job.py'} <= set(fixture_sandbox.get_content_list())
+
+    with fixture_sandbox.open('aiida_1.mkm') as handle:
+        input_written = handle.read()
+    assert 'temperature = 500.0 \n' in input_written
+    assert 'resolution = 2 \n' in input_written
+    assert "data_file = 'aiida_1.pickle' \n" in input_written
+
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert 'run_batch(models, processes=4)' in handle.read()
+
+
+def test_parallel_workers(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that solves the descriptor grid in parallel."""
+    from aiida.orm import Int
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['parallel_workers'] = Int(8)
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert 'aiida.pickle' in calc_info.retrieve_list
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert "run_tiled('aiida.mkm', 'aiida_labels.json', workers=8)" in handle.read()
+
+
+def test_checkpoints(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that solves the grid in strips kept as checkpoints, restarting from a parent."""
+    from aiida.orm import Int, RemoteData
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['checkpoints'] = Int(4)
+    inputs['parent_folder'] = RemoteData(computer=inputs['code'].computer, remote_path='/tmp/parent')
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert {'aiida_tile_*.pickle', 'aiida_tile_*_labels.json'} <= set(calc_info.retrieve_temporary_list)
+    assert not {'aiida_tile_*.pickle', 'aiida_tile_*_labels.json'} & set(calc_info.retrieve_list)
+    assert calc_info.remote_copy_list == [(inputs['code'].computer.uuid, '/tmp/parent/aiida_tile_*', '.')]
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert "run_tiled('aiida.mkm', 'aiida_labels.json', workers=1, tiles=4)" in handle.read()
+
+
+def test_initial_guess(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that starts from the coverage map of a previous calculation."""
+    import json
+    from aiida.orm import List
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['initial_guess'] = List(list=[[[-1.0, -0.5], [0.25, 0.5]]])
+
+    generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    with fixture_sandbox.open('aiida_initial_guess.json') as handle:
+        assert json.load(handle) == {'descriptors': [[-1.0, -0.5]], 'coverage': [[0.25, 0.5]]}
+
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert "run_model('aiida.mkm', 'aiida_labels.json', initial_guess='aiida_initial_guess.json')" in handle.read()
+
+
+def test_profile(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a profiled ``CatMAPCalculation``."""
+    from aiida.orm import Str
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['profile'] = Str('cprofile')
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert {'aiida_timings.json', 'aiida.pstats'} <= set(calc_info.retrieve_list)
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert "run_model('aiida.mkm', 'aiida_labels.json', profile='cprofile')" in handle.read()
+
+
+def test_worker_address(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that hands its model over to a persistent worker."""
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['metadata']['options']['worker_address'] = '/tmp/catmap.sock'
+
+    generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert handle.read().startswith(
+            "from catmap_runner import run_model, submit \nsubmit('/tmp/catmap.sock', run_model, 'aiida.mkm', 'aiida_labels.json') \n"
+        )
+
+
+def test_compress_outputs(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that only retrieves the compressed maps of the selected output variables."""
+    from aiida.orm import List
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['output_variables'] = List(list=['production_rate', 'coverage'])
+    inputs['metadata']['options']['compress_outputs'] = True
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert sorted(calc_info.retrieve_list) == ['aiida.pickle.gz', 'aiida_labels.json']
+    assert calc_info.retrieve_temporary_list == ['aiida.out']
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert "compress_data_file('aiida.pickle', 'aiida.pickle.gz', ['coverage', 'production_rate'], 150)" in handle.read()
+
+    inputs['metadata']['options']['debug'] = True
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert 'aiida.out' in calc_info.retrieve_list
+    assert calc_info.retrieve_temporary_list == []
+
+
+def test_stream_maps(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` that retrieves the maps as a map stream."""
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['metadata']['options'].update({'output_format': 'array', 'stream_maps': True})
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert sorted(calc_info.retrieve_list) == ['aiida.out', 'aiida_labels.json', 'aiida_maps.stream']
+    with fixture_sandbox.open('mkm_job.py') as handle:
+        assert "write_map_stream('aiida.pickle', 'aiida_maps.stream', ['coverage', 'rate', 'production_rate'], 150)" in handle.read()
+
+
+def test_energies_data(fixture_sandbox, generate_calc_job, generate_inputs_catmap):
+    """Test a ``CatMAPCalculation`` with the energies as a parsed ``EnergiesData`` table."""
+    from pathlib import Path
+    from aiida_catmap.data.energies import EnergiesData
+
+    entry_point_name = 'catmap'
+    inputs = generate_inputs_catmap()
+    inputs['energies'] = EnergiesData(str(Path(__file__).parent.parent / 'input_files' / 'energies.txt'))
+
+    calc_info = generate_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    assert calc_info.local_copy_list == []
+    with fixture_sandbox.open('energies.txt') as handle:
+        assert handle.read() == inputs['energies'].get_content()
+
+
+def test_energies_validation(generate_inputs_catmap):
+    """Test that surfaces missing from the energies table are rejected before submission."""
+    from aiida.orm import List
+    from aiida_catmap.calculations.catmap import validate_inputs
+
+    inputs = generate_inputs_catmap()
+    assert validate_inputs(inputs) is None
+
+    inputs['surface_names'] = List(list=['Pt', 'Xx'])
+    assert 'Xx' in validate_inputs(inputs)
+
+
+def test_cache_key(generate_inputs_catmap):
+    """Test that inputs that define the same model have the same cache key."""
+    from aiida.orm import Dict, Float
+
+    inputs = generate_inputs_catmap()
+    key = CatMAPCalculation.get_cache_key(inputs)
+
+    species_definitions = inputs['species_definitions'].get_dict()
+    inputs['species_definitions'] = Dict(dict=dict(reversed(list(species_definitions.items()))))
+    inputs['temperature'] = Float(500.0)
+    assert CatMAPCalculation.get_cache_key(inputs) == key
+
+    inputs['temperature'] = Float(400.0)
+    assert CatMAPCalculation.get_cache_key(inputs) != key
@@ -0,0 +1,142 @@
+"""Tests for the mock of CatMAP."""
+import json
+import pickle
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from aiida_catmap.mock import get_grid, get_species
+from aiida_catmap.parsers.decoding import decode_map, load_maps, validate_map
+
+FOLDER = Path(__file__).parent
+
+
+@pytest.mark.parametrize('resolution', (1, 4, [2, 3]))
+def test_get_grid(resolution):
+    """Test the number of points and the bounds of the grid."""
+    points = get_grid([[-1., 3.], [-0.5, 4.]], resolution)
+    numbers = [resolution] * 2 if isinstance(resolution, int) else resolution
+
+    assert len(points) == numbers[0] * numbers[1]
+    assert points[0] == [-1., -0.5]
+    if numbers[0] > 1:
+        assert points[-1] == [3., 4.]
+
+
+def test_get_species():
+    """Test the adsorbates and gas species of the reaction expressions."""
+    adsorbates, gases = get_species(['*_s + CO_g -> CO*', '2*_s + O2_g <-> O-O* + *_s -> 2O*', 'CO* +  O* <-> O-CO* + * -> CO2_g + 2*'])
+    assert adsorbates == ['CO_s', 'O_s']
+    assert gases == ['CO2_g', 'CO_g', 'O2_g']
+
+
+@pytest.mark.parametrize('script', (
+    "from catmap_runner import run_model \nrun_model('aiida.mkm', 'aiida_labels.json') \n",
+    "from catmap_runner import run_tiled \nrun_tiled('aiida.mkm', 'aiida_labels.json', workers=2) \n",
+))
+def test_mock(tmp_path, script):
+    """Test that the mock runs the job script and writes maps that match the descriptor grid."""
+    setup = (FOLDER / 'test_catmap_thermo' / 'test_default.in').read_text().replace('resolution = 1', 'resolution = 5')
+    (tmp_path / 'aiida.mkm').write_text(setup)
+    shutil.copyfile(FOLDER.parent.parent / 'aiida_catmap' / 'calculations' / 'runner.py', tmp_path / 'catmap_runner.py')
+
+    subprocess.run([sys.executable, '-m', 'aiida_catmap.mock'], input=script, text=True, cwd=tmp_path, check=True)
+
+    with open(tmp_path / 'aiida.pickle', 'rb') as handle:
+        maps = load_maps(handle, ['coverage', 'rate', 'production_rate'])
+    descriptors, values = decode_map(maps['coverage'])
+    assert values.shape == (25, 2)
+    assert validate_map(descriptors, values, 5, [[-1, 3], [-0.5, 4]]) == 0
+    assert (tmp_path / 'aiida_labels.json').read_text() == (
+        '{"coverage": ["CO_s", "O_s"], "rate": ["*_s + CO_g -> CO*", "2*_s + O2_g <-> O-O* + *_s -> 2O*", '
+        '"CO* +  O* <-> O-CO* + * -> CO2_g + 2*"], "production_rate": ["CO2_g", "CO_g", "O2_g"]}'
+    )
+
+
+@pytest.mark.parametrize('script', (
+    "from catmap_runner import run_model \nrun_model('aiida.mkm', 'aiida_labels.json', profile='cprofile') \n",
+    "from catmap_runner import run_tiled \nrun_tiled('aiida.mkm', 'aiida_labels.json', workers=2, profile='cprofile') \n",
+))
+def test_mock_profile(tmp_path, script):
+    """Test the timings and the root finding counts of a profiled run."""
+    setup = (FOLDER / 'test_catmap_thermo' / 'test_default.in').read_text().replace('resolution = 1', 'resolution = 5')
+    (tmp_path / 'aiida.mkm').write_text(setup)
+    shutil.copyfile(FOLDER.parent.parent / 'aiida_catmap' / 'calculations' / 'runner.py', tmp_path / 'catmap_runner.py')
+
+    subprocess.run([sys.executable, '-m', 'aiida_catmap.mock'], input=script, text=True, cwd=tmp_path, check=True)
+
+    timings = json.loads((tmp_path / 'aiida_timings.json').read_text())
+    models = timings.get('parts', [timings])
+    assert sum(model['points']['grid'] for model in models) == 25
+    for model in models:
+        assert model['mode'] == 'cprofile'
+        assert model['points']['solved'] == model['points']['grid']
+        assert model['root_finding_calls']['max'] == 1
+        assert model['residual_evaluations']['mean'] > 0
+    assert (tmp_path / 'aiida.pstats').is_file()
+    assert not list(tmp_path.glob('aiida_tile_*_timings.json'))
+
+
+@pytest.mark.parametrize('options', ({}, {'output_format': 'array', 'stream_maps': True}))
+def test_mock_calculation(run_mock_catmap, options):
+    """Test the full cycle of a ``CatMAPCalculation`` against the mock of CatMAP."""
+    from aiida.orm import Int
+
+    node = run_mock_catmap(resolution=Int(4), options=options)
+
+    assert node.is_finished_ok, node.exit_status
+    assert {'log', 'coverage_map', 'rate_map', 'production_rate_map'} <= set(node.outputs)
+
+
+def test_mock_calculation_batch(run_mock_catmap):
+    """Test the full cycle of a batched ``CatMAPCalculation``, whose outputs are validated against the spec."""
+    from aiida.orm import Int, List
+    from aiida_catmap.calculations.catmap import CatMAPCalculation
+
+    node = run_mock_catmap(resolution=Int(3), batch_parameters=List(list=[{'temperature': 450.}, {'temperature': 500.}]))
+
+    assert node.is_finished_ok, node.exit_status
+    for index in range(2):
+        assert {f'coverage_map_{index}', f'rate_map_{index}', f'summary_{index}'} <= set(node.outputs.batch)
+    assert node.outputs.batch.summary_1['conditions']['temperature'] == 500.
+
+    batch = CatMAPCalculation.get_batch_outputs(node)
+    assert sorted(batch) == [0, 1]
+    assert {'coverage_map', 'rate_map', 'summary'} <= set(batch[1])
+    assert batch[1]['summary'].uuid == node.outputs.batch.summary_1.uuid
+
+
+def test_worker(tmp_path, monkeypatch):
+    """Test that a persistent worker solves the model of a job script, and that the script runs it without one."""
+    monkeypatch.setenv('AIIDA_CATMAP_WORKER_KEY', str(tmp_path / 'worker.key'))
+    address = str(tmp_path / 'worker.sock')
+    runner = FOLDER.parent.parent / 'aiida_catmap' / 'calculations' / 'runner.py'
+    setup = (FOLDER / 'test_catmap_thermo' / 'test_default.in').read_text()
+    script = f"from catmap_runner import run_model, submit \nsubmit('{address}', run_model, 'aiida.mkm', 'aiida_labels.json') \n"
+    for name in ('worker', 'job', 'fallback'):
+        (tmp_path / name).mkdir()
+        shutil.copyfile(runner, tmp_path / name / 'catmap_runner.py')
+        (tmp_path / name / 'aiida.mkm').write_text(setup)
+
+    ## Without a worker the job script needs CatMAP itself
+    fallback = subprocess.run([sys.executable, '-m', 'aiida_catmap.mock'], input=script, text=True, cwd=tmp_path / 'fallback',
+        check=True, capture_output=True)
+    assert 'not available' in fallback.stdout
+    assert (tmp_path / 'fallback' / 'aiida.pickle').is_file()
+
+    ## With a worker the job script does not import CatMAP
+    worker = subprocess.Popen([sys.executable, '-m', 'aiida_catmap.mock'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        text=True, cwd=tmp_path / 'worker')
+    try:
+        worker.stdin.write(f"from catmap_runner import serve \nserve('{address}') \n")
+        worker.stdin.close()
+        assert 'listening' in worker.stdout.readline()
+
+        job = subprocess.run([sys.executable, '-c', script], text=True, cwd=tmp_path / 'job', check=True, capture_output=True)
+        assert 'not available' not in job.stdout
+        assert (tmp_path / 'job' / 'aiida.pickle').is_file()
+        assert (tmp_path / 'job' / 'aiida_labels.json').is_file()
+    finally:
+        worker.terminate()
+        worker.wait()
@@ -0,0 +1,130 @@
+"""Tests for the run script of the ``CatMAPCalculation``."""
+import json
+import pickle
+import pytest
+from aiida_catmap.calculations.runner import (
+    Profiler, compress_data_file, get_tiles, is_solved, merge_data_files, seed_data_file
+)
+
+
+@pytest.mark.parametrize('num_tiles', (1, 3, 7, 20))
+def test_get_tiles(num_tiles):
+    """Test that the strips cover exactly the points of the full grid."""
+    descriptor_ranges = [[-1., 3.], [0., 1.]]
+    resolution = 7
+    tiles = get_tiles(descriptor_ranges, resolution, num_tiles)
+
+    assert len(tiles) == min(num_tiles, resolution)
+    points = []
+    for (first_range, second_range), (first_resolution, second_resolution) in tiles:
+        assert second_range == descriptor_ranges[1]
+        assert second_resolution == resolution
+        if first_resolution == 1:
+            assert first_range[0] == first_range[1]
+            points.append(first_range[0])
+        else:
+            step = (first_range[1] - first_range[0]) / (first_resolution - 1)
+            points.extend(first_range[0] + index * step for index in range(first_resolution))
+
+    assert points == pytest.approx([-1. + index * 4. / 6. for index in range(resolution)])
+
+
+def test_merge_data_files(tmp_path):
+    """Test that the maps of the strips are concatenated."""
+    data_files = []
+    for index in range(2):
+        data_files.append(str(tmp_path / f'tile_{index}.pickle'))
+        with open(data_files[-1], 'wb') as handle:
+            pickle.dump({'coverage_map': [[[index, 0.], [0.5]]], 'rxn_expressions': [index]}, handle)
+
+    merge_data_files(data_files, str(tmp_path / 'merged.pickle'), 15)
+
+    with open(tmp_path / 'merged.pickle', 'rb') as handle:
+        merged = pickle.load(handle)
+    assert merged == {'coverage_map': [[[0, 0.], [0.5]], [[1, 0.], [0.5]]], 'rxn_expressions': [0]}
+
+
+def test_seed_data_file(tmp_path):
+    """Test that the initial guess is written as the coverage map of the data file, at the precision of the model."""
+    import mpmath
+
+    with open(tmp_path / 'guess.json', 'w') as handle:
+        json.dump({'descriptors': [[0., 1.]], 'coverage': [['0.14285714285714285714285714', 0.5]]}, handle)
+
+    seed_data_file(str(tmp_path / 'guess.json'), str(tmp_path / 'aiida.pickle'), 50)
+
+    with mpmath.workdps(50), open(tmp_path / 'aiida.pickle', 'rb') as handle:
+        data = pickle.load(handle)
+    (point, coverage), = data['coverage_map']
+    assert point == [0., 1.]
+    assert mpmath.nstr(coverage[0], 26) == '0.14285714285714285714285714'
+    assert coverage[1] == mpmath.mpf('0.5')
+
+
+def test_is_solved(tmp_path):
+    """Test that a strip only counts as solved with its labels file and an identical mkm file."""
+    mkm_file, data_file, labels_file = (str(tmp_path / name) for name in ('tile.mkm', 'tile.pickle', 'tile.json'))
+    (tmp_path / 'tile.mkm').write_text('resolution = 3 \n')
+    (tmp_path / 'tile.pickle').write_bytes(b'')
+
+    assert not is_solved(mkm_file, 'resolution = 3 \n', data_file, labels_file)
+    (tmp_path / 'tile.json').write_text('{}')
+    assert is_solved(mkm_file, 'resolution = 3 \n', data_file, labels_file)
+    assert not is_solved(mkm_file, 'resolution = 4 \n', data_file, labels_file)
+
+
+def test_compress_data_file(tmp_path):
+    """Test that only the maps of the selected variables are compressed, and that a missing data file is skipped."""
+    import gzip
+
+    data_file = tmp_path / 'aiida.pickle'
+    with open(data_file, 'wb') as handle:
+        pickle.dump({'coverage_map': [[[0., 0.], [0.5]]], 'rate_map': [[[0., 0.], [1.]]], 'rxn_parameters': [1.]}, handle)
+
+    compress_data_file(str(data_file), str(tmp_path / 'aiida.pickle.gz'), ['coverage', 'production_rate'], 15)
+    with gzip.open(tmp_path / 'aiida.pickle.gz', 'rb') as handle:
+        assert pickle.load(handle) == {'coverage_map': [[[0., 0.], [0.5]]]}
+
+    compress_data_file(str(tmp_path / 'missing.pickle'), str(tmp_path / 'missing.pickle.gz'), ['coverage'], 15)
+    assert not (tmp_path / 'missing.pickle.gz').exists()
+
+
+def test_profiler_unavailable(tmp_path):
+    """Test that the counts of a solver without the instrumented methods are reported as unavailable, not as zeros."""
+    profiler = Profiler('timers')
+    profiler.instrument(None, 'get_rxn_parameters', 'scaler')
+    profiler.instrument(object(), 'get_coverage', 'root_finding', per_point=True)
+    profiler.count_residuals(None)
+    profiler.dump(str(tmp_path / 'aiida.mkm'), [[0., 0.], [0., 1.]])
+
+    timings = json.loads((tmp_path / 'aiida_timings.json').read_text())
+    assert timings['unavailable'] == ['scaler', 'root_finding', 'residual_evaluations']
+    assert timings['points'] is None
+    assert timings['residual_evaluations'] is None
+
+
+def test_profiler_residuals(tmp_path):
+    """Test that the evaluations of the residual passed to `get_steady_state_coverage` are counted per point."""
+
+    class Solver:
+        """Solver with the call chain of CatMAP, evaluating the residual twice per point."""
+
+        def get_coverage(self, descriptors):
+            return self.get_steady_state_coverage(descriptors, lambda x: x, None, c0=[0.5])
+
+        @staticmethod
+        def get_steady_state_coverage(rxn_parameters, steady_state_fn, jacobian_fn, c0=None):  # pylint: disable=unused-argument
+            return [steady_state_fn(steady_state_fn(value)) for value in c0]
+
+    solver = Solver()
+    profiler = Profiler('timers')
+    profiler.instrument(solver, 'get_coverage', 'root_finding', per_point=True)
+    profiler.count_residuals(solver)
+    assert solver.get_coverage([0., 0.]) == [0.5]
+    solver.get_coverage([0., 1.])
+    profiler.dump(str(tmp_path / 'aiida.mkm'), [[0., 0.], [0., 1.]])
+
+    timings = json.loads((tmp_path / 'aiida_timings.json').read_text())
+    assert timings['unavailable'] == []
+    assert timings['points'] == {'grid': 2, 'solved': 2, 'bisection': 0}
+    assert timings['residual_evaluations'] == {'total': 4, 'mean': 2., 'max': 2}
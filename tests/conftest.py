@@ -55,6 +55,50 @@ def generate_code(fixture_localhost):  # pylint: disable=redefined-outer-name
     return _generate_code
 
 
+@pytest.fixture
+def generate_mock_code(fixture_localhost):  # pylint: disable=redefined-outer-name
+    """Return a ``Code`` that runs the mock of CatMAP, see ``aiida_catmap.mock``."""
+    def _generate_mock_code():
+        import shutil
+        from aiida.common import exceptions
+        from aiida.orm import Code
+
+        label = 'test.catmap.mock'
+
+        try:
+            return Code.objects.get(label=label)  # pylint: disable=no-member
+        except exceptions.NotExistent:
+            return Code(
+                label=label,
+                input_plugin_name='catmap',
+                remote_computer_exec=[fixture_localhost, shutil.which('aiida-catmap-mock')],
+            )
+
+    return _generate_mock_code
+
+
+@pytest.fixture
+def run_mock_catmap(generate_inputs_catmap, generate_mock_code):  # pylint: disable=redefined-outer-name
+    """Run a ``CatMAPCalculation`` through the full submit, retrieve and parse cycle against the mock of CatMAP."""
+    def _run_mock_catmap(**overrides):
+        """Run the calculation with the default inputs updated with ``overrides``.
+
+        :return: the ``CalcJobNode`` of the calculation
+        """
+        from aiida.engine import run_get_node
+        from aiida.plugins import CalculationFactory
+
+        inputs = generate_inputs_catmap()
+        inputs['code'] = generate_mock_code()
+        inputs['metadata']['options'].update(overrides.pop('options', {}))
+        inputs.update(overrides)
+
+        _, node = run_get_node(CalculationFactory('catmap'), **inputs)
+        return node
+
+    return _run_mock_catmap
+
+
 @pytest.fixture
 def generate_calc_job():
     """Fixture to construct a new ``CalcJob`` instance and call ``prepare_for_submission``.
@@ -0,0 +1,71 @@
+"""Tests for the `EnergiesData` data type."""
+import io
+import pytest
+from aiida_catmap.data.energies import EnergiesData, parse_energies, validate_energies
+
+SURFACE_NAMES = ['Pt', 'Ag', 'Cu', 'Rh', 'Pd', 'Au', 'Ru', 'Ni']
+RXN_EXPRESSIONS = ['*_s + CO_g -> CO*', '2*_s + O2_g <-> O-O* + *_s -> 2O*', 'CO* +  O* <-> O-CO* + * -> CO2_g + 2*']
+
+
+@pytest.fixture
+def energies_path():
+    """Return the path of the energies file of the tests."""
+    from pathlib import Path
+    return str(Path(__file__).parent.parent / 'input_files' / 'energies.txt')
+
+
+def test_energies_data(energies_path):
+    """Test that the table is parsed and that the regenerated content is equivalent to the file."""
+    node = EnergiesData(energies_path)
+
+    assert node.filename == 'energies.txt'
+    assert node.columns[:4] == ['surface_name', 'site_name', 'species_name', 'formation_energy']
+    assert set(SURFACE_NAMES) <= set(node.surface_names)
+    assert node.get_column('formation_energy').dtype.kind == 'f'
+
+    with open(energies_path, encoding='utf8') as handle:
+        assert parse_energies(node.get_content()) == parse_energies(handle.read())
+
+
+def test_energies_data_malformed():
+    """Test that a malformed table is rejected."""
+    with pytest.raises(ValueError, match='columns'):
+        EnergiesData(io.StringIO('surface_name\tspecies_name\nPt\tO\n'))
+    with pytest.raises(ValueError, match='fields'):
+        EnergiesData(io.StringIO('surface_name\tsite_name\tspecies_name\tformation_energy\nPt\t111\tO\n'))
+    with pytest.raises(ValueError, match='without a name'):
+        EnergiesData(io.StringIO('surface_name\tsite_name\tspecies_name\tformation_energy\t\nPt\t111\tO\t-1.0\t\n'))
+    with pytest.raises(ValueError, match='duplicate'):
+        EnergiesData(io.StringIO('surface_name\tsite_name\tspecies_name\tformation_energy\tsite_name\nPt\t111\tO\t-1.0\t111\n'))
+
+
+def test_validate_energies(energies_path):
+    """Test that missing surfaces and species are reported."""
+    columns = EnergiesData(energies_path).get_columns()
+
+    assert validate_energies(columns, SURFACE_NAMES, RXN_EXPRESSIONS, ['O_s', 'CO_s']) is None
+    assert 'Xx' in validate_energies(columns, ['Pt', 'Xx'], RXN_EXPRESSIONS, ['O_s', 'CO_s'])
+    assert 'H2' in validate_energies(columns, SURFACE_NAMES, ['H2_g + 2*_s -> 2H*'], ['O_s', 'CO_s'])
+    assert 'OH on Pt' in validate_energies(columns, SURFACE_NAMES, RXN_EXPRESSIONS, ['OH_s'])
+
+
+def test_validate_energies_descriptors(energies_path):
+    """Test that only the descriptors that name a species are checked, and only with the linear scaler."""
+    columns = EnergiesData(energies_path).get_columns()
+
+    assert validate_energies(columns, SURFACE_NAMES, RXN_EXPRESSIONS, ['O_s', 'd_band_center']) is None
+    assert validate_energies(columns, SURFACE_NAMES, RXN_EXPRESSIONS, ['O_s', 'voltage']) is None
+    assert 'OH on Pt' in validate_energies(columns, SURFACE_NAMES, RXN_EXPRESSIONS, ['OH_s', 'd_band_center'])
+    assert validate_energies(columns, SURFACE_NAMES, RXN_EXPRESSIONS, ['OH_s'], 'ThermodynamicScaler') is None
+
+
+def test_validate_energies_electrochemical(energies_path):
+    """Test that the pseudo-gases of electrochemical reactions do not need an energy, and that any column name is kept."""
+    with open(energies_path, encoding='utf8') as handle:
+        content = handle.read().replace('\treference', '\treference (DOI)', 1)
+    columns = EnergiesData(io.StringIO(content)).get_columns()
+    rxn_expressions = ['CO2_g + pe_g + *_s <-> COOH_s', 'COOH_s + pe_g <-> CO_g + *_s', 'O2_g + 2*_s -> 2O*', 'O* + ele_g -> O-_s']
+
+    assert 'reference (DOI)' in columns
+    assert validate_energies(columns, SURFACE_NAMES, rxn_expressions, ['O_s', 'CO_s']) is None
+    assert 'H2' in validate_energies(columns, SURFACE_NAMES, rxn_expressions + ['2pe_g <-> H2_g'], ['O_s', 'CO_s'])
@@ -0,0 +1,233 @@
+"""Tests for the `CatMAPParser`."""
+import os
+import pytest
+from aiida import orm
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'catmap')
+
+
+@pytest.fixture
+def generate_parser_inputs():
+    """Return the inputs of the mock calculation node that the parser needs."""
+    def _generate_parser_inputs(**options):
+        options.setdefault('output_filename', 'aiida.out')
+        return {
+            'data_file': orm.Str('aiida.pickle'),
+            'descriptor_names': orm.List(list=['O_s', 'CO_s']),
+            'descriptor_ranges': orm.List(list=[[-1, 3], [-0.5, 4]]),
+            'resolution': orm.Int(3),
+            'decimal_precision': orm.Int(100),
+            'metadata': {
+                'options': options
+            },
+        }
+
+    return _generate_parser_inputs
+
+
+def test_default(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test the default `list` output format."""
+    node = generate_calc_job_node('catmap', fixture_localhost, 'default', generate_parser_inputs())
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert set(results) == {'log', 'coverage_map', 'rate_map', 'production_rate_map', 'summary'}
+
+    coverage_map = results['coverage_map'].get_list()
+    assert len(coverage_map) == 9
+    assert coverage_map[0][0] == [-1.0, -0.5]
+    assert coverage_map[1][1] == pytest.approx([1 / 7, 2 / 7])
+    assert results['coverage_map'].get_attribute('species_names') == ['CO_s', 'O_s']
+    assert results['production_rate_map'].get_attribute('species_names') == ['CO2_g', 'CO_g', 'O2_g']
+
+
+def test_array(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test the `array` output format."""
+    inputs = generate_parser_inputs(output_format='array')
+    node = generate_calc_job_node('catmap', fixture_localhost, 'default', inputs)
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    coverage_map = results['coverage_map']
+    assert isinstance(coverage_map, orm.ArrayData)
+    assert coverage_map.get_array('descriptors').shape == (9, 2)
+    assert coverage_map.get_array('values').shape == (9, 2)
+    assert coverage_map.get_array('values')[1] == pytest.approx([1 / 7, 2 / 7])
+    assert coverage_map.get_attribute('species_names') == ['CO_s', 'O_s']
+    assert coverage_map.get_attribute('descriptor_names') == ['O_s', 'CO_s']
+    assert results['production_rate_map'].get_array('values').shape == (9, 3)
+
+
+def test_keep_precision(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test the `array` output format with the full precision of the values."""
+    inputs = generate_parser_inputs(output_format='array', keep_precision=True)
+    node = generate_calc_job_node('catmap', fixture_localhost, 'default', inputs)
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    values = results['coverage_map'].get_array('values')
+    assert values.dtype.kind == 'U'
+    assert values[1, 0].startswith('0.142857142857142857142857')
+
+
+def test_batch(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test a batched run of which the second model failed."""
+    inputs = generate_parser_inputs(output_format='array')
+    inputs['batch_parameters'] = orm.List(list=[{'voltage': -0.5}, {'voltage': -0.4}])
+    node = generate_calc_job_node('catmap', fixture_localhost, 'batch', inputs)
+    parser = generate_parser('catmap')(node)
+    exit_code = parser.parse()
+
+    assert exit_code == node.process_class.exit_codes.ERROR_BATCH_MODEL_FAILED
+    assert set(parser.outputs) == {
+        'log', 'batch.coverage_map_0', 'batch.rate_map_0', 'batch.production_rate_map_0', 'batch.summary_0'
+    }
+    assert parser.outputs['batch.summary_0']['conditions']['voltage'] == -0.5
+    assert parser.outputs['batch.coverage_map_0'].get_array('values').shape == (9, 2)
+    assert parser.outputs['batch.coverage_map_0'].get_attribute('species_names') == ['CO_s', 'O_s']
+
+
+def test_parser_workers(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test a batched run whose data files are decoded in a pool of worker processes."""
+    inputs = generate_parser_inputs(output_format='array', parser_workers=2)
+    inputs['batch_parameters'] = orm.List(list=[{'voltage': -0.5}, {'voltage': -0.4}])
+    node = generate_calc_job_node('catmap', fixture_localhost, 'batch_workers', inputs)
+    parser = generate_parser('catmap')(node)
+    exit_code = parser.parse()
+
+    assert exit_code is None
+    for index in range(2):
+        assert parser.outputs[f'batch.coverage_map_{index}'].get_array('values')[1] == pytest.approx([1 / 7, 2 / 7])
+        assert parser.outputs[f'batch.summary_{index}']['conditions']['voltage'] == [-0.5, -0.4][index]
+
+
+def test_parser_workers_single(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test that the single data file of a run is decoded in a worker process as well."""
+    inputs = generate_parser_inputs(output_format='array', parser_workers=2)
+    node = generate_calc_job_node('catmap', fixture_localhost, 'default', inputs)
+    parser = generate_parser('catmap')(node)
+    exit_code = parser.parse()
+
+    assert exit_code is None
+    assert not parser._decoded  # pylint: disable=protected-access
+    assert parser.outputs['coverage_map'].get_array('values')[1] == pytest.approx([1 / 7, 2 / 7])
+    assert parser.outputs['coverage_map'].get_attribute('species_names') == ['CO_s', 'O_s']
+
+
+def test_stream_maps(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test the maps read from the map stream, with a log that is too large to be stored."""
+    inputs = generate_parser_inputs(output_format='array', keep_precision=True, stream_maps=True, max_log_size=0)
+    node = generate_calc_job_node('catmap', fixture_localhost, 'stream', inputs)
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert set(results) == {'coverage_map', 'rate_map', 'production_rate_map', 'summary'}
+
+    values = results['coverage_map'].get_array('values')
+    assert values.shape == (9, 2)
+    assert values[1, 0].startswith('0.142857142857142857142857')
+    assert results['coverage_map'].get_array('descriptors')[0].tolist() == [-1.0, -0.5]
+
+
+def test_summary(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs, generate_energy_file):
+    """Test the summary of the maps, including the production rates at the surfaces."""
+    inputs = generate_parser_inputs()
+    inputs.update({
+        'energies': generate_energy_file(),
+        'surface_names': orm.List(list=['Pt', 'Au']),
+        'temperature': orm.Float(500.),
+    })
+    node = generate_calc_job_node('catmap', fixture_localhost, 'default', inputs)
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    summary = results['summary'].get_dict()
+    assert summary['conditions'] == {'temperature': 500., 'voltage': None, 'pH': None}
+    assert summary['coverage_map']['CO_s']['max'] == pytest.approx(6 / 7)
+    assert set(summary['production_rate_map']) == {'CO2_g', 'CO_g', 'O2_g'}
+    assert summary['species_names']['production_rate_map'] == ['CO2_g', 'CO_g', 'O2_g']
+    assert summary['species_names']['coverage_map'] == ['CO_s', 'O_s']
+    assert summary['surfaces']['Pt']['descriptors'] == [1.62, 1.7]
+    assert summary['surfaces']['Pt']['grid_point'] == [1., 1.75]
+    assert summary['surfaces']['Au']['grid_point'] == [3., 4.]
+    assert set(summary['surfaces']['Pt']['values']) == {'CO2_g', 'CO_g', 'O2_g'}
+
+
+def test_partial(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test an interrupted run of a split grid, of which only the first strip was solved."""
+    inputs = generate_parser_inputs(output_format='array')
+    inputs['checkpoints'] = orm.Int(3)
+    node = generate_calc_job_node('catmap', fixture_localhost, 'partial', inputs)
+    parser = generate_parser('catmap')(node)
+
+    ## The strips are only retrieved temporarily
+    assert parser.parse() == node.process_class.exit_codes.ERROR_MISSING_OUTPUT_FILES
+
+    parser = generate_parser('catmap')(node)
+    exit_code = parser.parse(retrieved_temporary_folder=os.path.join(FIXTURES, 'partial_temporary'))
+
+    assert exit_code == node.process_class.exit_codes.ERROR_PARTIAL_RESULTS
+    assert parser.outputs['coverage_map'].get_array('values').shape == (3, 2)
+    assert parser.outputs['coverage_map'].get_array('descriptors')[:, 0].tolist() == [-1., -1., -1.]
+    assert parser.outputs['coverage_map'].get_attribute('species_names') == ['CO_s', 'O_s']
+
+
+def test_profile(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test the timings of a profiled run."""
+    inputs = generate_parser_inputs()
+    inputs['profile'] = orm.Str('cprofile')
+    node = generate_calc_job_node('catmap', fixture_localhost, 'profile', inputs)
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+
+    timings = results['timings'].get_dict()
+    assert {'read', 'validate', 'nodes', 'summary', 'total'} <= set(timings['parser'])
+    assert len(timings['models']) == 1
+
+    model = timings['models'][0]
+    assert {'setup', 'run', 'root_finding'} <= set(model['seconds'])
+    assert model['points'] == {'grid': 9, 'solved': 9, 'bisection': 0}
+    assert model['residual_evaluations']['total'] == 108
+    assert 0 < len(model['functions']) <= 20
+    assert model['functions'][0]['cumulative'] >= model['functions'][-1]['cumulative']
+
+
+def test_compress_outputs(fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test the compressed data file with the selected output variables, without the log."""
+    inputs = generate_parser_inputs(output_format='array', compress_outputs=True, debug=False)
+    inputs['output_variables'] = orm.List(list=['coverage'])
+    node = generate_calc_job_node('catmap', fixture_localhost, 'compressed', inputs)
+    parser = generate_parser('catmap')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok, calcfunction.exit_message
+    assert set(results) == {'coverage_map', 'summary'}
+    assert results['coverage_map'].get_array('values')[1] == pytest.approx([1 / 7, 2 / 7])
+    assert set(results['summary'].get_dict()) == {'coverage_map', 'species_names', 'conditions'}
+
+
+def test_compress_outputs_log(tmp_path, fixture_localhost, generate_calc_job_node, generate_parser, generate_parser_inputs):
+    """Test that the errors of the temporarily retrieved log are reported, the log itself not being stored."""
+    inputs = generate_parser_inputs(output_format='array', compress_outputs=True, debug=False)
+    inputs['output_variables'] = orm.List(list=['coverage'])
+    node = generate_calc_job_node('catmap', fixture_localhost, 'compressed', inputs)
+    (tmp_path / 'aiida.out').write_text(
+        'CatMAP model aiida_1.mkm failed:\nTraceback (most recent call last):\n  File "catmap_runner.py", line 1\n'
+        '    model.run()\nValueError: no solution\n'
+    )
+    parser = generate_parser('catmap')(node)
+
+    assert parser.parse(retrieved_temporary_folder=str(tmp_path)) is None
+    assert 'log' not in parser.outputs
+    assert parser._scan_log(str(tmp_path), 'aiida.out') == ['ValueError: no solution']  # pylint: disable=protected-access
+    assert parser._scan_log(None, 'aiida.out') == []  # pylint: disable=protected-access
@@ -0,0 +1,134 @@
+"""Tests for the decoding of the CatMAP pickle file."""
+import gzip
+import io
+import pickle
+import mpmath
+import numpy
+import pytest
+from aiida_catmap.calculations.runner import write_map_stream
+from aiida_catmap.parsers.decoding import (
+    MalformedMapError, MapDecodingError, MissingMapError, decode_data_files, decode_map, load_maps, read_map_stream,
+    validate_map
+)
+
+
+def generate_raw_map(resolution=3, n_species=2):
+    """Return a raw map with `mpmath.mpf` values on a square descriptor grid."""
+    grid = numpy.linspace(0., 1., resolution)
+    return [[[x, y], [mpmath.mpf(index + species) / 3 for species in range(n_species)]]
+            for index, (x, y) in enumerate((x, y) for x in grid for y in grid)]
+
+
+def test_decode_map():
+    """Test that the values are converted exactly like `float(mpf)`."""
+    raw_map = generate_raw_map()
+    descriptors, values = decode_map(raw_map)
+
+    assert descriptors.shape == (9, 2)
+    assert values.dtype == numpy.float64
+    assert values.tolist() == [list(map(float, row)) for _, row in raw_map]
+
+
+def test_decode_map_precision():
+    """Test that the values are kept as strings when the precision exceeds float64."""
+    with mpmath.workdps(40):
+        _, values = decode_map(generate_raw_map(), precision=30)
+
+    assert values.dtype.kind == 'U'
+    assert values[1, 0] == '0.333333333333333333333333333333'
+
+
+@pytest.mark.parametrize('raw_map', (
+    [],
+    [[[0., 0.], [1., 2.]], [[0., 1.], [1.]]],
+    [[[0., 0.], ['a', 2.]]],
+    [[0., 0.]],
+))
+def test_decode_map_invalid(raw_map):
+    """Test that malformed maps raise."""
+    with pytest.raises(MapDecodingError):
+        decode_map(raw_map)
+
+
+def test_validate_map():
+    """Test the validation against the descriptor grid."""
+    descriptors, values = decode_map(generate_raw_map()[:-1])
+    assert validate_map(descriptors, values, 3, [[0, 1], [1, 0]]) == 1
+
+    with pytest.raises(MapDecodingError):
+        validate_map(descriptors, values, 2, [[0, 1], [0, 1]])
+    with pytest.raises(MapDecodingError):
+        validate_map(descriptors, values, 3, [[0, 1], [0, 0.5]])
+    with pytest.raises(MapDecodingError):
+        validate_map(descriptors, values, 3, [[0, 1]])
+
+
+def test_load_maps_precision():
+    """Test that the `mpmath.mpf` values keep their precision when unpickled at the default working precision."""
+    with mpmath.workdps(40):
+        data = pickle.dumps({'coverage_map': generate_raw_map()})
+
+    raw_maps = load_maps(io.BytesIO(data), ['coverage'])
+    _, values = decode_map(raw_maps['coverage'], precision=30)
+    assert values[1, 0] == '0.333333333333333333333333333333'
+
+
+def test_load_maps():
+    """Test that only the requested maps are returned."""
+    handle = io.BytesIO(pickle.dumps({'coverage_map': [], 'rate_map': [], 'rate_constant_map': []}))
+    assert set(load_maps(handle, ['coverage', 'rate'])) == {'coverage', 'rate'}
+
+    handle = io.BytesIO(pickle.dumps({'coverage_map': []}))
+    with pytest.raises(MissingMapError):
+        load_maps(handle, ['coverage', 'rate'])
+
+    with pytest.raises(MapDecodingError):
+        load_maps(io.BytesIO(b'not a pickle'), ['coverage'])
+
+
+def test_decode_data_files(tmp_path):
+    """Test that the data files are decoded in worker processes, with the error of every file that fails."""
+    raw_map = generate_raw_map()
+    with gzip.open(tmp_path / 'aiida_0.pickle.gz', 'wb') as handle:
+        pickle.dump({'coverage_map': raw_map}, handle)
+    with open(tmp_path / 'aiida_1.pickle', 'wb') as handle:
+        pickle.dump({'coverage_map': []}, handle)
+    with open(tmp_path / 'aiida_2.pickle', 'wb') as handle:
+        pickle.dump({'rate_map': raw_map}, handle)
+
+    paths = [str(tmp_path / name) for name in ('aiida_0.pickle.gz', 'aiida_1.pickle', 'aiida_2.pickle')]
+    maps, malformed, missing = decode_data_files(paths, ['coverage'], processes=2)
+
+    assert maps['coverage'][1].tolist() == decode_map(raw_map)[1].tolist()
+    assert isinstance(malformed, MalformedMapError)
+    assert isinstance(missing, MissingMapError)
+
+
+@pytest.mark.parametrize('precision', (None, 30))
+def test_read_map_stream(tmp_path, precision):
+    """Test that a map stream written in chunks is decoded into the same arrays as the full map."""
+    with mpmath.workdps(40):
+        raw_map = generate_raw_map(resolution=5)
+        with open(tmp_path / 'aiida.pickle', 'wb') as handle:
+            pickle.dump({'coverage_map': raw_map, 'rate_map': raw_map[:3]}, handle)
+        expected = decode_map(raw_map, precision)
+
+    write_map_stream(str(tmp_path / 'aiida.pickle'), str(tmp_path / 'aiida.stream'), ['rate', 'coverage'], 40, 4)
+
+    with open(tmp_path / 'aiida.stream', 'rb') as handle:
+        maps = read_map_stream(handle, ['coverage'], str(tmp_path), precision)
+
+    descriptors, values = maps['coverage']
+    assert isinstance(values, numpy.memmap)
+    assert descriptors.tolist() == expected[0].tolist()
+    assert values.tolist() == expected[1].tolist()
+
+
+def test_read_map_stream_missing(tmp_path):
+    """Test that a map that is absent from the stream raises."""
+    with open(tmp_path / 'aiida.pickle', 'wb') as handle:
+        pickle.dump({'coverage_map': generate_raw_map()}, handle)
+    write_map_stream(str(tmp_path / 'aiida.pickle'), str(tmp_path / 'aiida.stream'), ['coverage', 'rate'], 15)
+
+    with open(tmp_path / 'aiida.stream', 'rb') as handle, pytest.raises(MissingMapError):
+        read_map_stream(handle, ['coverage', 'rate'], str(tmp_path))
@@ -0,0 +1,70 @@
+"""Tests for the summary of the maps."""
+import numpy
+import pytest
+from aiida_catmap.parsers.summary import escape_key, get_surface_descriptors, summarize_map, summarize_surfaces, unescape_key
+
+DESCRIPTORS = numpy.array([[0., 0.], [0., 1.], [1., 0.], [1., 1.]])
+VALUES = numpy.array([[0.1, 1e-3], [0.4, numpy.nan], [0.2, 1e-5], [0.3, 2e-3]])
+
+
+def test_summarize_map():
+    """Test the extrema of every species, ignoring non-finite values."""
+    summary = summarize_map(DESCRIPTORS, VALUES, ['CO_s', 'O_s'])
+
+    assert summary['CO_s'] == {'min': pytest.approx(0.1), 'max': pytest.approx(0.4), 'argmax': [0., 1.]}
+    assert summary['O_s'] == {'min': pytest.approx(1e-5), 'max': pytest.approx(2e-3), 'argmax': [1., 1.]}
+    assert set(summarize_map(DESCRIPTORS, VALUES, ['CO_s'])) == {'species_0', 'species_1'}
+
+
+def test_summarize_map_escaped():
+    """Test that the names with a `.`, which AiiDA does not allow in keys, are escaped reversibly."""
+    summary = summarize_map(DESCRIPTORS, VALUES, ['0.5O2_g', 'CO%_s'])
+
+    assert set(summary) == {'0%2E5O2_g', 'CO%25_s'}
+    assert [unescape_key(key) for key in summary] == ['0.5O2_g', 'CO%_s']
+    assert escape_key('CO_s') == 'CO_s'
+
+    summary = summarize_surfaces(DESCRIPTORS, VALUES, {'Pt.111': [0., 1.]}, ['0.5O2_g', 'CO_g'])
+    assert summary == {'Pt%2E111': {'descriptors': [0., 1.], 'grid_point': [0., 1.], 'values': {'0%2E5O2_g': 0.4, 'CO_g': None}}}
+
+
+def test_summarize_map_chunks():
+    """Test that the extrema of a map reduced in chunks are those of the whole map."""
+    values = numpy.array([[0.1, numpy.nan], [0.4, numpy.nan], [0.2, numpy.inf], [0.4, numpy.nan]])
+
+    for chunk_points in (1, 3, 4):
+        summary = summarize_map(DESCRIPTORS, values, ['CO_s', 'O_s'], chunk_points)
+        assert summary['CO_s'] == {'min': pytest.approx(0.1), 'max': pytest.approx(0.4), 'argmax': [0., 1.]}
+        assert summary['O_s'] == {'min': None, 'max': None, 'argmax': None}
+    assert summarize_map(DESCRIPTORS, VALUES, None, 3) == summarize_map(DESCRIPTORS, VALUES)
+
+
+def test_summarize_map_memmap(tmp_path):
+    """Test that a memory-mapped map is summarized."""
+    numpy.save(tmp_path / 'values.npy', VALUES)
+    values = numpy.load(tmp_path / 'values.npy', mmap_mode='r')
+
+    assert summarize_map(DESCRIPTORS, values, ['CO_s', 'O_s'], 2) == summarize_map(DESCRIPTORS, VALUES, ['CO_s', 'O_s'])
+
+
+def test_summarize_map_strings():
+    """Test that the string values of maps with the full precision are converted."""
+    summary = summarize_map(DESCRIPTORS, VALUES.astype(str))
+    assert summary['species_0']['max'] == pytest.approx(0.4)
+
+
+def test_summarize_surfaces():
+    """Test that the values of the surfaces are taken at the closest grid point."""
+    columns = {
+        'surface_name': ['None', 'Pt', 'Pt', 'Au'],
+        'species_name': ['CO', 'O', 'CO', 'O'],
+        'formation_energy': [2.74, 0.9, 0.2, 0.1],
+    }
+    surface_descriptors = get_surface_descriptors(columns, ['Pt', 'Au'], ['O_s', 'CO_s'])
+    assert surface_descriptors == {'Pt': [0.9, 0.2], 'Au': None}
+
+    summary = summarize_surfaces(DESCRIPTORS, VALUES, surface_descriptors, ['CO2_g', 'CO_g'])
+    assert summary == {'Pt': {'descriptors': [0.9, 0.2], 'grid_point': [1., 0.], 'values': {'CO2_g': 0.2, 'CO_g': 1e-5}}}
+
+    summary = summarize_surfaces(DESCRIPTORS, VALUES, {'Ag': [0., 1.]})
+    assert summary['Ag']['values'] == {'species_0': 0.4, 'species_1': None}
@@ -0,0 +1,59 @@
+"""Tests for the `CatMAPResults` accessor."""
+import numpy
+import pytest
+from aiida import orm
+from aiida_catmap.results import CatMAPResults, clear_cache, get_grid
+
+
+def test_get_grid():
+    """Test arranging the values of a map on its descriptor grid, with a missing point."""
+    descriptors = numpy.array([[0., 1.], [1., 0.], [0., 0.]])
+    axes, grid = get_grid(descriptors, numpy.array([1., 2., 3.]))
+
+    assert [axis.tolist() for axis in axes] == [[0., 1.], [0., 1.]]
+    assert grid[0].tolist() == [3., 1.]
+    assert grid[1, 0] == 2.
+    assert numpy.isnan(grid[1, 1])
+
+
+@pytest.mark.parametrize('output_format', ('list', 'array'))
+def test_results(fixture_localhost, generate_calc_job_node, generate_parser, output_format):
+    """Test the lazy access to the maps of the parsed default fixture, in both output formats."""
+    inputs = {
+        'data_file': orm.Str('aiida.pickle'),
+        'descriptor_names': orm.List(list=['O_s', 'CO_s']),
+        'descriptor_ranges': orm.List(list=[[-1, 3], [-0.5, 4]]),
+        'resolution': orm.Int(3),
+        'decimal_precision': orm.Int(100),
+        'metadata': {
+            'options': {
+                'output_filename': 'aiida.out',
+                'output_format': output_format
+            }
+        },
+    }
+    node = generate_calc_job_node('catmap', fixture_localhost, 'default', inputs)
+    _, calcfunction = generate_parser('catmap').parse_from_node(node)
+    clear_cache()
+
+    results = CatMAPResults(calcfunction.pk)
+    assert results.maps == ['coverage_map', 'rate_map', 'production_rate_map']
+    assert results.get_species_names('coverage') == ['CO_s', 'O_s']
+    assert results.get_descriptor_names() == ['O_s', 'CO_s']
+
+    descriptors = results.get_descriptors()
+    assert isinstance(descriptors, numpy.memmap)
+    assert descriptors.shape == (9, 2)
+    assert results['coverage_map', 'O_s'][1] == pytest.approx(2 / 7)
+    assert results.get_values('coverage_map', ['O_s', 'CO_s'])[1] == pytest.approx([2 / 7, 1 / 7])
+    assert results.get_values() is results['coverage']
+
+    axes, grid = results.get_grid('coverage', 'CO_s')
+    assert grid.shape == (3, 3)
+    assert grid[0, 0] == results['coverage_map', 'CO_s'][0]
+    assert [axis.tolist() for axis in axes] == [[-1., 1., 3.], [-0.5, 1.75, 4.]]
+
+    with pytest.raises(KeyError):
+        results.get_values('coverage_map', 'H_s')
+    with pytest.raises(KeyError):
+        results.get_values('tof_map')
@@ -0,0 +1,107 @@
+"""Tests for the `CatMAPAdaptiveWorkChain`."""
+import numpy
+import pytest
+from aiida_catmap.workflows.adaptive import flag_cells, get_cells, merge_maps
+
+
+def test_get_cells():
+    """Test the cells of a uniform grid."""
+    cells = get_cells([[0., 1.], [0., 2.]], 3)
+
+    assert len(cells) == 4
+    assert cells[0] == [[0., 0.5], [0., 1.]]
+    assert cells[-1] == [[0.5, 1.], [1., 2.]]
+
+
+def test_flag_cells():
+    """Test that only the cells across a step of the values are flagged."""
+    axis = numpy.linspace(0., 1., 3)
+    descriptors = numpy.array([[x, y] for x in axis for y in axis])
+    values = (descriptors[:, :1] > 0.75).astype(float)
+
+    flagged = flag_cells(descriptors, values, [[[[0., 1.], [0., 1.]], 3]], 0.5)
+    assert sorted(cell for _, cell in flagged) == [[[0.5, 1.], [0., 0.5]], [[0.5, 1.], [0.5, 1.]]]
+
+    ## Cells with a corner without a solution are not flagged
+    assert len(flag_cells(descriptors[:-1], values[:-1], [[[[0., 1.], [0., 1.]], 3]], 0.5)) == 1
+
+
+def test_merge_maps():
+    """Test that the points shared by maps are merged, the values of the last map taking precedence."""
+    coarse = (numpy.array([[0., 0.], [0., 1.], [1., 0.], [1., 1.]]), numpy.zeros((4, 1)))
+    fine = (numpy.array([[0., 0.], [0., 0.5], [0.5, 0.], [0.5, 0.5]]), numpy.ones((4, 1)))
+
+    descriptors, values = merge_maps([coarse, fine])
+
+    assert descriptors.tolist() == [[0., 0.], [0., 0.5], [0., 1.], [0.5, 0.], [0.5, 0.5], [1., 0.], [1., 1.]]
+    assert values[:, 0].tolist() == [1., 1., 0., 1., 1., 0., 0.]
+
+
+def test_adaptive_mock(generate_inputs_catmap, generate_mock_code):
+    """Test a refinement against the mock of CatMAP, whose coverages vary strongly across the grid."""
+    from aiida import orm
+    from aiida.engine import run_get_node
+    from aiida_catmap.workflows.adaptive import CatMAPAdaptiveWorkChain
+
+    inputs = generate_inputs_catmap()
+    inputs['code'] = generate_mock_code()
+    inputs['resolution'] = orm.Int(3)
+
+    results, node = run_get_node(
+        CatMAPAdaptiveWorkChain,
+        catmap=inputs,
+        refinement={'threshold': orm.Float(0.3), 'max_iterations': orm.Int(1)},
+    )
+
+    assert node.is_finished_ok, node.exit_status
+    descriptors = results['coverage_map'].get_array('descriptors')
+    assert len(descriptors) > 9
+    assert len(numpy.unique(numpy.round(descriptors, 10), axis=0)) == len(descriptors)
+
+
+def test_adaptive_checkpoints(generate_inputs_catmap, generate_mock_code):
+    """Test that the coarse grid can be split in strips, which the batched refinements cannot be."""
+    from aiida import orm
+    from aiida.common import LinkType
+    from aiida.engine import run_get_node
+    from aiida_catmap.workflows.adaptive import CatMAPAdaptiveWorkChain
+
+    inputs = generate_inputs_catmap()
+    inputs['code'] = generate_mock_code()
+    inputs['resolution'] = orm.Int(3)
+    inputs['checkpoints'] = orm.Int(3)
+
+    _, node = run_get_node(
+        CatMAPAdaptiveWorkChain,
+        catmap=inputs,
+        refinement={'threshold': orm.Float(0.3), 'max_iterations': orm.Int(1)},
+    )
+
+    assert node.is_finished_ok, node.exit_status
+    calculations = {entry.link_label: entry.node for entry in node.get_outgoing(link_type=LinkType.CALL_CALC).all()}
+    assert 'checkpoints' in calculations['iteration_0'].inputs
+    assert 'checkpoints' not in calculations['iteration_1'].inputs
+
+
+def test_adaptive_output_variables(generate_inputs_catmap, generate_mock_code):
+    """Test that only the maps of the output variables are merged, and that the refined map has to be one of them."""
+    from aiida import orm
+    from aiida.engine import run_get_node
+    from aiida_catmap.workflows.adaptive import CatMAPAdaptiveWorkChain
+
+    inputs = generate_inputs_catmap()
+    inputs['code'] = generate_mock_code()
+    inputs['resolution'] = orm.Int(3)
+    inputs['output_variables'] = orm.List(list=['coverage'])
+
+    results, node = run_get_node(
+        CatMAPAdaptiveWorkChain,
+        catmap=inputs,
+        refinement={'threshold': orm.Float(0.3), 'max_iterations': orm.Int(1)},
+    )
+
+    assert node.is_finished_ok, node.exit_status
+    assert set(results) == {'coverage_map'}
+
+    with pytest.raises(ValueError):
+        run_get_node(CatMAPAdaptiveWorkChain, catmap=inputs, refinement={'variable': orm.Str('rate_map')})
@@ -0,0 +1,48 @@
+"""Tests for the `CatMAPSweepWorkChain`."""
+import numpy
+from aiida_catmap.workflows.sweep import stack_maps
+
+
+def test_stack_maps():
+    """Test the stacking of the maps of a sweep, including failed and incomplete points."""
+    descriptors = numpy.array([[0., 0.], [0., 1.], [1., 0.]])
+    values = numpy.arange(6.).reshape(3, 2)
+
+    maps = [
+        (descriptors, values),
+        (descriptors[1:], values[1:] + 10),
+        None,
+        (descriptors[::-1], values[::-1] + 20),
+    ]
+    stacked_descriptors, stacked_values = stack_maps(maps, (2, 2))
+
+    assert stacked_descriptors.tolist() == descriptors.tolist()
+    assert stacked_values.shape == (2, 2, 3, 2)
+    assert stacked_values[0, 0].tolist() == values.tolist()
+    assert numpy.isnan(stacked_values[0, 1, 0]).all()
+    assert stacked_values[0, 1, 1:].tolist() == (values[1:] + 10).tolist()
+    assert numpy.isnan(stacked_values[1, 0]).all()
+    assert stacked_values[1, 1].tolist() == (values + 20).tolist()
+
+
+def test_sweep_mock(generate_inputs_catmap, generate_mock_code):
+    """Test a sweep with fewer slots than points against the mock of CatMAP, keeping only the coverage map."""
+    from aiida import orm
+    from aiida.engine import run_get_node
+    from aiida_catmap.workflows.sweep import CatMAPSweepWorkChain
+
+    inputs = generate_inputs_catmap()
+    inputs['code'] = generate_mock_code()
+    inputs['resolution'] = orm.Int(3)
+    inputs['output_variables'] = orm.List(list=['coverage'])
+
+    results, node = run_get_node(
+        CatMAPSweepWorkChain,
+        catmap=inputs,
+        sweep={'temperature': orm.List(list=[400., 450., 500.])},
+        max_concurrent=orm.Int(2),
+    )
+
+    assert node.is_finished_ok, node.exit_status
+    assert set(results) == {'coverage_map'}
+    assert results['coverage_map'].get_array('values').shape == (3, 9, 2)
@@ -0,0 +1,49 @@
+"""Tests for the `CatMAPTuningWorkChain`."""
+import numpy
+import pytest
+from aiida_catmap.workflows.tuning import get_cheapest, get_deviation
+
+
+def test_get_deviation():
+    """Test the deviation of a candidate map from the reference."""
+    descriptors = numpy.array([[0., 0.], [0., 1.], [1., 0.]])
+    reference = (descriptors, numpy.array([[0.5], [0.25], [numpy.nan]]))
+
+    assert get_deviation(reference, (descriptors[::-1], numpy.array([[0.1], [0.3], [0.5]]))) == pytest.approx(0.05)
+    assert get_deviation(reference, (descriptors, numpy.array([[0.5], [numpy.nan], [0.1]]))) == numpy.inf
+    assert get_deviation(reference, (descriptors[:2], numpy.array([[0.5], [0.25]]))) == numpy.inf
+
+
+def test_get_cheapest():
+    """Test that the agreeing candidate with the shortest run time is selected."""
+    assert get_cheapest([1., 1e-8, 1e-9], [1., 3., 2.], 1e-6) == 2
+    assert get_cheapest([1., 1e-8, 1e-9], [1., 3., None], 1e-6) == 1
+    assert get_cheapest([1., 1.], [1., 2.], 1e-6) is None
+
+
+def test_tuning_mock(generate_inputs_catmap, generate_mock_code):
+    """Test a tuning against the mock of CatMAP, whose results do not depend on the settings, and its reuse."""
+    from aiida import orm
+    from aiida.engine import run_get_node
+    from aiida_catmap.calculations.catmap import CatMAPCalculation
+    from aiida_catmap.workflows.tuning import CatMAPTuningWorkChain
+
+    inputs = generate_inputs_catmap()
+    inputs['code'] = generate_mock_code()
+    candidates = [{'decimal_precision': 20}, {'decimal_precision': 30}]
+
+    results, node = run_get_node(CatMAPTuningWorkChain, catmap=inputs, tuning={'candidates': orm.List(list=candidates)})
+
+    assert node.is_finished_ok, node.exit_status
+    assert results['settings']['decimal_precision'] in (20, 30)
+
+    ## The candidates and the reference are solved by the models of a single batched calculation
+    tuning = node.get_outgoing(link_label_filter='tuning').one().node
+    assert sorted(CatMAPCalculation.get_batch_outputs(tuning)) == [0, 1, 2]
+    assert 'coverage_map' in results
+    assert node.get_extra('catmap_mechanism_key')
+
+    results_reused, node_reused = run_get_node(CatMAPTuningWorkChain, catmap=inputs, tuning={'reuse': orm.Bool(True)})
+
+    assert node_reused.is_finished_ok, node_reused.exit_status
+    assert results_reused['settings'].uuid == results['settings'].uuid